@@ -1,14 +1,349 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import sharding
+from .authentication import token_cache
+from .dependencies import on_tasks_status_changed
+from .estimation import invalidate_estimation_stats
+from .ical import invalidate_calendar
 from .models import (
     UserSetting, BandwidthTagCost, FixedSchedule,
-    LongTermGoal, ShortTermGoal, Task, WorkLog, EnergyLog
+    LongTermGoal, ShortTermGoal, Task, WorkLog, EnergyLog, TodayTask, DailySnapshot, ArchivedLogBatch, ApiToken,
+    EnergyProfile, TaskDependency, UserShard, Job, CalendarFeed, WorkLogDailyRollup
 )
 
-admin.site.register(UserSetting)
-admin.site.register(BandwidthTagCost)
-admin.site.register(FixedSchedule)
-admin.site.register(LongTermGoal)
-admin.site.register(ShortTermGoal)
-admin.site.register(Task)
-admin.site.register(WorkLog)
-admin.site.register(EnergyLog)
\ No newline at end of file
+# 有筛选条件时最多数这么多行，超过就按这个数分页
+ESTIMATED_COUNT_LIMIT = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    大表的变更列表不跑全表 COUNT(*)。
+    没有筛选条件时用主键范围估算行数（两次索引查找）；有筛选条件时最多数到 ESTIMATED_COUNT_LIMIT 行。
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            bounds = queryset.model._default_manager.using(queryset.db).aggregate(lo=Min('pk'), hi=Max('pk'))
+            if bounds['hi'] is None:
+                return 0
+            return bounds['hi'] - bounds['lo'] + 1
+        return queryset.order_by()[:ESTIMATED_COUNT_LIMIT].count()
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # 不再额外统计不带筛选条件的总数
+    show_full_result_count = False
+    list_per_page = 50
+    # 按主键倒序走索引，不按 Meta.ordering 排序整张表
+    ordering = ('-id',)
+
+    def __init__(self, model, admin_site):
+        super().__init__(model, admin_site)
+        # 分库时用户表在另一个库，不能连表：关联的用户改为单独查一次，按用户名搜索时先查出用户 id
+        self._user_paths = ()
+        if sharding.enabled() and sharding.is_sharded(model) and isinstance(self.list_select_related, tuple):
+            self._user_paths = tuple(
+                path for path in self.list_select_related if path == 'user' or path.endswith('__user'))
+            self.list_select_related = tuple(dict.fromkeys(
+                path.rpartition('__')[0] if path in self._user_paths else path
+                for path in self.list_select_related
+                if path != 'user'
+            ))
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self._user_paths:
+            queryset = queryset.prefetch_related(*self._user_paths)
+        return queryset
+
+    def _username_search_paths(self):
+        if not (sharding.enabled() and sharding.is_sharded(self.model)):
+            return []
+        return [field.lstrip('=^@')[:-len('__username')] for field in self.search_fields
+                if field.lstrip('=^@').endswith('user__username')]
+
+    def get_search_fields(self, request):
+        fields = super().get_search_fields(request)
+        if getattr(request, '_skip_username_search', False):
+            return [field for field in fields if not field.lstrip('=^@').endswith('user__username')]
+        return fields
+
+    def get_search_results(self, request, queryset, search_term):
+        paths = self._username_search_paths()
+        if not paths or not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        user_ids = list(User.objects.filter(username__in=search_term.split()).values_list('id', flat=True))
+        by_user = queryset.filter(Q.create([(f"{path}_id__in", user_ids) for path in paths], connector=Q.OR))
+        request._skip_username_search = True
+        try:
+            if not self.get_search_fields(request):
+                return by_user, False
+            matched, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        finally:
+            request._skip_username_search = False
+        return matched | by_user, may_have_duplicates
+
+    def _update(self, request, queryset, message, **values):
+        updated = queryset.update(**values)
+        self.message_user(request, message.format(n=updated), messages.SUCCESS)
+        return updated
+
+
+@admin.register(UserSetting)
+class UserSettingAdmin(ScalableAdmin):
+    list_display = ('user', 'daily_work_hours', 'daily_energy_budget', 'daily_bandwidth_budget',
+                    'work_window_minutes', 'rest_window_minutes', 'last_modified')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username',)
+    ordering = ('-user_id',)
+
+
+@admin.register(BandwidthTagCost)
+class BandwidthTagCostAdmin(ScalableAdmin):
+    list_display = ('tag_name', 'cost', 'user_setting')
+    list_select_related = ('user_setting__user',)
+    raw_id_fields = ('user_setting',)
+    search_fields = ('=user_setting__user__username', 'tag_name')
+
+
+@admin.register(FixedSchedule)
+class FixedScheduleAdmin(ScalableAdmin):
+    list_display = ('name', 'start_time', 'duration_minutes', 'recurrence_type', 'user_setting')
+    list_select_related = ('user_setting__user',)
+    list_filter = ('recurrence_type',)
+    raw_id_fields = ('user_setting',)
+    search_fields = ('=user_setting__user__username', 'name')
+
+
+@admin.register(LongTermGoal)
+class LongTermGoalAdmin(ScalableAdmin):
+    list_display = ('name', 'user', 'status', 'created_at')
+    list_select_related = ('user',)
+    list_filter = ('status',)
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username', 'name')
+    actions = ['mark_archived']
+
+    @admin.action(description="归档所选长期目标")
+    def mark_archived(self, request, queryset):
+        self._update(request, queryset, "已归档 {n} 个长期目标。", status=LongTermGoal.GoalStatus.ARCHIVED)
+
+
+@admin.register(ShortTermGoal)
+class ShortTermGoalAdmin(ScalableAdmin):
+    list_display = ('name', 'user', 'priority', 'status', 'target_date', 'completion_date')
+    list_select_related = ('user',)
+    list_filter = ('status', 'priority')
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username', 'name')
+    actions = ['mark_completed', 'mark_postponed']
+
+    @admin.action(description="标记所选短期目标为已完成")
+    def mark_completed(self, request, queryset):
+        self._update(request, queryset, "已完成 {n} 个短期目标。",
+                     status=ShortTermGoal.ShortTermGoalStatus.COMPLETED, completion_date=timezone.localdate())
+
+    @admin.action(description="标记所选短期目标为已推迟")
+    def mark_postponed(self, request, queryset):
+        self._update(request, queryset, "已推迟 {n} 个短期目标。", status=ShortTermGoal.ShortTermGoalStatus.POSTPONED)
+
+
+@admin.register(Task)
+class TaskAdmin(ScalableAdmin):
+    list_display = ('name', 'user', 'priority', 'status', 'energy_level_estimate', 'end_date',
+                    'estimated_time_minutes', 'actual_time_minutes')
+    list_select_related = ('user',)
+    list_filter = ('status', 'priority', 'energy_level_estimate')
+    date_hierarchy = 'created_at'
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('short_term_goal_ref', 'long_term_goal_ref')
+    search_fields = ('=user__username', 'name')
+    actions = ['mark_completed', 'mark_postponed', 'mark_cancelled']
+
+    @admin.action(description="标记所选任务为已完成")
+    def mark_completed(self, request, queryset):
+        finished = list(queryset.values_list('user_id', 'id'))
+        user_ids = {user_id for user_id, _ in finished}
+        self._update(request, queryset, "已完成 {n} 个任务。",
+                     status=Task.TaskStatus.COMPLETED, completion_date=timezone.localdate())
+        # update() 不触发信号，手动作废预估准确度统计和订阅日历
+        for user_id in user_ids:
+            invalidate_estimation_stats(user_id)
+            invalidate_calendar(user_id)
+        self._unblock_dependents(finished)
+
+    @admin.action(description="标记所选任务为已推迟")
+    def mark_postponed(self, request, queryset):
+        reopened = self._completed_users(queryset)
+        self._update(request, queryset, "已推迟 {n} 个任务。", status=Task.TaskStatus.POSTPONED)
+        for user_id in reopened:
+            invalidate_estimation_stats(user_id)
+
+    @admin.action(description="标记所选任务为已取消")
+    def mark_cancelled(self, request, queryset):
+        finished = list(queryset.values_list('user_id', 'id'))
+        reopened = self._completed_users(queryset)
+        self._update(request, queryset, "已取消 {n} 个任务。", status=Task.TaskStatus.CANCELLED)
+        for user_id in {user_id for user_id, _ in finished}:
+            invalidate_calendar(user_id)
+        for user_id in reopened:
+            invalidate_estimation_stats(user_id)
+        self._unblock_dependents(finished)
+
+    def _completed_users(self, queryset):
+        # 已完成的任务被改成别的状态，会从预估准确度统计的样本里消失
+        return set(queryset.filter(status=Task.TaskStatus.COMPLETED).values_list('user_id', flat=True).distinct())
+
+    def _unblock_dependents(self, finished):
+        by_user = {}
+        for user_id, task_id in finished:
+            by_user.setdefault(user_id, []).append(task_id)
+        for user_id, task_ids in by_user.items():
+            on_tasks_status_changed(user_id, task_ids)
+
+
+@admin.register(TaskDependency)
+class TaskDependencyAdmin(ScalableAdmin):
+    list_display = ('task', 'depends_on', 'user', 'created_at')
+    list_select_related = ('user', 'task__user', 'depends_on__user')
+    raw_id_fields = ('user', 'task', 'depends_on')
+    search_fields = ('=user__username',)
+
+
+@admin.register(TodayTask)
+class TodayTaskAdmin(ScalableAdmin):
+    list_display = ('date', 'task', 'user', 'added_at')
+    list_select_related = ('user', 'task__user')
+    date_hierarchy = 'date'
+    raw_id_fields = ('user', 'task')
+    search_fields = ('=user__username',)
+
+
+@admin.register(WorkLog)
+class WorkLogAdmin(ScalableAdmin):
+    list_display = ('task_name_snapshot', 'user', 'timestamp_start', 'duration_minutes', 'energy_cost',
+                    'user_reported_status_at_end')
+    list_select_related = ('user',)
+    list_filter = ('energy_cost',)
+    date_hierarchy = 'timestamp_start'
+    raw_id_fields = ('user', 'task_ref')
+    search_fields = ('=user__username',)
+    ordering = ('-timestamp_start',)
+
+
+@admin.register(EnergyLog)
+class EnergyLogAdmin(ScalableAdmin):
+    list_display = ('timestamp', 'user', 'energy_level', 'current_activity_type')
+    list_select_related = ('user',)
+    list_filter = ('energy_level',)
+    date_hierarchy = 'timestamp'
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username',)
+    ordering = ('-timestamp',)
+
+
+@admin.register(DailySnapshot)
+class DailySnapshotAdmin(ScalableAdmin):
+    list_display = ('date', 'user', 'completed_yesterday', 'overdue_tasks', 'today_task_count',
+                    'today_estimated_minutes', 'energy_avg_recent', 'computed_at')
+    list_select_related = ('user',)
+    date_hierarchy = 'date'
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username',)
+
+
+@admin.register(ArchivedLogBatch)
+class ArchivedLogBatchAdmin(ScalableAdmin):
+    list_display = ('user', 'kind', 'range_start', 'range_end', 'row_count', 'archived_at')
+    list_select_related = ('user',)
+    list_filter = ('kind',)
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username',)
+    # 压缩数据不在表单里展示
+    exclude = ('payload',)
+    readonly_fields = ('kind', 'range_start', 'range_end', 'first_id', 'last_id', 'row_count', 'archived_at')
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(ScalableAdmin):
+    list_display = ('prefix', 'name', 'user', 'created_at', 'expires_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username', '=prefix')
+    readonly_fields = ('key_hash', 'prefix', 'created_at')
+    actions = ['expire_now']
+
+    @admin.action(description="让所选令牌立即过期")
+    def expire_now(self, request, queryset):
+        digests = list(queryset.values_list('key_hash', flat=True))
+        self._update(request, queryset, "已让 {n} 个令牌过期。", expires_at=timezone.now())
+        for digest in digests:
+            token_cache.discard(digest)
+
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(ScalableAdmin):
+    list_display = ('user', 'prefix', 'created_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username', '=prefix')
+    ordering = ('-user_id',)
+    readonly_fields = ('key_hash', 'prefix', 'created_at')
+
+
+@admin.register(EnergyProfile)
+class EnergyProfileAdmin(ScalableAdmin):
+    list_display = ('user', 'sample_count', 'decayed_to')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username',)
+    exclude = ('level_sums', 'weights')
+    readonly_fields = ('sample_count', 'decayed_to', 'version')
+
+
+@admin.register(WorkLogDailyRollup)
+class WorkLogDailyRollupAdmin(ScalableAdmin):
+    list_display = ('user', 'date', 'focus_minutes', 'sessions')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username',)
+    date_hierarchy = 'date'
+    readonly_fields = ('version',)
+
+
+@admin.register(UserShard)
+class UserShardAdmin(ScalableAdmin):
+    list_display = ('user', 'alias', 'moving', 'updated_at')
+    list_select_related = ('user',)
+    list_filter = ('alias', 'moving')
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username',)
+    ordering = ('-user_id',)
+    # 改分片要用 move_user_shard 命令搬数据，这里只读
+    readonly_fields = ('alias', 'moving')
+
+
+@admin.register(Job)
+class JobAdmin(ScalableAdmin):
+    list_display = ('id', 'kind', 'user', 'status', 'progress', 'attempts', 'created_at', 'finished_at')
+    list_select_related = ('user',)
+    list_filter = ('status', 'kind')
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username',)
+    readonly_fields = ('progress', 'progress_message', 'attempts', 'locked_by', 'lease_expires_at', 'result',
+                       'result_file', 'error', 'created_at', 'started_at', 'finished_at')
+    actions = ['retry_now']
+
+    @admin.action(description="立即重新排队所选任务")
+    def retry_now(self, request, queryset):
+        self._update(request, queryset.exclude(status=Job.Status.RUNNING), "已重新排队 {n} 个任务。",
+                     status=Job.Status.QUEUED, run_after=timezone.now(), attempts=0, error='', finished_at=None)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        # 注册各模块里的信号接收器
+        from . import dependencies, estimation, ical, journal, sharding, throttling  # noqa: F401
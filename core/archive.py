@@ -0,0 +1,116 @@
+"""
+WorkLog / EnergyLog 冷数据归档。
+
+超过保留期的行按用户打包成 zlib 压缩的 JSON 批次写入 ArchivedLogBatch，再从热表删除，
+热表的索引和缓存只承担近期数据。需要完整历史的代码（导出、统计重建）统一走
+iter_log_rows()，先读归档批次再读热表，调用方不用关心数据在哪。
+"""
+import json
+import zlib
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import models, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedLogBatch, EnergyLog, WorkLog
+
+# 归档类型 -> (模型, 时间字段)
+ARCHIVE_SOURCES = {
+    ArchivedLogBatch.Kind.WORK_LOG: (WorkLog, 'timestamp_start'),
+    ArchivedLogBatch.Kind.ENERGY_LOG: (EnergyLog, 'timestamp'),
+}
+
+# 保留期至少要覆盖晨间统计看的两周精力趋势
+MIN_HORIZON_DAYS = 30
+
+
+def archive_horizon():
+    days = max(MIN_HORIZON_DAYS, getattr(settings, 'ARCHIVE_HORIZON_DAYS', 365))
+    return timezone.now() - timedelta(days=days)
+
+
+def _columns(model):
+    return [field.attname for field in model._meta.concrete_fields if field.attname != 'user_id']
+
+
+def _datetime_columns(model):
+    return {field.attname for field in model._meta.concrete_fields if isinstance(field, models.DateTimeField)}
+
+
+def _encode(value):
+    # isoformat 保留微秒，读回时原样还原
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def archive_batch(kind, cutoff, batch_size=2000):
+    """
+    把 cutoff 之前最早的一批行归档，返回归档行数（0 表示已经没有可归档的数据）。
+    每批在一个事务里完成"写入归档 + 删除原行"，中途中断重跑不会丢也不会重复。
+    """
+    model, time_field = ARCHIVE_SOURCES[kind]
+    columns = _columns(model)
+    ts_index = columns.index(time_field)
+    rows = list(
+        model.objects.filter(**{f"{time_field}__lt": cutoff})
+        .order_by('user_id', time_field, 'id')
+        .values_list('user_id', *columns)[:batch_size]
+    )
+    if not rows:
+        return 0
+
+    batches = []
+    for user_id, group in groupby(rows, key=lambda row: row[0]):
+        group = [row[1:] for row in group]
+        payload = {'columns': columns, 'rows': [[_encode(value) for value in row] for row in group]}
+        ids = [row[0] for row in group]
+        batches.append(ArchivedLogBatch(
+            user_id=user_id, kind=kind,
+            range_start=group[0][ts_index], range_end=group[-1][ts_index],
+            first_id=min(ids), last_id=max(ids), row_count=len(group),
+            payload=zlib.compress(json.dumps(payload, ensure_ascii=False).encode('utf-8'), 6),
+        ))
+    with transaction.atomic(using=router.db_for_write(model)):
+        ArchivedLogBatch.objects.bulk_create(batches)
+        model.objects.filter(id__in=[row[1] for row in rows]).delete()
+    return len(rows)
+
+
+def _decode_batch(batch, model):
+    payload = json.loads(zlib.decompress(bytes(batch.payload)).decode('utf-8'))
+    stored = payload['columns']
+    datetime_columns = _datetime_columns(model)
+    for row in payload['rows']:
+        yield {
+            column: parse_datetime(value) if column in datetime_columns and value else value
+            for column, value in zip(stored, row)
+        }
+
+
+def iter_log_rows(kind, user, columns, start=None, end=None, chunk_size=2000):
+    """
+    统一读取某个用户的日志（归档 + 热表），按时间从早到晚返回 columns 对应的元组。
+    start / end 按时间字段过滤，区间为 [start, end)。
+    """
+    model, time_field = ARCHIVE_SOURCES[kind]
+    batches = ArchivedLogBatch.objects.filter(user=user, kind=kind).order_by('range_start', 'first_id')
+    if start is not None:
+        batches = batches.filter(range_end__gte=start)
+    if end is not None:
+        batches = batches.filter(range_start__lt=end)
+    for batch in batches.iterator(chunk_size=10):
+        for row in _decode_batch(batch, model):
+            ts = row[time_field]
+            if (start is None or ts >= start) and (end is None or ts < end):
+                yield tuple(row.get(column) for column in columns)
+
+    live = model.objects.filter(user=user)
+    if start is not None:
+        live = live.filter(**{f"{time_field}__gte": start})
+    if end is not None:
+        live = live.filter(**{f"{time_field}__lt": end})
+    yield from live.order_by(time_field, 'id').values_list(*columns).iterator(chunk_size=chunk_size)
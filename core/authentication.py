@@ -0,0 +1,116 @@
+"""
+Bearer 令牌认证。
+
+校验过的令牌连同用户对象放进进程内 LRU，命中时认证不查数据库。
+删除令牌时清掉本进程的缓存项；其它进程最多在 API_TOKEN_CACHE_TTL 秒后失效。
+"""
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework import authentication, exceptions
+
+from .models import ApiToken
+from .sharding import activate_user
+
+
+def hash_token(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def generate_token():
+    """返回 (明文令牌, 摘要)。"""
+    key = secrets.token_urlsafe(32)
+    return key, hash_token(key)
+
+
+class TokenLRU:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return user
+
+    def put(self, digest, user, token_expires_at=None):
+        expires = time.monotonic() + self.ttl
+        if token_expires_at is not None:
+            # 令牌本身快过期时，缓存也不能比它活得久
+            expires = min(expires, time.monotonic() + (token_expires_at - timezone.now()).total_seconds())
+        with self._lock:
+            self._entries[digest] = (user, expires)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenLRU(
+    maxsize=getattr(settings, 'API_TOKEN_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'API_TOKEN_CACHE_TTL', 300),
+)
+
+
+@receiver(post_delete, sender=ApiToken)
+def forget_deleted_token(sender, instance, **kwargs):
+    token_cache.discard(instance.key_hash)
+
+
+class BearerTokenAuthentication(authentication.BaseAuthentication):
+    """
+    请求头 Authorization: Bearer <令牌>。
+    没带这个头时返回 None，交给后面的 SessionAuthentication。
+    """
+    keyword = b'bearer'
+
+    def authenticate(self, request):
+        parts = authentication.get_authorization_header(request).split()
+        if not parts or parts[0].lower() != self.keyword:
+            return None
+        if len(parts) != 2:
+            raise exceptions.AuthenticationFailed("Authorization 头格式应为 'Bearer <令牌>'。")
+        try:
+            key = parts[1].decode('ascii')
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed("令牌无效。")
+
+        digest = hash_token(key)
+        user = token_cache.get(digest)
+        if user is None:
+            token = ApiToken.objects.select_related('user').filter(key_hash=digest).first()
+            if token is None or not token.user.is_active:
+                raise exceptions.AuthenticationFailed("令牌无效。")
+            if token.expires_at is not None and token.expires_at <= timezone.now():
+                raise exceptions.AuthenticationFailed("令牌已过期。")
+            user = token.user
+            token_cache.put(digest, user, token.expires_at)
+        # 令牌认证发生在视图里，中间件那时还不知道用户，在这里切到用户所在的库
+        activate_user(user.pk, request.method)
+        return user, digest
+
+    def authenticate_header(self, request):
+        return 'Bearer'
@@ -0,0 +1,185 @@
+"""
+任务依赖图。
+
+每个用户的依赖边以邻接表形式缓存在共享缓存里（按版本号作废，增删依赖时换版本），
+阻塞状态计算、关键路径都读这份缓存。插入新依赖时的环检测不读缓存：先在事务里写入新边
+（SQLite 的写锁让并发插入排队），再从数据库读该用户的全部边做可达性搜索，成环就回滚。
+
+阻塞状态只由直接前置任务是否结束决定，而自动阻塞 / 解除阻塞本身不会改变任何任务"是否结束"，
+所以某些任务结束（或重新打开）时，只需要重新计算它们的直接后继，改动不会继续向下传播。
+重新计算只查一次前置任务状态，再用至多两条批量 UPDATE 写回。
+"""
+from collections import deque
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Task, TaskDependency
+from .sharding import db_for_user
+
+FINISHED_STATUSES = [Task.TaskStatus.COMPLETED, Task.TaskStatus.CANCELLED]
+# 前置任务没结束时，处于这些状态的任务会被自动标为阻塞；进行中的任务不动
+BLOCKABLE_STATUSES = [Task.TaskStatus.NOT_STARTED, Task.TaskStatus.WAITING]
+# 自动解除阻塞后回到的状态
+UNBLOCKED_STATUS = Task.TaskStatus.NOT_STARTED
+
+GRAPH_TIMEOUT = 24 * 3600
+
+
+class DependencyCycle(Exception):
+    pass
+
+
+def _version_key(user_id):
+    return f"taskgraph:version:{user_id}"
+
+
+def invalidate_graph(user_id):
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), 1, timeout=None)
+
+
+def get_graph(user_id):
+    """返回 (后继表, 前驱表)，都是 {任务 id: [任务 id, ...]}。"""
+    version = cache.get(_version_key(user_id), 0)
+    key = f"taskgraph:{user_id}:{version}"
+    graph = cache.get(key)
+    if graph is None:
+        graph = _load_graph(user_id)
+        cache.set(key, graph, timeout=GRAPH_TIMEOUT)
+    return graph
+
+
+def _load_graph(user_id):
+    successors, predecessors = {}, {}
+    edges = TaskDependency.objects.filter(user_id=user_id).values_list('depends_on_id', 'task_id')
+    for before, after in edges.iterator(chunk_size=5000):
+        successors.setdefault(before, []).append(after)
+        predecessors.setdefault(after, []).append(before)
+    return successors, predecessors
+
+
+def _reachable(successors, source, target):
+    seen = {source}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        if node == target:
+            return True
+        for nxt in successors.get(node, ()):
+            if nxt not in seen:
+                seen.add(nxt)
+                queue.append(nxt)
+    return False
+
+
+def add_dependency(user, task, depends_on):
+    """新增依赖 depends_on -> task，会形成环时抛出 DependencyCycle。"""
+    if task.pk == depends_on.pk:
+        raise DependencyCycle("任务不能依赖自己。")
+    with transaction.atomic(using=db_for_user(user.pk)):
+        # 先写入再检查：写入拿到写锁后读到的是最新的边，两个方向相反的并发插入不会都通过
+        dependency = TaskDependency.objects.create(user=user, task=task, depends_on=depends_on)
+        successors, predecessors = _load_graph(user.pk)
+        # 从 task 往下能走到 depends_on，说明新边成环
+        if _reachable(successors, task.pk, depends_on.pk):
+            raise DependencyCycle("添加这条依赖会形成循环依赖。")
+        # 缓存要等提交后才换版本，这里用刚读出的图，否则会按缺了新边的旧图计算
+        refresh_blocked(user.pk, [task.pk], predecessors=predecessors)
+    return dependency
+
+
+def refresh_blocked(user_id, task_ids, predecessors=None):
+    """
+    按前置任务是否都已结束，重新计算 task_ids 的阻塞状态，返回 (新阻塞数, 解除阻塞数)。
+    只有处于 BLOCKABLE_STATUSES 的任务会被阻塞，只有处于阻塞状态的任务会被解除。
+    predecessors 不传时读缓存的依赖图。
+    """
+    if predecessors is None:
+        _, predecessors = get_graph(user_id)
+    task_ids = set(task_ids)
+    if not task_ids:
+        return 0, 0
+    needed = set(task_ids)
+    for task_id in task_ids:
+        needed.update(predecessors.get(task_id, ()))
+    statuses = dict(Task.objects.filter(user_id=user_id, id__in=needed).values_list('id', 'status'))
+
+    to_block, to_unblock = [], []
+    for task_id in task_ids:
+        status = statuses.get(task_id)
+        if status is None:
+            continue
+        waiting = any(statuses.get(pred) not in FINISHED_STATUSES for pred in predecessors.get(task_id, ()))
+        if waiting and status in BLOCKABLE_STATUSES:
+            to_block.append(task_id)
+        elif not waiting and status == Task.TaskStatus.BLOCKED:
+            to_unblock.append(task_id)
+
+    blocked = unblocked = 0
+    if to_block:
+        blocked = Task.objects.filter(id__in=to_block, status__in=BLOCKABLE_STATUSES).update(
+            status=Task.TaskStatus.BLOCKED)
+    if to_unblock:
+        unblocked = Task.objects.filter(id__in=to_unblock, status=Task.TaskStatus.BLOCKED).update(
+            status=UNBLOCKED_STATUS)
+    return blocked, unblocked
+
+
+def on_tasks_status_changed(user_id, task_ids):
+    """任务结束或重新打开后调用：只重新计算它们的直接后继。"""
+    successors, _ = get_graph(user_id)
+    downstream = {after for task_id in task_ids for after in successors.get(task_id, ())}
+    return refresh_blocked(user_id, downstream)
+
+
+def critical_path(tasks, successors):
+    """
+    在给定任务集合内求关键路径（剩余分钟数之和最大的依赖链），Kahn 拓扑排序 + 动态规划，O(V + E)。
+    tasks 为 {id: 剩余分钟数}；只考虑两端都在集合内的边。返回 (路径上的 id 列表, 总分钟数)。
+    """
+    indegree = {task_id: 0 for task_id in tasks}
+    for task_id in tasks:
+        for after in successors.get(task_id, ()):
+            if after in indegree:
+                indegree[after] += 1
+
+    best = {task_id: tasks[task_id] for task_id in tasks}
+    parent = {}
+    queue = deque(task_id for task_id, degree in indegree.items() if degree == 0)
+    visited = 0
+    while queue:
+        node = queue.popleft()
+        visited += 1
+        for after in successors.get(node, ()):
+            if after not in indegree:
+                continue
+            if best[node] + tasks[after] > best[after]:
+                best[after] = best[node] + tasks[after]
+                parent[after] = node
+            indegree[after] -= 1
+            if indegree[after] == 0:
+                queue.append(after)
+    if visited != len(tasks):
+        raise DependencyCycle("依赖图中存在循环。")
+    if not tasks:
+        return [], 0
+
+    end = max(best, key=best.get)
+    path = [end]
+    while path[-1] in parent:
+        path.append(parent[path[-1]])
+    path.reverse()
+    return path, best[end]
+
+
+@receiver(post_save, sender=TaskDependency)
+@receiver(post_delete, sender=TaskDependency)
+def dependency_changed(sender, instance, using, **kwargs):
+    # 提交后再换版本：否则别的请求可能在提交前按新版本号缓存一份缺了这条边的图
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_graph(user_id), using=using)
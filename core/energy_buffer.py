@@ -0,0 +1,212 @@
+"""
+EnergyLog 写后缓冲 (write-behind)。
+
+开启 ENERGY_LOG_WRITE_BEHIND 后，新样本先追加到本地日志文件（每行一个 JSON，fsync 后即确认），
+攒够 ENERGY_LOG_BUFFER_MAX_BYTES 字节或最早一条超过 ENERGY_LOG_BUFFER_MAX_AGE 秒时
+一次性 bulk_create 进数据库，把每条一个 SQLite 事务变成每批一个。
+也可以由 flush_energy_buffer 命令定时刷。读接口通过 pending_for_user() 合并未落库的样本。
+
+多进程并发：追加时持有 journal.lock 共享锁；刷写时先拿 flush.lock 排他锁（同一时间只有一个刷写者），
+再短暂拿 journal.lock 排他锁把日志改名，之后的追加写进新文件。
+改名后的 .flushing 文件按分片逐批入库，每批提交后立即把这批行从文件里去掉；
+"提交 + 去掉"在 state.lock 排他锁里做，pending_for_user() 持共享锁读，不会把同一条样本既算作未入库又查到已入库。
+去掉之前崩溃的话，重跑时这一批会重复入库（至多一批）。
+无法解析的行（写到一半的行、损坏的行）记日志后跳过。
+"""
+import fcntl
+import glob
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .energy_profile import record_energy_logs
+from .models import EnergyLog
+from .sharding import db_for_user
+
+SAMPLE_FIELDS = ('user_id', 'timestamp', 'energy_level', 'current_activity_type')
+
+logger = logging.getLogger('core.energy_buffer')
+
+
+def enabled():
+    return getattr(settings, 'ENERGY_LOG_WRITE_BEHIND', False)
+
+
+def _paths():
+    journal = str(getattr(settings, 'ENERGY_LOG_BUFFER_PATH'))
+    return journal, journal + '.lock', journal + '.flush.lock', journal + '.state.lock'
+
+
+@contextmanager
+def _locked(path, mode):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def append(samples):
+    """
+    把样本追加进日志并落盘，返回是否已满足刷写条件。
+    samples 的元素是含 SAMPLE_FIELDS 的 dict，timestamp 为 datetime。
+    """
+    journal, journal_lock, _, _ = _paths()
+    received_at = time.time()
+    lines = ''.join(
+        json.dumps({
+            'user_id': sample['user_id'],
+            'timestamp': sample['timestamp'].isoformat(),
+            'energy_level': sample.get('energy_level'),
+            'current_activity_type': sample.get('current_activity_type'),
+            'received_at': received_at,
+        }, ensure_ascii=False) + '\n'
+        for sample in samples
+    )
+    with _locked(journal_lock, fcntl.LOCK_SH):
+        with open(journal, 'a', encoding='utf-8') as out:
+            out.write(lines)
+            out.flush()
+            if getattr(settings, 'ENERGY_LOG_BUFFER_FSYNC', True):
+                os.fsync(out.fileno())
+    return should_flush()
+
+
+def should_flush():
+    journal, _, _, _ = _paths()
+    try:
+        if os.path.getsize(journal) >= getattr(settings, 'ENERGY_LOG_BUFFER_MAX_BYTES', 64 * 1024):
+            return True
+        with open(journal, encoding='utf-8', errors='replace') as source:
+            first = source.readline()
+    except OSError:
+        return False
+    if not first.endswith('\n'):
+        return False
+    row = _parse(first, journal)
+    if row is None:
+        # 第一行坏了：刷一次，刷写时会跳过它
+        return True
+    return time.time() - row['received_at'] >= getattr(settings, 'ENERGY_LOG_BUFFER_MAX_AGE', 5)
+
+
+def _parse(line, path):
+    try:
+        row = json.loads(line)
+        if not isinstance(row, dict) or parse_datetime(row['timestamp']) is None:
+            raise ValueError("timestamp 无效")
+        row['user_id'], row['received_at'] = int(row['user_id']), float(row['received_at'])
+        row.setdefault('energy_level', None)
+        row.setdefault('current_activity_type', None)
+    except (ValueError, TypeError, KeyError) as exc:
+        logger.warning("跳过精力缓冲里无法解析的一行 (%s): %s: %r", path, exc, line[:200])
+        return None
+    return row
+
+
+def _read(path):
+    rows = []
+    try:
+        with open(path, encoding='utf-8', errors='replace') as source:
+            for line in source:
+                # 只认完整的行，进程崩溃时可能留下半行
+                if line.endswith('\n'):
+                    row = _parse(line, path)
+                    if row is not None:
+                        rows.append(row)
+    except FileNotFoundError:
+        pass
+    return rows
+
+
+def _rewrite(path, rows):
+    """把 path 换成只含 rows 的文件；rows 为空时删除。"""
+    if not rows:
+        os.remove(path)
+        return
+    partial = path + '.part'
+    with open(partial, 'w', encoding='utf-8') as out:
+        out.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(partial, path)
+
+
+def _to_instance(row):
+    return EnergyLog(
+        user_id=row['user_id'], timestamp=parse_datetime(row['timestamp']),
+        energy_level=row['energy_level'], current_activity_type=row['current_activity_type'],
+    )
+
+
+def flush():
+    """把缓冲的样本写入数据库，返回写入条数；已有别的进程在刷写时直接返回 0。"""
+    journal, journal_lock, flush_lock, state_lock = _paths()
+    os.makedirs(os.path.dirname(flush_lock) or '.', exist_ok=True)
+    with open(flush_lock, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        try:
+            with _locked(journal_lock, fcntl.LOCK_EX):
+                if os.path.exists(journal):
+                    os.rename(journal, f"{journal}.{os.getpid()}.{time.time_ns()}.flushing")
+            written = 0
+            # 也处理之前刷写中途崩溃留下的文件
+            for path in sorted(glob.glob(f"{glob.escape(journal)}.*.flushing")):
+                rows = _read(path)
+                # 一个文件里可能有多个分片的用户，按库分组各写一批
+                by_shard = {}
+                for row in rows:
+                    by_shard.setdefault(db_for_user(row['user_id']), []).append(row)
+                remaining = rows
+                for using, shard_rows in by_shard.items():
+                    with _locked(state_lock, fcntl.LOCK_EX):
+                        with transaction.atomic(using=using):
+                            saved = EnergyLog.objects.using(using).bulk_create(
+                                [_to_instance(row) for row in shard_rows], batch_size=500)
+                            on_energy_logs_saved(saved)
+                        # 已提交的行马上从文件里去掉，读接口不会再把它们当作未入库
+                        remaining = [row for row in remaining if db_for_user(row['user_id']) != using]
+                        _rewrite(path, remaining)
+                    written += len(shard_rows)
+                if not rows:
+                    os.remove(path)
+            return written
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def pending_for_user(user_id):
+    """某个用户还在缓冲里、尚未入库的样本（未保存的 EnergyLog 实例，按时间倒序）。"""
+    journal, journal_lock, _, state_lock = _paths()
+    with _locked(state_lock, fcntl.LOCK_SH), _locked(journal_lock, fcntl.LOCK_SH):
+        paths = sorted(glob.glob(f"{glob.escape(journal)}.*.flushing")) + [journal]
+        rows = [row for path in paths for row in _read(path) if row['user_id'] == user_id]
+    instances = [_to_instance(row) for row in rows]
+    instances.sort(key=lambda obj: obj.timestamp, reverse=True)
+    return instances
+
+
+def on_energy_logs_saved(objs):
+    """精力样本入库后的钩子，直接写库和缓冲刷写两条路径都会调用。"""
+    record_energy_logs(objs)
+
+
+def sample_from_validated(user, validated_data):
+    return {
+        'user_id': user.pk,
+        'timestamp': validated_data.get('timestamp') or timezone.now(),
+        'energy_level': validated_data.get('energy_level'),
+        'current_activity_type': validated_data.get('current_activity_type'),
+    }
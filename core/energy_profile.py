@@ -0,0 +1,177 @@
+"""
+按 星期×小时 的精力画像 (EnergyProfile)。
+
+每条精力日志入库时只更新它落在的那一格：先把整张表按指数衰减到样本时间，再加上这条样本，
+历史数据不需要重新扫描。半衰期为 ENERGY_PROFILE_HALF_LIFE_DAYS，越近的样本权重越大。
+某一格的精力水平 = 衰减后的点数之和 / 衰减后的权重（高=3，中=2，低=1）。
+"""
+import struct
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ENERGY_LEVEL_POINTS, EnergyLevel, EnergyProfile, Task
+from .sharding import use_user
+
+CELLS = 7 * 24
+_PACK = struct.Struct(f'<{CELLS}f')
+
+# 权重低于这个值的格子视为样本不足
+MIN_CELL_WEIGHT = 1.0
+HIGH_LEVEL = 2.5
+LOW_LEVEL = 1.5
+SUGGESTED_TASK_LIMIT = 10
+
+UNSUGGESTED_STATUSES = [Task.TaskStatus.COMPLETED, Task.TaskStatus.CANCELLED]
+
+
+def _half_life_seconds():
+    return getattr(settings, 'ENERGY_PROFILE_HALF_LIFE_DAYS', 30) * 86400
+
+
+def cell_index(moment):
+    local = timezone.localtime(moment)
+    return local.weekday() * 24 + local.hour
+
+
+def unpack(blob):
+    return list(_PACK.unpack(bytes(blob))) if blob else [0.0] * CELLS
+
+
+def pack(values):
+    return _PACK.pack(*values)
+
+
+def apply_samples(level_sums, weights, decayed_to, samples):
+    """
+    把 (时间, 点数) 样本并入数组，返回新的衰减基准时间。
+    整张表只衰减一次（到这批里最新的样本时间），每个样本再按它距基准的时间打折后加入，
+    结果与逐条衰减相同；早于基准的样本（离线补传）也一样处理。
+    """
+    if not samples:
+        return decayed_to
+    half_life = _half_life_seconds()
+    newest = max(moment for moment, _ in samples)
+    if decayed_to is None or newest > decayed_to:
+        if decayed_to is not None:
+            factor = 0.5 ** ((newest - decayed_to).total_seconds() / half_life)
+            for i in range(CELLS):
+                level_sums[i] *= factor
+                weights[i] *= factor
+        decayed_to = newest
+    for moment, points in samples:
+        index = cell_index(moment)
+        weight = 0.5 ** ((decayed_to - moment).total_seconds() / half_life)
+        level_sums[index] += points * weight
+        weights[index] += weight
+    return decayed_to
+
+
+def _samples(logs):
+    return [(log.timestamp, ENERGY_LEVEL_POINTS[log.energy_level])
+            for log in logs if log.energy_level in ENERGY_LEVEL_POINTS]
+
+
+def record_energy_logs(logs):
+    """精力日志入库后调用：按用户把新样本并入画像。"""
+    by_user = defaultdict(list)
+    for log in logs:
+        by_user[log.user_id].append(log)
+    for user_id, user_logs in by_user.items():
+        samples = _samples(user_logs)
+        if samples:
+            _update_profile(user_id, samples)
+
+
+def _update_profile(user_id, samples, attempts=5):
+    for _ in range(attempts):
+        with use_user(user_id) as using, transaction.atomic(using=using):
+            profile, created = EnergyProfile.objects.get_or_create(
+                user_id=user_id,
+                defaults={'level_sums': pack([0.0] * CELLS), 'weights': pack([0.0] * CELLS),
+                          'decayed_to': min(moment for moment, _ in samples)},
+            )
+            level_sums, weights = unpack(profile.level_sums), unpack(profile.weights)
+            decayed_to = apply_samples(level_sums, weights, profile.decayed_to, samples)
+            updated = EnergyProfile.objects.filter(pk=profile.pk, version=profile.version).update(
+                level_sums=pack(level_sums), weights=pack(weights), decayed_to=decayed_to,
+                sample_count=profile.sample_count + len(samples), version=profile.version + 1,
+            )
+            if updated:
+                return
+    raise RuntimeError(f"精力画像更新冲突过多 (user_id={user_id})")
+
+
+def rebuild_profile(user_id, logs):
+    """用完整历史重建某个用户的画像（初始化或批量导入后使用）。logs 为 (时间, 精力水平) 迭代器。"""
+    level_sums, weights = [0.0] * CELLS, [0.0] * CELLS
+    decayed_to = None
+    count = 0
+    batch = []
+    for moment, level in logs:
+        if level in ENERGY_LEVEL_POINTS:
+            batch.append((moment, ENERGY_LEVEL_POINTS[level]))
+        if len(batch) >= 5000:
+            decayed_to = apply_samples(level_sums, weights, decayed_to, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        decayed_to = apply_samples(level_sums, weights, decayed_to, batch)
+        count += len(batch)
+    with use_user(user_id):
+        if decayed_to is None:
+            EnergyProfile.objects.filter(user_id=user_id).delete()
+            return 0
+        EnergyProfile.objects.update_or_create(user_id=user_id, defaults={
+            'level_sums': pack(level_sums), 'weights': pack(weights), 'decayed_to': decayed_to,
+            'sample_count': count,
+        })
+    return count
+
+
+def describe(profile):
+    """画像转成接口输出：7×24 的精力水平（样本不足为 None）和高、低精力时段。profile 可以为 None。"""
+    if profile is None:
+        profile = EnergyProfile(level_sums=b'', weights=b'', decayed_to=None)
+    level_sums, weights = unpack(profile.level_sums), unpack(profile.weights)
+    levels = [
+        round(level_sums[i] / weights[i], 2) if weights[i] >= MIN_CELL_WEIGHT else None
+        for i in range(CELLS)
+    ]
+    return {
+        'sample_count': profile.sample_count,
+        'decayed_to': profile.decayed_to,
+        'levels': [levels[day * 24:(day + 1) * 24] for day in range(7)],
+        'weights': [[round(w, 2) for w in weights[day * 24:(day + 1) * 24]] for day in range(7)],
+        'high_energy_hours': [
+            {'weekday': i // 24, 'hour': i % 24, 'level': level}
+            for i, level in enumerate(levels) if level is not None and level >= HIGH_LEVEL
+        ],
+        'low_energy_hours': [
+            {'weekday': i // 24, 'hour': i % 24, 'level': level}
+            for i, level in enumerate(levels) if level is not None and level <= LOW_LEVEL
+        ],
+    }
+
+
+def level_at(profile, moment):
+    if profile is None:
+        return None
+    index = cell_index(moment)
+    weights = unpack(profile.weights)
+    if weights[index] < MIN_CELL_WEIGHT:
+        return None
+    return round(unpack(profile.level_sums)[index] / weights[index], 2)
+
+
+def suggested_tasks(user, limit=SUGGESTED_TASK_LIMIT):
+    """高精力时段适合做的任务：未结束、精力预估为高，按优先级和截止日期排序。"""
+    return list(
+        Task.objects.filter(user=user, energy_level_estimate=EnergyLevel.HIGH)
+        .exclude(status__in=UNSUGGESTED_STATUSES)
+        .order_by('priority', F('end_date').asc(nulls_last=True), 'id')
+        .values('id', 'name', 'priority', 'end_date', 'estimated_time_minutes', 'status')[:limit]
+    )
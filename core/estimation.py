@@ -0,0 +1,162 @@
+"""
+预估准确度统计：已完成任务的 实际分钟数 / 预估分钟数，按标签、类型、优先级、精力预估分组。
+
+一条 SQL 在数据库里算完：递归 CTE 拆逗号分隔的标签，CUME_DIST() 窗口函数求每组的分位数，
+再 GROUP BY 汇总，不把任务逐条读进 Python。
+结果按用户缓存，有任务完成、已完成的任务被修改 / 重新打开 / 删除，或者给已完成的任务补记工时时作废。
+"""
+from django.core.cache import cache
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Task, split_tags
+from .sharding import db_for_user
+
+DIMENSIONS = ['tag', 'type', 'priority', 'energy_level_estimate']
+
+# 一组样本少于这个数时不拿来修正预估
+MIN_SAMPLES = 5
+
+STATS_TIMEOUT = 24 * 3600
+
+_STATS_SQL = """
+WITH RECURSIVE done AS (
+    SELECT id, tags, type, priority, energy_level_estimate,
+           estimated_time_minutes AS est, actual_time_minutes AS act,
+           CAST(actual_time_minutes AS REAL) / estimated_time_minutes AS ratio
+    FROM {task_table}
+    WHERE user_id = %s AND status = %s AND estimated_time_minutes > 0 AND actual_time_minutes > 0
+),
+split(id, tag, rest) AS (
+    SELECT id, '', tags || ',' FROM done
+    UNION ALL
+    SELECT id, TRIM(SUBSTR(rest, 1, INSTR(rest, ',') - 1)), SUBSTR(rest, INSTR(rest, ',') + 1)
+    FROM split WHERE rest <> ''
+),
+samples AS (
+    SELECT 'tag' AS dimension, t.tag AS value, done.ratio, done.est, done.act
+    FROM (SELECT DISTINCT id, tag FROM split WHERE tag <> '') t JOIN done ON done.id = t.id
+    UNION ALL
+    SELECT 'type', type, ratio, est, act FROM done WHERE type <> ''
+    UNION ALL
+    SELECT 'priority', CAST(priority AS TEXT), ratio, est, act FROM done
+    UNION ALL
+    SELECT 'energy_level_estimate', energy_level_estimate, ratio, est, act FROM done
+    WHERE energy_level_estimate <> ''
+    UNION ALL
+    SELECT 'all', '', ratio, est, act FROM done
+),
+ranked AS (
+    SELECT dimension, value, ratio, est, act,
+           CUME_DIST() OVER (PARTITION BY dimension, value ORDER BY ratio) AS cd
+    FROM samples
+)
+SELECT dimension, value, COUNT(*), SUM(est), SUM(act), AVG(ratio),
+       MIN(CASE WHEN cd >= 0.5 THEN ratio END),
+       MIN(CASE WHEN cd >= 0.9 THEN ratio END)
+FROM ranked
+GROUP BY dimension, value
+ORDER BY dimension, value
+"""
+
+
+def _version_key(user_id):
+    return f"estimation:version:{user_id}"
+
+
+def _stats_key(user_id, version):
+    return f"estimation:stats:{user_id}:{version}"
+
+
+def invalidate_estimation_stats(user_id):
+    # 换版本号而不是删键：正在计算的旧结果即使晚写入缓存也不会再被读到
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), 1, timeout=None)
+
+
+def compute_estimation_stats(user_id):
+    sql = _STATS_SQL.format(task_table=Task._meta.db_table)
+    with connections[db_for_user(user_id)].cursor() as cursor:
+        cursor.execute(sql, [user_id, Task.TaskStatus.COMPLETED])
+        rows = cursor.fetchall()
+
+    stats = {'sample_size': 0, 'overall': None, 'groups': {dimension: [] for dimension in DIMENSIONS}}
+    for dimension, value, count, est, act, mean_ratio, p50, p90 in rows:
+        group = {
+            'value': value,
+            'count': count,
+            'estimated_minutes': est,
+            'actual_minutes': act,
+            'ratio': round(act / est, 3),
+            'mean_ratio': round(mean_ratio, 3),
+            'p50_ratio': round(p50, 3),
+            'p90_ratio': round(p90, 3),
+        }
+        if dimension == 'all':
+            stats['sample_size'] = count
+            stats['overall'] = group
+        else:
+            stats['groups'][dimension].append(group)
+    return stats
+
+
+def get_estimation_stats(user_id):
+    version = cache.get(_version_key(user_id), 0)
+    key = _stats_key(user_id, version)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_estimation_stats(user_id)
+        cache.set(key, stats, timeout=STATS_TIMEOUT)
+    return stats
+
+
+def correction_factors(stats):
+    """{(维度, 值): (p50 比值, 样本数)}，只保留样本够多的组。"""
+    factors = {
+        (dimension, group['value']): (group['p50_ratio'], group['count'])
+        for dimension, groups in stats['groups'].items()
+        for group in groups
+        if group['count'] >= MIN_SAMPLES
+    }
+    overall = stats['overall']
+    if overall and overall['count'] >= MIN_SAMPLES:
+        factors[('all', '')] = (overall['p50_ratio'], overall['count'])
+    return factors
+
+
+def corrected_estimate(task, factors):
+    """
+    用任务所属各组的 p50 比值（按样本数加权）修正预估分钟数；
+    没有一组样本够多时退回全部任务的 p50，仍不够则返回 None。
+    """
+    if not task.estimated_time_minutes:
+        return None
+    keys = [('tag', tag) for tag in dict.fromkeys(split_tags(task.tags))]
+    keys += [('type', task.type), ('priority', str(task.priority)),
+             ('energy_level_estimate', task.energy_level_estimate)]
+    matched = [factors[key] for key in keys if key in factors]
+    if not matched:
+        matched = [factors[('all', '')]] if ('all', '') in factors else []
+    if not matched:
+        return None
+    weight = sum(count for _, count in matched)
+    ratio = sum(p50 * count for p50, count in matched) / weight
+    return round(task.estimated_time_minutes * ratio)
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, **kwargs):
+    # 保存前或保存后是已完成都会影响统计（重新打开的任务要从样本里去掉）
+    previous = getattr(instance, '_loaded_status', None)
+    if Task.TaskStatus.COMPLETED in (previous, instance.status):
+        invalidate_estimation_stats(instance.user_id)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    if instance.status == Task.TaskStatus.COMPLETED:
+        invalidate_estimation_stats(instance.user_id)
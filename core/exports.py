@@ -0,0 +1,135 @@
+"""
+历史数据导出 (CSV / NDJSON，可选 gzip)。
+
+直接在 values_list() 上用 iterator(chunk_size=...) 逐批取行、逐块编码输出，
+不经过序列化器，也不在内存里攒完整结果，行数再多内存占用也基本不变。
+"""
+import csv
+import datetime
+import io
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Sum
+
+from .archive import ARCHIVE_SOURCES, iter_log_rows
+from .models import ArchivedLogBatch, EnergyLog, Task, WorkLog
+
+EXPORT_CHUNK_SIZE = 2000
+# 攒到这么多字节再往外吐一次，避免每行一个小块
+FLUSH_BYTES = 64 * 1024
+
+EXPORTS = {
+    'worklog': (WorkLog, [
+        'id', 'task_ref_id', 'task_name_snapshot', 'task_source', 'timestamp_start', 'timestamp_end',
+        'duration_minutes', 'user_reported_status_at_end', 'energy_cost', 'tags_snapshot', 'logged_at',
+    ]),
+    'energylog': (EnergyLog, [
+        'id', 'timestamp', 'energy_level', 'current_activity_type',
+    ]),
+    'tasks': (Task, [
+        'id', 'name', 'short_term_goal_ref_id', 'long_term_goal_ref_id', 'priority', 'energy_level_estimate',
+        'tags', 'estimated_time_minutes', 'actual_time_minutes', 'start_date', 'end_date', 'completion_date',
+        'status', 'type', 'created_at',
+    ]),
+}
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+_encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+
+def _cell(value):
+    # 日期时间统一用 JSON 里的 ISO 格式，CSV 和 NDJSON 输出保持一致
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.time)):
+        return _encoder.default(value)
+    return value
+
+
+def export_rows(kind, user):
+    """逐批读出某个用户的一类历史数据，返回 (列名, 行迭代器)。日志类数据包含已归档的部分。"""
+    model, columns = EXPORTS[kind]
+    if kind in ARCHIVE_SOURCES:
+        return columns, iter_log_rows(kind, user, columns, chunk_size=EXPORT_CHUNK_SIZE)
+    rows = (model.objects.filter(user=user).order_by('id')
+            .values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    return columns, rows
+
+
+def count_rows(kind, user):
+    """export_rows 会输出的行数（归档部分按批次记录的行数相加，不解压），用来估算后台导出的进度。"""
+    model, _ = EXPORTS[kind]
+    total = model.objects.filter(user=user).count()
+    if kind in ARCHIVE_SOURCES:
+        archived = ArchivedLogBatch.objects.filter(user=user, kind=kind).aggregate(n=Sum('row_count'))['n']
+        total += archived or 0
+    return total
+
+
+def _counted(rows, progress):
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % EXPORT_CHUNK_SIZE == 0:
+            progress(count)
+    progress(count)
+
+
+def iter_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_cell(value) for value in row])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(columns, rows):
+    parts = []
+    size = 0
+    for row in rows:
+        line = _encoder.encode(dict(zip(columns, row))) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(parts).encode('utf-8')
+            parts = []
+            size = 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+
+def iter_gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)  # wbits+16 = gzip 格式
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(kind, user, fmt='csv', compress=False, progress=None):
+    """返回 (字节块迭代器, Content-Type, 文件名)。给了 progress 时每输出一批行调用 progress(已输出行数)。"""
+    columns, rows = export_rows(kind, user)
+    if progress is not None:
+        rows = _counted(rows, progress)
+    chunks = iter_csv(columns, rows) if fmt == 'csv' else iter_ndjson(columns, rows)
+    filename = f"{kind}.{fmt}"
+    content_type = FORMATS[fmt]
+    if compress:
+        chunks = iter_gzip(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    return chunks, content_type, filename
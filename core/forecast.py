@@ -0,0 +1,140 @@
+"""
+未来几周的 可用时间 vs 任务需求 预测。
+
+可用时间：每日工作时长减去当天的固定日程。固定日程先按重复类型展开成
+"星期几" 和 "几号" 两张掩码表（7 格 / 32 格），每天的占用 = 两张表各查一次，与日程条数无关。
+
+需求：每个未结束任务剩余的预估分钟数平摊到 [开始日期, 截止日期] 的每一天。
+用差分数组实现——每个任务只在区间两端各加减一次，最后做一次前缀和，
+复杂度 O(任务数 + 天数)，不按 任务×天 循环。
+"""
+from array import array
+from datetime import timedelta
+from itertools import accumulate
+
+from django.db.models import Q
+
+from .models import FixedSchedule, Task, UserSetting
+
+OPEN_TASK_EXCLUDED_STATUSES = [Task.TaskStatus.COMPLETED, Task.TaskStatus.CANCELLED]
+
+DEFAULT_WEEKS = 4
+MAX_WEEKS = 52
+
+
+def parse_days_of_week(value):
+    days = set()
+    for part in (value or '').split(','):
+        part = part.strip()
+        if part.isdigit() and int(part) < 7:
+            days.add(int(part))
+    return days
+
+
+def schedule_masks(schedules):
+    """
+    把固定日程展开成 (按星期几的占用分钟数[7], 按几号的占用分钟数[32])。
+    schedules 为 (重复类型, 时长, 星期几, 几号) 元组。
+    """
+    by_weekday = [0] * 7
+    by_day_of_month = [0] * 32
+    Recurrence = FixedSchedule.RecurrenceType
+    for recurrence, minutes, days_of_week, day_of_month in schedules:
+        if recurrence == Recurrence.DAILY:
+            weekdays = range(7)
+        elif recurrence == Recurrence.WORKDAY:
+            weekdays = range(5)
+        elif recurrence == Recurrence.WEEKEND:
+            weekdays = (5, 6)
+        elif recurrence == Recurrence.WEEKLY:
+            weekdays = parse_days_of_week(days_of_week)
+        else:
+            weekdays = ()
+            if recurrence == Recurrence.MONTHLY and day_of_month:
+                by_day_of_month[day_of_month] += minutes
+        for weekday in weekdays:
+            by_weekday[weekday] += minutes
+    return by_weekday, by_day_of_month
+
+
+def capacity_by_day(start, days, work_minutes, schedules):
+    by_weekday, by_day_of_month = schedule_masks(schedules)
+    capacity = array('d', bytes(8 * days))
+    for i in range(days):
+        day = start + timedelta(days=i)
+        capacity[i] = max(0, work_minutes - by_weekday[day.weekday()] - by_day_of_month[day.day])
+    return capacity
+
+
+def spread_demand(start, days, tasks):
+    """
+    tasks 为 (剩余分钟数, 开始日期, 截止日期) 元组，返回 (每日需求, 已逾期分钟数, 无截止日期分钟数)。
+    已逾期的剩余量全部算在第一天；没有开始日期的从第一天起算；区间超出预测范围的部分只计入范围内的天。
+    """
+    diff = array('d', bytes(8 * (days + 1)))
+    origin = start.toordinal()
+    overdue = 0
+    unscheduled = 0
+    for remaining, start_date, end_date in tasks:
+        if remaining <= 0:
+            continue
+        if end_date is None:
+            unscheduled += remaining
+            continue
+        last = end_date.toordinal() - origin
+        if last < 0:
+            overdue += remaining
+            diff[0] += remaining
+            diff[1] -= remaining
+            continue
+        first = max(start_date.toordinal() - origin, 0) if start_date else 0
+        if first > last:
+            first = last
+        if first >= days:
+            continue
+        rate = remaining / (last - first + 1)
+        diff[first] += rate
+        diff[min(last, days - 1) + 1] -= rate
+    demand = array('d', accumulate(diff[:days]))
+    return demand, overdue, unscheduled
+
+
+def build_forecast(user, start, weeks=DEFAULT_WEEKS):
+    days = weeks * 7
+    setting = UserSetting.objects.filter(user=user).values_list('daily_work_hours', flat=True).first()
+    work_minutes = round((setting if setting is not None else 8.0) * 60)
+    schedules = FixedSchedule.objects.filter(user_setting__user=user).values_list(
+        'recurrence_type', 'duration_minutes', 'days_of_week', 'day_of_month'
+    )
+    horizon_end = start + timedelta(days=days - 1)
+    tasks = (
+        (max(estimated - actual, 0), start_date, end_date)
+        for estimated, actual, start_date, end_date in Task.objects.filter(
+            Q(start_date__lte=horizon_end) | Q(start_date__isnull=True),
+            user=user, estimated_time_minutes__gt=0,
+        ).exclude(status__in=OPEN_TASK_EXCLUDED_STATUSES).values_list(
+            'estimated_time_minutes', 'actual_time_minutes', 'start_date', 'end_date'
+        ).iterator(chunk_size=2000)
+    )
+    capacity = capacity_by_day(start, days, work_minutes, schedules)
+    demand, overdue, unscheduled = spread_demand(start, days, tasks)
+
+    result_days = []
+    for i in range(days):
+        day_demand = round(demand[i])
+        result_days.append({
+            'date': start + timedelta(days=i),
+            'capacity_minutes': round(capacity[i]),
+            'demand_minutes': day_demand,
+            'overcommitted': day_demand > capacity[i],
+        })
+    return {
+        'from': start,
+        'to': horizon_end,
+        'work_minutes_per_day': work_minutes,
+        'overdue_minutes': overdue,
+        'unscheduled_minutes': unscheduled,
+        'overcommitted_days': [day['date'] for day in result_days if day['overcommitted']],
+        'days': result_days,
+    }
+
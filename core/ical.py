@@ -0,0 +1,237 @@
+"""
+日历订阅 (iCalendar)。
+
+每个用户一个带令牌的订阅地址，日历应用每隔几分钟轮询一次。内容包括：
+固定日程（按重复类型直接写 RRULE，不展开成具体日期）、未结束任务的截止日期、近期及以后的每日待办。
+
+生成好的 ICS 连同 ETag 放进缓存，缓存键里带着该用户的改动时间戳和全局改动时间戳。
+日程、任务、每日待办有改动时（模型信号，批量写入的路径手动调用 invalidate_calendar）只换时间戳，
+旧内容不再被读到。大多数轮询只读几个缓存键，再按 ETag / Last-Modified 返回 304。
+
+输出只取决于任务名称、截止日期和是否已结束，所以阻塞 / 推迟这类状态的批量 update() 不需要作废缓存。
+"""
+import hashlib
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .authentication import generate_token, hash_token
+from .forecast import parse_days_of_week
+from .models import CalendarFeed, FixedSchedule, Task, TodayTask
+from .sharding import use_user
+
+# 每日待办输出最近这么多天以来的（以后的全部输出）
+TODAY_TASK_PAST_DAYS = 30
+
+FEED_TIMEOUT = 24 * 3600
+# 订阅令牌 -> 用户 的缓存时间；关闭或更换地址后，其它进程里的旧令牌最多这么久后失效
+TOKEN_CACHE_TTL = 3600
+
+# 固定日程没有开始日期，RRULE 统一从这一周算起（2024-01-01 是周一，1 月有 31 天）
+RECURRENCE_EPOCH = date(2024, 1, 1)
+
+FINISHED_STATUSES = [Task.TaskStatus.COMPLETED, Task.TaskStatus.CANCELLED]
+
+PRODID = "-//scarcity//calendar feed//ZH"
+BYDAY = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+_ALL_USERS_KEY = "calendar:changed:all"
+
+
+def _changed_key(user_id):
+    return f"calendar:changed:{user_id}"
+
+
+def _token_key(digest):
+    return f"calendar:token:{digest}"
+
+
+def invalidate_calendar(user_id=None):
+    """日程、任务或每日待办改动后调用；一次改动所有用户（例如夜间顺延）时传 None。"""
+    # 换时间戳而不是删缓存：正在生成的旧内容即使晚写入也不会再被读到
+    cache.set(_ALL_USERS_KEY if user_id is None else _changed_key(user_id), time.time(), timeout=None)
+
+
+def _changed_at(key):
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+# --- 订阅令牌 ---
+
+def create_feed(user):
+    """生成（或更换）订阅令牌，返回 (明文令牌, CalendarFeed)。原来的地址立即失效。"""
+    key, digest = generate_token()
+    old = CalendarFeed.objects.filter(user=user).values_list('key_hash', flat=True).first()
+    feed, _ = CalendarFeed.objects.update_or_create(user=user, defaults={
+        'key_hash': digest, 'prefix': key[:8], 'created_at': timezone.now(),
+    })
+    if old:
+        cache.delete(_token_key(old))
+    return key, feed
+
+
+def revoke_feed(user):
+    digests = list(CalendarFeed.objects.filter(user=user).values_list('key_hash', flat=True))
+    CalendarFeed.objects.filter(user=user).delete()
+    cache.delete_many([_token_key(digest) for digest in digests])
+
+
+def user_for_key(key):
+    """订阅令牌对应的用户 id，无效时返回 None。"""
+    digest = hash_token(key)
+    user_id = cache.get(_token_key(digest))
+    if user_id is None:
+        user_id = CalendarFeed.objects.filter(key_hash=digest).values_list('user_id', flat=True).first()
+        if user_id is not None:
+            cache.set(_token_key(digest), user_id, timeout=TOKEN_CACHE_TTL)
+    return user_id
+
+
+# --- ICS 生成 ---
+
+def _text(value):
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """RFC 5545：一行超过 75 字节时折行，续行以空格开头；按字符切，不拆开 UTF-8 多字节字符。"""
+    if len(line.encode('utf-8')) <= 75:
+        return line
+    parts, current, size, limit = [], [], 0, 75
+    for char in line:
+        width = len(char.encode('utf-8'))
+        if size + width > limit:
+            parts.append(''.join(current))
+            # 续行开头的空格占一个字节
+            current, size, limit = [], 0, 74
+        current.append(char)
+        size += width
+    parts.append(''.join(current))
+    return '\r\n '.join(parts)
+
+
+def _utc(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _dtstart(day, start_time):
+    """固定日程的开始时间按 settings.TIME_ZONE 的本地时间理解。"""
+    local = datetime.combine(day, start_time).strftime('%Y%m%dT%H%M%S')
+    if settings.TIME_ZONE == 'UTC':
+        return f"DTSTART:{local}Z"
+    # 主流日历应用都认 IANA 时区名，不另外生成 VTIMEZONE
+    return f"DTSTART;TZID={settings.TIME_ZONE}:{local}"
+
+
+def schedule_rule(recurrence, days_of_week, day_of_month):
+    """固定日程的 (RRULE, 第一次发生的日期)；规则不完整（每周没选星期几、每月没填几号）时返回 None。"""
+    Recurrence = FixedSchedule.RecurrenceType
+    if recurrence == Recurrence.DAILY:
+        return 'FREQ=DAILY', RECURRENCE_EPOCH
+    if recurrence == Recurrence.MONTHLY:
+        if not day_of_month:
+            return None
+        # 和容量预测一样，没有这一天的月份（如 2 月 30 日）跳过
+        return f'FREQ=MONTHLY;BYMONTHDAY={day_of_month}', RECURRENCE_EPOCH.replace(day=day_of_month)
+    if recurrence == Recurrence.WORKDAY:
+        weekdays = [0, 1, 2, 3, 4]
+    elif recurrence == Recurrence.WEEKEND:
+        weekdays = [5, 6]
+    else:
+        weekdays = sorted(parse_days_of_week(days_of_week))
+    if not weekdays:
+        return None
+    rrule = 'FREQ=WEEKLY;BYDAY=' + ','.join(BYDAY[day] for day in weekdays)
+    # DTSTART 本身必须是一次发生
+    return rrule, RECURRENCE_EPOCH + timedelta(days=weekdays[0])
+
+
+def _all_day(uid, day, summary, stamp, category):
+    return [
+        'BEGIN:VEVENT', f'UID:{uid}', f'DTSTAMP:{stamp}',
+        f'DTSTART;VALUE=DATE:{day:%Y%m%d}', f'DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}',
+        f'SUMMARY:{_text(summary)}', f'CATEGORIES:{category}',
+        # 全天的提醒类条目不占用忙闲时间
+        'TRANSP:TRANSPARENT', 'END:VEVENT',
+    ]
+
+
+def render_calendar(user_id, username, changed_at, today):
+    """生成 ICS 文本（CRLF 换行）。需要在该用户的分片上下文里调用。"""
+    stamp = _utc(changed_at)
+    lines = [
+        'BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_text(username)} 的日程', f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+    ]
+
+    schedules = FixedSchedule.objects.filter(user_setting_id=user_id).order_by('id').values_list(
+        'id', 'name', 'start_time', 'duration_minutes', 'recurrence_type', 'days_of_week', 'day_of_month')
+    for schedule_id, name, start_time, minutes, recurrence, days_of_week, day_of_month in schedules:
+        rule = schedule_rule(recurrence, days_of_week, day_of_month)
+        if rule is None:
+            continue
+        rrule, first_day = rule
+        lines += [
+            'BEGIN:VEVENT', f'UID:fixedschedule-{schedule_id}@scarcity', f'DTSTAMP:{stamp}',
+            _dtstart(first_day, start_time), f'DURATION:PT{minutes}M', f'RRULE:{rrule}',
+            f'SUMMARY:{_text(name)}', 'CATEGORIES:固定日程', 'END:VEVENT',
+        ]
+
+    deadlines = Task.objects.filter(user_id=user_id, end_date__isnull=False).exclude(
+        status__in=FINISHED_STATUSES).order_by('end_date', 'id').values_list('id', 'name', 'end_date')
+    for task_id, name, end_date in deadlines:
+        lines += _all_day(f'task-{task_id}-deadline@scarcity', end_date, f"截止：{name}", stamp, '任务截止')
+
+    entries = TodayTask.objects.filter(
+        user_id=user_id, date__gte=today - timedelta(days=TODAY_TASK_PAST_DAYS),
+    ).exclude(task__status=Task.TaskStatus.CANCELLED).order_by('date', 'id').values_list(
+        'id', 'date', 'task__name', 'task__status')
+    for entry_id, day, name, status in entries:
+        summary = f"✓ {name}" if status == Task.TaskStatus.COMPLETED else name
+        lines += _all_day(f'todaytask-{entry_id}@scarcity', day, summary, stamp, '每日待办')
+
+    lines.append('END:VCALENDAR')
+    return ''.join(_fold(line) + '\r\n' for line in lines)
+
+
+def get_feed(user_id):
+    """返回 (ICS 字节串, ETag, 最后修改时间)。"""
+    user_changed = _changed_at(_changed_key(user_id))
+    all_changed = _changed_at(_ALL_USERS_KEY)
+    changed_at = datetime.fromtimestamp(max(user_changed, all_changed), dt_timezone.utc)
+    # 每日待办按"今天"截取窗口，日期也放进键里
+    today = timezone.localdate()
+    key = f"calendar:feed:{user_id}:{user_changed}:{all_changed}:{today.isoformat()}"
+    cached = cache.get(key)
+    if cached is None:
+        username = User.objects.filter(pk=user_id).values_list('username', flat=True).first() or ''
+        with use_user(user_id):
+            body = render_calendar(user_id, username, changed_at, today).encode('utf-8')
+        cached = (body, '"%s"' % hashlib.md5(body).hexdigest())
+        cache.set(key, cached, timeout=FEED_TIMEOUT)
+    return cached[0], cached[1], changed_at
+
+
+@receiver(post_save, sender=FixedSchedule)
+@receiver(post_delete, sender=FixedSchedule)
+def schedule_changed(sender, instance, **kwargs):
+    invalidate_calendar(instance.user_setting_id)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=TodayTask)
+@receiver(post_delete, sender=TodayTask)
+def task_changed(sender, instance, **kwargs):
+    invalidate_calendar(instance.user_id)
@@ -0,0 +1,215 @@
+"""
+从其它工具批量导入任务和目标 (CSV / JSON / NDJSON)。
+
+逐行流式解析，按块校验：整个导入只建一个序列化器实例反复 run_validation，
+关联的目标名称每块一次 name__in 查询解析成 id，校验通过的行整块批量写入。
+出错的行不影响其它行，按行号汇报。
+"""
+import codecs
+import csv
+import json
+from collections.abc import Mapping
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.fields import SkipField, empty
+
+from .estimation import invalidate_estimation_stats
+from .ical import invalidate_calendar
+from .models import LongTermGoal, ShortTermGoal, Task
+from .serializers import LongTermGoalSerializer, ShortTermGoalSerializer, TaskSerializer
+
+IMPORT_CHUNK_SIZE = 1000
+
+# 导入类型 -> (模型, 序列化器, {行里的目标名称列: (外键字段, 目标模型)})
+IMPORT_KINDS = {
+    'long_term_goals': (LongTermGoal, LongTermGoalSerializer, {}),
+    'short_term_goals': (ShortTermGoal, ShortTermGoalSerializer, {}),
+    'tasks': (Task, TaskSerializer, {
+        'short_term_goal': ('short_term_goal_ref_id', ShortTermGoal),
+        'long_term_goal': ('long_term_goal_ref_id', LongTermGoal),
+    }),
+}
+
+IMPORT_FORMATS = ('csv', 'json', 'ndjson')
+
+
+def parse_rows(fileobj, fmt):
+    """把上传的字节流解析成逐行的 dict 迭代器。"""
+    if fmt == 'csv':
+        text = codecs.iterdecode(fileobj, 'utf-8-sig')
+        for row in csv.DictReader(text):
+            # CSV 里的空单元格当作没填
+            yield {key: value for key, value in row.items() if key and value not in ('', None)}
+    elif fmt == 'ndjson':
+        for line in codecs.iterdecode(fileobj, 'utf-8-sig'):
+            if line.strip():
+                yield json.loads(line)
+    else:
+        # 普通 JSON 数组没法边读边解析，整体载入；大文件请用 NDJSON
+        data = json.load(codecs.getreader('utf-8-sig')(fileobj))
+        if not isinstance(data, list):
+            raise ValueError("JSON 导入内容必须是数组。")
+        yield from data
+
+
+def _resolve_goal_names(user, chunk, references):
+    """每块对每种目标各查一次，返回 {列名: {名称: id}}。"""
+    lookups = {}
+    for column, (_, goal_model) in references.items():
+        names = {row[column] for _, row in chunk if isinstance(row, dict) and row.get(column)}
+        lookups[column] = dict(
+            goal_model.objects.filter(user=user, name__in=names).values_list('name', 'id')
+        ) if names else {}
+    return lookups
+
+
+def bulk_insert(model, rows, batch_size=500):
+    """
+    bulk_create 的精简版，rows 是以字段 attname 为键的 dict。
+    Django 5.0 的 bulk_create 每个字段每一行都要经过全局 connection 代理取 features，
+    导入上万行时这部分开销比 SQL 本身还大；这里字段列表和连接只解析一次，再 executemany。
+    auto_now / auto_now_add 填同一个当前时间，没给的字段用默认值（非 callable 的默认值只转换一次）。
+    不创建模型实例，也不触发信号。
+    """
+    conn = connections[router.db_for_write(model)]
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    now = timezone.now()
+    # 每列：(字段, 行里不给时用的数据库值, 是否每行重新取默认值, 是否 auto_now 列)
+    columns = []
+    for field in fields:
+        auto = getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        if auto:
+            value = now if field.get_internal_type() == 'DateTimeField' else now.date()
+        elif field.has_default() and callable(field.default):
+            columns.append((field, None, True, False))
+            continue
+        else:
+            value = field.get_default()
+        columns.append((field, None if value is None else field.get_db_prep_save(value, conn), False, auto))
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        conn.ops.quote_name(model._meta.db_table),
+        ', '.join(conn.ops.quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+
+    def prep(row):
+        params = []
+        for field, fixed, per_row_default, auto in columns:
+            if auto or (field.attname not in row and not per_row_default):
+                params.append(fixed)
+                continue
+            value = row[field.attname] if field.attname in row else field.get_default()
+            params.append(None if value is None else field.get_db_prep_save(value, conn))
+        return params
+
+    with conn.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, [prep(row) for row in rows[start:start + batch_size]])
+    return len(rows)
+
+
+class _ImportValidationMixin:
+    """
+    导入时整批共用一个校验器实例。DRF 每行都重新遍历全部 fields 筛可写字段和带默认值的只读字段，
+    而这一行没给、又不必填也没有默认值的字段反正会被跳过 (SkipField)；
+    这里两份字段列表只筛一次，每行只校验给了的字段和必填 / 有默认值的字段。
+    """
+    _import_row = {}
+
+    @cached_property
+    def _import_fields(self):
+        writable = [field for field in self.fields.values() if not field.read_only]
+        always = {field.field_name for field in writable if field.required or field.default is not empty}
+        return writable, always
+
+    @cached_property
+    def _read_only_default_fields(self):
+        return [
+            field for field in self.fields.values()
+            if field.read_only and field.default is not empty and field.source != '*' and '.' not in field.source
+        ]
+
+    def _read_only_defaults(self):
+        defaults = {}
+        for field in self._read_only_default_fields:
+            try:
+                defaults[field.source] = field.get_default()
+            except SkipField:
+                continue
+        return defaults
+
+    @property
+    def _writable_fields(self):
+        writable, always = self._import_fields
+        row = self._import_row
+        return [field for field in writable if field.field_name in row or field.field_name in always]
+
+    def to_internal_value(self, data):
+        self._import_row = data if isinstance(data, Mapping) else {}
+        return super().to_internal_value(data)
+
+
+def _import_validator(serializer_class, user):
+    validator_class = type(f'Import{serializer_class.__name__}', (_ImportValidationMixin, serializer_class), {})
+    return validator_class(context={'user': user})
+
+
+def import_rows(user, kind, rows, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    导入一批行，返回 {'created': n, 'errors': [{'row': 行号, 'errors': ...}]}。
+    行号从 1 开始（CSV 不含表头）。dry_run 时只校验不写入。
+    """
+    model, serializer_class, references = IMPORT_KINDS[kind]
+    # 外键用名称解析，不交给 PrimaryKeyRelatedField 逐行查库
+    validator = _import_validator(serializer_class, user)
+    created = 0
+    errors = []
+
+    def flush(chunk):
+        nonlocal created
+        lookups = _resolve_goal_names(user, chunk, references)
+        objs = []
+        for row_number, row in chunk:
+            if not isinstance(row, dict):
+                errors.append({'row': row_number, 'errors': {'non_field_errors': ["每行必须是一个对象。"]}})
+                continue
+            row = dict(row)
+            foreign_keys = {}
+            row_errors = {}
+            for column, (attname, _) in references.items():
+                row.pop(attname.removesuffix('_id'), None)
+                name = row.pop(column, None)
+                if name:
+                    if name in lookups[column]:
+                        foreign_keys[attname] = lookups[column][name]
+                    else:
+                        row_errors[column] = [f"找不到名为 '{name}' 的目标。"]
+            try:
+                validated = validator.run_validation(row)
+            except serializers.ValidationError as exc:
+                row_errors.update(exc.detail)
+            if row_errors:
+                errors.append({'row': row_number, 'errors': row_errors})
+                continue
+            objs.append({**validated, **foreign_keys, 'user_id': user.pk})
+        if objs and not dry_run:
+            bulk_insert(model, objs)
+        created += len(objs)
+
+    chunk = []
+    with transaction.atomic(using=router.db_for_write(model)):
+        for row_number, row in enumerate(rows, start=1):
+            chunk.append((row_number, row))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+    if model is Task and created and not dry_run:
+        # bulk_insert 不触发信号，导入的任务里可能有已完成的，也可能带截止日期
+        invalidate_estimation_stats(user.pk)
+        invalidate_calendar(user.pk)
+    return {'created': created, 'errors': errors}
@@ -0,0 +1,280 @@
+"""
+存在数据库里的后台任务队列 (Job)，不依赖外部消息队列。
+
+导出、导入、重建统计这类耗时操作由请求写一条 Job 后直接返回 202，
+runworker 命令轮询 Job 表，把领到的任务交给线程池或进程池执行；
+客户端轮询 /api/jobs/<id>/ 看进度，完成后从 /api/jobs/<id>/download/ 取结果文件。
+
+SQLite 不支持 SELECT … FOR UPDATE，领取任务分两步：先查出候选行，再用带原状态条件的 UPDATE 抢占，
+受影响行数为 1 才算抢到，多个 worker 抢同一行只有一个能成功。抢到的任务带租约（lease），
+worker 执行期间定期续租；worker 崩溃后租约过期，任务会被别的 worker 重新领取。
+失败的任务按指数退避重新排队，超过 max_attempts 次后标记失败。
+Job 在全局库里，处理函数在任务所属用户的分片上下文里执行。
+"""
+import csv
+import os
+import shutil
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import sharding
+from .archive import iter_log_rows
+from .energy_profile import rebuild_profile
+from .exports import count_rows, stream_export
+from .imports import import_rows, parse_rows
+from .journal import ROLLUP_COLUMNS, rebuild_rollups
+from .models import ArchivedLogBatch, Job
+
+# 处理函数最多每隔这么多秒汇报一次进度
+PROGRESS_INTERVAL = 1.0
+
+
+class JobError(Exception):
+    """不需要重试的失败（参数或上传文件有问题），直接标记失败。"""
+
+
+class LeaseLost(Exception):
+    """租约已过期并被别的 worker 接手，当前执行的结果作废。"""
+
+
+def lease_seconds():
+    return getattr(settings, 'JOB_LEASE_SECONDS', 300)
+
+
+def result_dir():
+    return Path(getattr(settings, 'JOB_RESULT_DIR', settings.BASE_DIR / 'var' / 'jobs'))
+
+
+def result_path(name):
+    return result_dir() / name
+
+
+def enqueue(user, kind, params=None):
+    return Job.objects.create(user=user, kind=kind, params=params or {},
+                              max_attempts=getattr(settings, 'JOB_MAX_ATTEMPTS', 3))
+
+
+def save_upload(fileobj, fmt):
+    """把上传内容存到结果目录下，返回相对路径；导入任务执行成功后删除。"""
+    name = f"uploads/{uuid.uuid4().hex}.{fmt}"
+    path = result_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as out:
+        if isinstance(fileobj, bytes):
+            out.write(fileobj)
+        else:
+            for chunk in fileobj.chunks():
+                out.write(chunk)
+    return name
+
+
+class Progress:
+    """
+    传给处理函数的进度回调：progress(已完成, 总数, 说明)。
+
+    处理函数往往正开着一个读游标（流式导出），在同一连接上写 Job 会碰上 SQLite 的快照冲突，
+    所以这里只把进度记到 board（线程模式是普通 dict，进程模式是 Manager().dict()），
+    由 runworker 主循环统一写库、续租。主循环发现租约已被别的 worker 接手时在 board 里做标记，
+    处理函数下次汇报进度时抛 LeaseLost 尽早停下。
+    """
+
+    def __init__(self, job_id, board):
+        self.job_id = job_id
+        self.board = board
+        self._last = 0.0
+
+    def __call__(self, done, total=None, message=''):
+        if self.board.get(('lost', self.job_id)):
+            raise LeaseLost()
+        now = time.monotonic()
+        if now - self._last < PROGRESS_INTERVAL:
+            return
+        self._last = now
+        # 100 留给完成时
+        percent = min(99, done * 100 // total) if total else 0
+        self.board[self.job_id] = (percent, message[:200])
+
+
+def claim(worker_id, limit=1):
+    """领取最多 limit 个可执行的任务，返回领到的 id 列表。"""
+    now = timezone.now()
+    # 租约过期、次数也用完的任务不再重试
+    Job.objects.filter(
+        status=Job.Status.RUNNING, lease_expires_at__lt=now, attempts__gte=F('max_attempts'),
+    ).update(status=Job.Status.FAILED, error="执行超时或 worker 退出，租约过期", finished_at=now,
+             locked_by='', lease_expires_at=None)
+
+    ready = Q(status=Job.Status.QUEUED, run_after__lte=now) | Q(status=Job.Status.RUNNING, lease_expires_at__lt=now)
+    # 多取一些候选，别的 worker 抢走一部分时还能领够
+    candidates = Job.objects.filter(ready).order_by('run_after', 'id').values_list(
+        'id', 'status', 'locked_by')[:limit * 4]
+    claimed = []
+    for job_id, status, locked_by in candidates:
+        if len(claimed) >= limit:
+            break
+        updated = Job.objects.filter(pk=job_id, status=status, locked_by=locked_by).filter(ready).update(
+            status=Job.Status.RUNNING, locked_by=worker_id, lease_expires_at=now + timedelta(seconds=lease_seconds()),
+            attempts=F('attempts') + 1, started_at=now, progress=0, progress_message='',
+        )
+        if updated:
+            claimed.append(job_id)
+    return claimed
+
+
+def renew(worker_id, job_ids, progress=None):
+    """
+    给正在执行的任务续租，progress 里有 {id: (百分比, 说明)} 时顺便写进度。
+    返回仍归自己的任务 id 集合，不在里面的说明租约已被别的 worker 接手。
+    """
+    progress = progress or {}
+    owned = Job.objects.filter(pk__in=job_ids, status=Job.Status.RUNNING, locked_by=worker_id)
+    lease = timezone.now() + timedelta(seconds=lease_seconds())
+    for job_id, (percent, message) in progress.items():
+        owned.filter(pk=job_id).update(progress=percent, progress_message=message, lease_expires_at=lease)
+    owned.exclude(pk__in=list(progress)).update(lease_expires_at=lease)
+    return set(owned.values_list('id', flat=True))
+
+
+def execute(job_id, board):
+    """在线程池或进程池里执行一个已领取的任务，返回 (结果, 结果文件)。board 见 Progress。"""
+    try:
+        job = Job.objects.select_related('user').get(pk=job_id)
+        if sharding.enabled() and sharding.directory_entry(job.user_id)[1]:
+            # 用户数据正在搬迁，稍后重试
+            raise sharding.UserMoving()
+        with sharding.use_user(job.user_id):
+            return JOB_HANDLERS[job.kind](job, Progress(job_id, board))
+    finally:
+        # 池里的线程长期存在，用完把本线程的连接关掉
+        connections.close_all()
+
+
+def finish(job_id, worker_id, result, result_file=''):
+    return Job.objects.filter(pk=job_id, status=Job.Status.RUNNING, locked_by=worker_id).update(
+        status=Job.Status.SUCCEEDED, progress=100, progress_message='', result=result, result_file=result_file,
+        error='', finished_at=timezone.now(), locked_by='', lease_expires_at=None,
+    )
+
+
+def fail(job_id, worker_id, error, retry=True):
+    """记录一次失败：还有次数就按指数退避重新排队，否则标记失败。返回新状态；任务已不归自己时返回 None。"""
+    job = Job.objects.filter(pk=job_id, status=Job.Status.RUNNING, locked_by=worker_id).values(
+        'attempts', 'max_attempts').first()
+    if job is None:
+        return None
+    now = timezone.now()
+    values = {'error': error[-2000:], 'locked_by': '', 'lease_expires_at': None}
+    if retry and job['attempts'] < job['max_attempts']:
+        delay = getattr(settings, 'JOB_RETRY_DELAY', 30) * 2 ** (job['attempts'] - 1)
+        values.update(status=Job.Status.QUEUED, run_after=now + timedelta(seconds=delay))
+    else:
+        values.update(status=Job.Status.FAILED, finished_at=now)
+    Job.objects.filter(pk=job_id, locked_by=worker_id).update(**values)
+    return values['status']
+
+
+def purge_finished(days=None):
+    """删除结束超过 days 天（默认 settings.JOB_RETENTION_DAYS）的任务及其结果文件，返回删除的任务数。"""
+    days = getattr(settings, 'JOB_RETENTION_DAYS', 7) if days is None else days
+    expired = Job.objects.filter(status__in=[Job.Status.SUCCEEDED, Job.Status.FAILED],
+                                 finished_at__lt=timezone.now() - timedelta(days=days))
+    ids = []
+    for job_id, params in expired.values_list('id', 'params').iterator():
+        shutil.rmtree(result_path(str(job_id)), ignore_errors=True)
+        if params.get('upload'):
+            result_path(params['upload']).unlink(missing_ok=True)
+        ids.append(job_id)
+    for start in range(0, len(ids), 500):
+        Job.objects.filter(pk__in=ids[start:start + 500]).delete()
+    return len(ids)
+
+
+# --- 处理函数：handler(job, progress) -> (结果, 结果文件相对路径) ---
+
+def run_export(job, progress):
+    kind, fmt = job.params['kind'], job.params.get('fmt', 'csv')
+    total = count_rows(kind, job.user)
+    rows = 0
+
+    def report(count):
+        nonlocal rows
+        rows = count
+        progress(count, total, f"已导出 {count}/{total} 行")
+
+    chunks, content_type, filename = stream_export(kind, job.user, fmt=fmt, compress=job.params.get('gzip', False),
+                                                   progress=report)
+    name = f"{job.pk}/{filename}"
+    path = result_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.part')
+    with open(partial, 'wb') as out:
+        for chunk in chunks:
+            out.write(chunk)
+    os.replace(partial, path)
+    return {'rows': rows, 'bytes': path.stat().st_size, 'filename': filename, 'content_type': content_type}, name
+
+
+def run_import(job, progress):
+    params = job.params
+    path = result_path(params['upload'])
+    size = path.stat().st_size
+
+    with open(path, 'rb') as upload:
+        def rows():
+            for count, row in enumerate(parse_rows(upload, params['fmt']), start=1):
+                if count % 1000 == 0:
+                    progress(upload.tell(), size, f"已读取 {count} 行")
+                yield row
+
+        try:
+            result = import_rows(job.user, params['kind'], rows(), dry_run=params.get('dry_run', False))
+        except (ValueError, csv.Error) as exc:
+            # 文件本身无法解析，整个导入已回滚，重试也一样
+            raise JobError(f"解析失败: {exc}")
+    path.unlink(missing_ok=True)
+    result['dry_run'] = params.get('dry_run', False)
+    return result, ''
+
+
+def run_energy_profile(job, progress):
+    total = count_rows('energylog', job.user)
+
+    def logs():
+        rows = iter_log_rows(ArchivedLogBatch.Kind.ENERGY_LOG, job.user, ['timestamp', 'energy_level'])
+        for count, row in enumerate(rows, start=1):
+            if count % 5000 == 0:
+                progress(count, total, f"已读取 {count}/{total} 条精力日志")
+            yield row
+
+    return {'samples': rebuild_profile(job.user_id, logs())}, ''
+
+
+def run_work_journal(job, progress):
+    total = count_rows('worklog', job.user)
+
+    def logs():
+        rows = iter_log_rows(ArchivedLogBatch.Kind.WORK_LOG, job.user, ROLLUP_COLUMNS)
+        for count, row in enumerate(rows, start=1):
+            if count % 5000 == 0:
+                progress(count, total, f"已读取 {count}/{total} 条工作日志")
+            yield row
+
+    return {'sessions': rebuild_rollups(job.user_id, logs())}, ''
+
+
+JOB_HANDLERS = {
+    Job.Kind.EXPORT: run_export,
+    Job.Kind.IMPORT: run_import,
+    Job.Kind.ENERGY_PROFILE: run_energy_profile,
+    Job.Kind.WORK_JOURNAL: run_work_journal,
+}
+
+# 可以直接 POST /api/jobs/ 创建的类型；导出、导入通过各自接口的 ?async=1 创建
+USER_JOB_KINDS = (Job.Kind.ENERGY_PROFILE, Job.Kind.WORK_JOURNAL)
@@ -0,0 +1,200 @@
+"""
+工作日志日报和年度热力图。
+
+每条 WorkLog 入库时按它开始那天（settings.TIME_ZONE 的本地日期）并入 WorkLogDailyRollup 的一行：
+专注分钟数、会话数、按任务 / 按任务来源的分钟数、结束状态计数。跨午夜的会话整段算在开始那天。
+日报只读一行，热力图是一次按 (user, date) 索引的范围读，都不再扫原始日志。
+
+逐条 save() 由 post_save 信号处理；bulk_create 不发信号，批量写入的地方要自己调用 record_work_logs()。
+归档和删除不回减汇总（归档后的历史照样出现在热力图里）；修改或删除了日志、或者汇总缺失时，
+用 rebuild_journal 命令或 work_journal 后台任务从完整日志（含归档）重建。
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import WorkLog, WorkLogDailyRollup
+from .sharding import use_user
+
+HEATMAP_DAYS = 365
+
+# 重建时从日志里读的列，顺序与 _Day.add 的参数一致
+ROLLUP_COLUMNS = ['timestamp_start', 'timestamp_end', 'duration_minutes', 'task_ref_id', 'task_name_snapshot',
+                  'task_source', 'user_reported_status_at_end']
+
+
+class _Conflict(Exception):
+    pass
+
+
+class _Day:
+    """一天的增量，合并进已有的汇总行。"""
+
+    def __init__(self):
+        self.focus_minutes = 0
+        self.sessions = 0
+        self.first_start = None
+        self.last_end = None
+        self.by_task = {}
+        self.by_source = {}
+        self.end_states = {}
+
+    def add(self, start, end, minutes, task_id, task_name, source, end_state):
+        minutes = minutes or 0
+        self.focus_minutes += minutes
+        self.sessions += 1
+        if self.first_start is None or start < self.first_start:
+            self.first_start = start
+        end = end or start
+        if self.last_end is None or end > self.last_end:
+            self.last_end = end
+        key = str(task_id) if task_id else f"name:{task_name}"
+        task = self.by_task.setdefault(key, {'task': task_id, 'name': task_name, 'minutes': 0, 'sessions': 0})
+        # 名称取最近一次的快照
+        task['name'] = task_name
+        task['minutes'] += minutes
+        task['sessions'] += 1
+        bucket = self.by_source.setdefault(source or '', {'minutes': 0, 'sessions': 0})
+        bucket['minutes'] += minutes
+        bucket['sessions'] += 1
+        self.end_states[end_state or ''] = self.end_states.get(end_state or '', 0) + 1
+
+    def merge_into(self, row):
+        row.focus_minutes += self.focus_minutes
+        row.sessions += self.sessions
+        row.first_start = min(row.first_start, self.first_start)
+        row.last_end = max(row.last_end, self.last_end)
+        for key, task in self.by_task.items():
+            merged = row.by_task.setdefault(key, {'task': task['task'], 'name': task['name'], 'minutes': 0,
+                                                  'sessions': 0})
+            merged['name'] = task['name']
+            merged['minutes'] += task['minutes']
+            merged['sessions'] += task['sessions']
+        for source, bucket in self.by_source.items():
+            merged = row.by_source.setdefault(source, {'minutes': 0, 'sessions': 0})
+            merged['minutes'] += bucket['minutes']
+            merged['sessions'] += bucket['sessions']
+        for state, count in self.end_states.items():
+            row.end_states[state] = row.end_states.get(state, 0) + count
+        return row
+
+    def as_row(self, user_id, day):
+        return WorkLogDailyRollup(
+            user_id=user_id, date=day, focus_minutes=self.focus_minutes, sessions=self.sessions,
+            first_start=self.first_start, last_end=self.last_end, by_task=self.by_task,
+            by_source=self.by_source, end_states=self.end_states,
+        )
+
+
+def _days(rows):
+    days = defaultdict(_Day)
+    for row in rows:
+        days[timezone.localdate(row[0])].add(*row)
+    return days
+
+
+def _row(log):
+    return tuple(getattr(log, column) for column in ROLLUP_COLUMNS)
+
+
+def record_work_logs(logs):
+    """工作日志入库后调用：按用户、按天并入汇总。"""
+    by_user = defaultdict(list)
+    for log in logs:
+        by_user[log.user_id].append(_row(log))
+    for user_id, rows in by_user.items():
+        _merge(user_id, _days(rows))
+
+
+def _merge(user_id, days, attempts=5):
+    for _ in range(attempts):
+        try:
+            with use_user(user_id) as using, transaction.atomic(using=using):
+                existing = {row.date: row for row in WorkLogDailyRollup.objects.filter(user_id=user_id,
+                                                                                       date__in=list(days))}
+                created = []
+                for day, delta in days.items():
+                    row = existing.get(day)
+                    if row is None:
+                        created.append(delta.as_row(user_id, day))
+                        continue
+                    delta.merge_into(row)
+                    updated = WorkLogDailyRollup.objects.filter(pk=row.pk, version=row.version).update(
+                        focus_minutes=row.focus_minutes, sessions=row.sessions, first_start=row.first_start,
+                        last_end=row.last_end, by_task=row.by_task, by_source=row.by_source,
+                        end_states=row.end_states, version=row.version + 1,
+                    )
+                    if not updated:
+                        raise _Conflict()
+                WorkLogDailyRollup.objects.bulk_create(created)
+            return
+        except (_Conflict, IntegrityError):
+            # 别的请求同时改了同一天（或先建了这一天的行），整批重读重做
+            continue
+    raise RuntimeError(f"工作日志汇总更新冲突过多 (user_id={user_id})")
+
+
+def rebuild_rollups(user_id, rows):
+    """用完整历史重建某个用户的汇总。rows 为按 ROLLUP_COLUMNS 排列的元组迭代器，返回会话数。"""
+    days = _days(rows)
+    with use_user(user_id) as using, transaction.atomic(using=using):
+        WorkLogDailyRollup.objects.filter(user_id=user_id).delete()
+        WorkLogDailyRollup.objects.bulk_create(
+            [delta.as_row(user_id, day) for day, delta in sorted(days.items())], batch_size=500)
+    return sum(delta.sessions for delta in days.values())
+
+
+def _breakdown(buckets, key_name):
+    return sorted(
+        ({key_name: key or None, **bucket} for key, bucket in buckets.items()),
+        key=lambda item: (-item['minutes'], -item['sessions']),
+    )
+
+
+def describe_day(user, day):
+    """某一天的日报；没有日志的日子各项为 0。"""
+    row = WorkLogDailyRollup.objects.filter(user=user, date=day).first()
+    if row is None:
+        return {'date': day, 'focus_minutes': 0, 'sessions': 0, 'first_start': None, 'last_end': None,
+                'tasks': [], 'sources': [], 'end_states': []}
+    return {
+        'date': day,
+        'focus_minutes': row.focus_minutes,
+        'sessions': row.sessions,
+        'first_start': row.first_start,
+        'last_end': row.last_end,
+        'tasks': sorted(row.by_task.values(), key=lambda item: (-item['minutes'], -item['sessions'])),
+        'sources': _breakdown(row.by_source, 'task_source'),
+        'end_states': sorted(
+            ({'status': state or None, 'count': count} for state, count in row.end_states.items()),
+            key=lambda item: -item['count'],
+        ),
+    }
+
+
+def heatmap(user, end, days=HEATMAP_DAYS):
+    """截至 end（含）的 days 天里每天的专注分钟数和会话数，只列出有记录的日子。"""
+    start = end - timedelta(days=days - 1)
+    rows = list(
+        WorkLogDailyRollup.objects.filter(user=user, date__gte=start, date__lte=end)
+        .order_by('date').values_list('date', 'focus_minutes', 'sessions')
+    )
+    return {
+        'start': start,
+        'end': end,
+        'active_days': len(rows),
+        'total_minutes': sum(minutes for _, minutes, _ in rows),
+        'max_minutes': max((minutes for _, minutes, _ in rows), default=0),
+        'days': [{'date': day, 'minutes': minutes, 'sessions': sessions} for day, minutes, sessions in rows],
+    }
+
+
+@receiver(post_save, sender=WorkLog)
+def work_log_saved(sender, instance, created, raw=False, **kwargs):
+    # 只在新建时累加；loaddata (raw) 之后需要重建
+    if created and not raw:
+        record_work_logs([instance])
@@ -0,0 +1,59 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.archive import ARCHIVE_SOURCES, MIN_HORIZON_DAYS, archive_batch, archive_horizon
+from core.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = ("把超过保留期的 WorkLog / EnergyLog 压缩归档到 ArchivedLogBatch。"
+            "每批单独提交，可随时中断后重跑；--max-rows-per-sec 限速，避免长时间占住 SQLite 写锁。")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help=f"保留天数，默认 settings.ARCHIVE_HORIZON_DAYS，最少 {MIN_HORIZON_DAYS}")
+        parser.add_argument('--kind', choices=[str(kind) for kind in ARCHIVE_SOURCES], action='append',
+                            help="只归档指定类型，可重复；默认全部")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--max-rows-per-sec', type=float, default=5000, help="0 表示不限速")
+        parser.add_argument('--max-batches', type=int, default=0, help="最多处理多少批后退出，0 表示不限")
+
+    def handle(self, *args, **options):
+        if options['days'] is not None:
+            cutoff = timezone.now() - timedelta(days=max(MIN_HORIZON_DAYS, options['days']))
+        else:
+            cutoff = archive_horizon()
+        kinds = options['kind'] or list(ARCHIVE_SOURCES)
+        rate = options['max_rows_per_sec']
+        batches = 0
+        started = time.perf_counter()
+        total = 0
+
+        for kind in kinds:
+            archived = 0
+            # 分库时逐个分片归档，一个分片归档完再换下一个
+            aliases = shard_aliases()
+            while aliases and (not options['max_batches'] or batches < options['max_batches']):
+                batch_started = time.perf_counter()
+                with use_shard(aliases[0]):
+                    count = archive_batch(kind, cutoff, batch_size=options['batch_size'])
+                if not count:
+                    aliases.pop(0)
+                    continue
+                batches += 1
+                archived += count
+                if rate > 0:
+                    # 按目标速率补足这一批应占的时间，期间把写锁让给线上请求
+                    time.sleep(max(0.0, count / rate - (time.perf_counter() - batch_started)))
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"  {kind}: 已归档 {archived} 行")
+            total += archived
+            self.stdout.write(f"{kind}: 归档 {archived} 行（早于 {cutoff:%Y-%m-%d}）")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"共归档 {total} 行，{batches} 批，用时 {elapsed:.1f}s"
+            + (f"，{total / elapsed:.0f} 行/秒" if elapsed else "")
+        ))
@@ -0,0 +1,147 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+SNAPSHOT_PREFIX = 'db-'
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("用 SQLite 在线备份 API 给数据库做快照，不必停服务。"
+            "回滚日志模式下每次只复制 --pages 页，批次之间 sleep，把锁让给线上写请求；"
+            "WAL 模式下读不挡写，直接一次复制。"
+            "完成后做 integrity_check，可选 gzip 压缩，并按 --keep 轮转旧快照。")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--dest', help="快照目录，默认 settings.BACKUP_DIR")
+        parser.add_argument('--pages', type=int, default=256, help="每批复制的页数")
+        parser.add_argument('--sleep-ms', type=float, default=20, help="批次之间的间隔（毫秒）")
+        parser.add_argument('--max-restarts', type=int, default=3,
+                            help="源库被写入导致分批复制重新开始超过这么多次后，改为一次性复制")
+        parser.add_argument('--keep', type=int, default=7, help="保留最近几份快照，0 表示不清理")
+        parser.add_argument('--gzip', action='store_true', help="压缩快照")
+
+    def handle(self, *args, **options):
+        db = connections[options['database']]
+        if db.vendor != 'sqlite':
+            raise CommandError("backup_db 只支持 SQLite 数据库。")
+        source_path = Path(db.settings_dict['NAME'])
+        if not source_path.exists():
+            raise CommandError(f"数据库文件不存在: {source_path}")
+        dest_dir = Path(options['dest'] or getattr(settings, 'BACKUP_DIR', settings.BASE_DIR / 'backups'))
+        dest_dir.mkdir(parents=True, exist_ok=True)
+
+        name = f"{SNAPSHOT_PREFIX}{timezone.now():%Y%m%d-%H%M%S}.sqlite3"
+        partial = dest_dir / f".{name}.partial"
+
+        started = time.perf_counter()
+        source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+        target = sqlite3.connect(partial)
+        try:
+            wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal'
+            if wal:
+                # WAL 模式下读事务不挡写请求，一次复制完，也不会因为并发写入重新开始
+                steps, restarts, finished = [], 0, False
+            else:
+                steps, restarts, finished = self._copy(
+                    source, target, options['pages'], options['sleep_ms'] / 1000, options['max_restarts'])
+            if not finished:
+                # 源库一直在被写，分批复制总被打断：退回一次性复制，期间会持续持有读锁
+                t0 = time.perf_counter()
+                source.backup(target)
+                steps.append(time.perf_counter() - t0)
+        except BaseException:
+            target.close()
+            partial.unlink(missing_ok=True)
+            raise
+        finally:
+            source.close()
+        copied = time.perf_counter() - started
+
+        t0 = time.perf_counter()
+        result = target.execute("PRAGMA integrity_check").fetchone()[0]
+        target.close()
+        integrity = time.perf_counter() - t0
+        if result != 'ok':
+            partial.unlink(missing_ok=True)
+            raise CommandError(f"快照完整性检查失败: {result}")
+
+        compress = 0.0
+        if options['gzip']:
+            t0 = time.perf_counter()
+            final = dest_dir / f"{name}.gz"
+            with open(partial, 'rb') as raw, gzip.open(f"{partial}.gz", 'wb', compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed, length=1024 * 1024)
+            partial.unlink()
+            os.replace(f"{partial}.gz", final)
+            compress = time.perf_counter() - t0
+        else:
+            final = dest_dir / name
+            os.replace(partial, final)
+
+        removed = self._rotate(dest_dir, options['keep'])
+
+        self.stdout.write(self.style.SUCCESS(f"快照已写入 {final} ({final.stat().st_size / 1024 / 1024:.1f} MB)"))
+        if wal:
+            self.stdout.write(f"  复制: {copied:.2f}s，WAL 模式一次复制完，期间不阻塞写请求")
+        else:
+            self.stdout.write(f"  复制: {copied:.2f}s，{len(steps)} 批，每批 {options['pages']} 页，重新开始 {restarts} 次"
+                              + ("" if finished else "，最后改为一次性复制"))
+            self.stdout.write(
+                f"  写请求可能被阻塞的时间（每批持锁时长，上限）: 单次最长 {max(steps) * 1000:.1f}ms，"
+                f"合计 {sum(steps) * 1000:.1f}ms；批次之间不持锁"
+            )
+        self.stdout.write(f"  完整性检查: {integrity:.2f}s" + (f"，压缩: {compress:.2f}s" if options['gzip'] else ""))
+        if removed:
+            self.stdout.write(f"  已轮转删除 {len(removed)} 份旧快照")
+
+    def _copy(self, source, target, pages, sleep, max_restarts):
+        """
+        分批在线备份，返回 (每批复制耗时, 重新开始次数, 是否完成)。
+        每批复制期间持有源库的读锁（回滚日志模式下会挡住写请求提交），批次之间 sleep 时不持锁。
+        """
+        steps = []
+        state = {'last': time.perf_counter(), 'remaining': None, 'restarts': 0}
+
+        def progress(status, remaining, total):
+            steps.append(time.perf_counter() - state['last'])
+            # 别的连接在备份期间写了源库时，SQLite 会从头重新复制
+            if state['remaining'] is not None and remaining > state['remaining']:
+                state['restarts'] += 1
+                if state['restarts'] > max_restarts:
+                    raise _TooManyRestarts
+            state['remaining'] = remaining
+            if remaining:
+                time.sleep(sleep)
+            state['last'] = time.perf_counter()
+
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except _TooManyRestarts:
+            return steps, state['restarts'], False
+        return steps, state['restarts'], True
+
+    def _rotate(self, dest_dir, keep):
+        if keep <= 0:
+            return []
+        # 文件名里的时间戳可按字典序排序
+        snapshots = sorted(
+            path for path in dest_dir.iterdir()
+            if path.name.startswith(SNAPSHOT_PREFIX) and path.name.endswith(('.sqlite3', '.sqlite3.gz'))
+        )
+        removed = snapshots[:-keep]
+        for path in removed:
+            path.unlink()
+        return removed
@@ -0,0 +1,86 @@
+import time
+from importlib import import_module
+
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.functional import SimpleLazyObject
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.authentication import BearerTokenAuthentication, generate_token, token_cache
+from core.models import ApiToken
+
+SESSION_ENGINES = [
+    ('session (db)', 'django.contrib.sessions.backends.db'),
+    ('session (cached_db)', 'django.contrib.sessions.backends.cached_db'),
+    ('session (signed_cookies)', 'django.contrib.sessions.backends.signed_cookies'),
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "对比各会话后端与 Bearer 令牌认证的每请求开销（耗时和 SQL 条数），在回滚的事务里进行。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        self.iterations = options['iterations']
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username=f"bench-auth-{time.time_ns()}")
+                for label, engine in SESSION_ENGINES:
+                    self._report(label, self._session_auth(engine, user))
+                key, digest = generate_token()
+                ApiToken.objects.create(user=user, key_hash=digest, prefix=key[:8])
+                token_cache.clear()
+                self._report('bearer (LRU 未命中)', self._bearer_auth(key, warm=False))
+                self._report('bearer (LRU 命中)', self._bearer_auth(key, warm=True))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _session_auth(self, engine_path, user):
+        engine = import_module(engine_path)
+        store = engine.SessionStore()
+        store[SESSION_KEY] = str(user.pk)
+        store[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.save()
+        session_key = store.session_key
+
+        def authenticate():
+            # 等价于 SessionMiddleware + AuthenticationMiddleware + DRF SessionAuthentication
+            http_request = self.factory.get('/api/tasks/')
+            http_request.session = engine.SessionStore(session_key)
+            http_request.user = SimpleLazyObject(lambda: get_user(http_request))
+            return Request(http_request, authenticators=[SessionAuthentication()]).user
+
+        return authenticate
+
+    def _bearer_auth(self, key, warm):
+        def authenticate():
+            if not warm:
+                token_cache.clear()
+            http_request = self.factory.get('/api/tasks/', HTTP_AUTHORIZATION=f'Bearer {key}')
+            return Request(http_request, authenticators=[BearerTokenAuthentication()]).user
+
+        return authenticate
+
+    def _report(self, label, authenticate):
+        assert authenticate().is_authenticated
+        with CaptureQueriesContext(connection) as captured:
+            authenticate()
+        started = time.perf_counter()
+        for _ in range(self.iterations):
+            authenticate()
+        per_request_us = (time.perf_counter() - started) / self.iterations * 1e6
+        self.stdout.write(f"{label:<26} {per_request_us:>8.1f} µs/请求  {len(captured):>2} 条SQL")
@@ -0,0 +1,162 @@
+import json
+import logging
+import resource
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpRequest
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+from rest_framework.request import Request
+
+from core import urls as core_urls
+
+# 非 pk 的路由参数取这些示例值
+SAMPLE_KWARGS = {
+    'kind': 'worklog',
+}
+
+
+def _rss_mb():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _iter_patterns(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _iter_patterns(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern
+
+
+class Command(BaseCommand):
+    help = ("用 Django 测试客户端对 core/urls.py 里的每个路由发 GET 请求，统计 p50/p95/p99 延迟、"
+            "每请求 SQL 条数和进程 RSS，结果存成 JSON，可用 --baseline 与上一次结果对比。")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="以该用户身份请求，默认取 generate_data 生成的第一个用户")
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--output', default='bench_endpoints.json')
+        parser.add_argument('--baseline', help="上一次的结果 JSON，打印延迟变化")
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(username__startswith='demo-').order_by('id').first()
+        if user is None:
+            raise CommandError("找不到压测用户，请先运行 generate_data 或用 --user 指定")
+
+        # 405/403 和慢请求日志会刷屏，压测期间只留错误
+        for logger_name in ('django.request', 'core.perf'):
+            logging.getLogger(logger_name).setLevel(logging.ERROR)
+
+        client = Client()
+        client.force_login(user)
+        iterations = max(2, options['iterations'])
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for name, url in self._urls(user):
+                results[name] = self._measure(client, url, iterations)
+                row = results[name]
+                self.stdout.write(
+                    f"{name:<28} {row['status']:>3} p50 {row['p50_ms']:>8.2f}ms  p95 {row['p95_ms']:>8.2f}ms  "
+                    f"p99 {row['p99_ms']:>8.2f}ms  {row['queries']:>4} 条SQL  RSS {row['rss_mb']:.0f}MB"
+                )
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'user': user.username,
+            'iterations': iterations,
+            'routes': results,
+        }
+        with open(options['output'], 'w') as out:
+            json.dump(report, out, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"结果已写入 {options['output']}"))
+        if options['baseline']:
+            self._compare(options['baseline'], results)
+
+    def _sample_pk(self, basename, user):
+        for _, viewset, registered in core_urls.router.registry:
+            if registered == basename:
+                request = Request(HttpRequest())
+                request.user = user
+                view = viewset(request=request, args=(), kwargs={}, format_kwarg=None, action='list')
+                obj = view.get_queryset().order_by('-pk').first()
+                return obj.pk if obj is not None else None
+        return None
+
+    def _urls(self, user):
+        for pattern in _iter_patterns(core_urls.urlpatterns):
+            params = list(pattern.pattern.regex.groupindex)
+            if 'format' in params:
+                continue
+            kwargs = {}
+            for param in params:
+                if param == 'pk':
+                    kwargs[param] = self._sample_pk(pattern.name.rsplit('-', 1)[0], user)
+                else:
+                    kwargs[param] = SAMPLE_KWARGS.get(param)
+                if kwargs[param] is None:
+                    self.stdout.write(f"跳过 {pattern.name}: 没有参数 {param} 的示例值")
+                    break
+            else:
+                yield pattern.name, reverse(pattern.name, kwargs=kwargs)
+
+    def _measure(self, client, url, iterations):
+        self._request(client, url)  # 预热
+        timings = []
+        queries = []
+        response = None
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = self._request(client, url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+        cuts = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'url': url,
+            'status': response.status_code,
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'p50_ms': round(cuts[49], 3),
+            'p95_ms': round(cuts[94], 3),
+            'p99_ms': round(cuts[98], 3),
+            'queries': max(queries),
+            'rss_mb': round(_rss_mb(), 1),
+        }
+
+    @staticmethod
+    def _request(client, url):
+        response = client.get(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def _compare(self, path, results):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)['routes']
+        self.stdout.write("与基线对比 (p95):")
+        for name, row in results.items():
+            old = baseline.get(name)
+            if old is None:
+                continue
+            change = (row['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+            marker = self.style.ERROR if change > 20 else self.style.SUCCESS
+            self.stdout.write(marker(
+                f"  {name:<28} {old['p95_ms']:>8.2f} -> {row['p95_ms']:>8.2f}ms ({change:+.0f}%)  "
+                f"SQL {old['queries']} -> {row['queries']}"
+            ))
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core import energy_buffer
+from core.models import EnergyLevel, EnergyLog
+
+
+class Command(BaseCommand):
+    help = ("对比逐条写入 EnergyLog（每条一个事务）和写后缓冲（追加日志 + 批量刷写）的吞吐。"
+            "两种方式都真实提交，结束后删除临时用户及其数据。")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--no-fsync', action='store_true', help="缓冲追加时不 fsync")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        user = User.objects.create(username=f"bench-energy-{time.time_ns()}")
+        levels = [EnergyLevel.HIGH, EnergyLevel.MEDIUM, EnergyLevel.LOW]
+        try:
+            started = time.perf_counter()
+            for i in range(rows):
+                EnergyLog.objects.create(user=user, energy_level=levels[i % 3], current_activity_type='bench')
+            direct = time.perf_counter() - started
+
+            with tempfile.TemporaryDirectory() as tmp, override_settings(
+                ENERGY_LOG_BUFFER_PATH=os.path.join(tmp, 'energy_log.journal'),
+                ENERGY_LOG_BUFFER_FSYNC=not options['no_fsync'],
+            ):
+                append_time = flush_time = 0.0
+                flushed = 0
+                for i in range(rows):
+                    sample = {'user_id': user.pk, 'timestamp': timezone.now(),
+                              'energy_level': levels[i % 3], 'current_activity_type': 'bench'}
+                    t0 = time.perf_counter()
+                    due = energy_buffer.append([sample])
+                    t1 = time.perf_counter()
+                    append_time += t1 - t0
+                    if due:
+                        flushed += energy_buffer.flush()
+                        flush_time += time.perf_counter() - t1
+                t1 = time.perf_counter()
+                flushed += energy_buffer.flush()
+                flush_time += time.perf_counter() - t1
+
+            assert flushed == rows, (flushed, rows)
+            assert EnergyLog.objects.filter(user=user).count() == rows * 2
+        finally:
+            user.delete()
+
+        buffered = append_time + flush_time
+        self.stdout.write(f"逐条写库:   {rows / direct:8.0f} 行/秒  ({direct:.2f}s)")
+        self.stdout.write(f"写后缓冲:   {rows / buffered:8.0f} 行/秒  ({buffered:.2f}s，"
+                          f"其中确认 {append_time:.2f}s，刷写 {flush_time:.2f}s)")
+        self.stdout.write(f"单条确认延迟: 逐条写库 {direct / rows * 1000:.2f}ms，"
+                          f"写后缓冲 {append_time / rows * 1000:.2f}ms")
@@ -0,0 +1,85 @@
+import resource
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.exports import EXPORTS, FORMATS, stream_export
+from core.models import WorkLog
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("导出性能基准：在事务里为临时用户插入 N 条工作日志，流式导出并统计耗时和内存峰值，"
+            "结束后回滚，不留数据。峰值超过 --max-peak-mb 时以非零状态退出。")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--fmt', choices=list(FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--user', help="导出已有用户的数据（不插入测试数据）")
+        parser.add_argument('--kind', choices=list(EXPORTS), default='worklog', help="配合 --user 使用")
+        parser.add_argument('--max-peak-mb', type=float, default=64.0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['user']:
+                    try:
+                        user = User.objects.get(username=options['user'])
+                    except User.DoesNotExist:
+                        raise CommandError(f"用户 {options['user']} 不存在")
+                    kind = options['kind']
+                else:
+                    user = User.objects.create(username=f"bench-export-{time.time_ns()}")
+                    kind = 'worklog'
+                    self._seed(user, options['rows'])
+                self._measure(user, kind, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, user, rows):
+        started = time.perf_counter()
+        base = timezone.now() - timedelta(minutes=30 * rows)
+        batch = []
+        for i in range(rows):
+            start = base + timedelta(minutes=30 * i)
+            batch.append(WorkLog(
+                user=user, task_name_snapshot=f"任务 {i % 97}", task_source="bench",
+                timestamp_start=start, timestamp_end=start + timedelta(minutes=25), duration_minutes=25,
+                energy_cost='中', tags_snapshot="bench,export",
+            ))
+            if len(batch) == 10000:
+                WorkLog.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            WorkLog.objects.bulk_create(batch)
+        self.stdout.write(f"插入 {rows} 行，用时 {time.perf_counter() - started:.1f}s")
+
+    def _measure(self, user, kind, options):
+        tracemalloc.start()
+        started = time.perf_counter()
+        chunks, _, filename = stream_export(kind, user, fmt=options['fmt'], compress=options['gzip'])
+        total_bytes = 0
+        for chunk in chunks:
+            total_bytes += len(chunk)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        peak_mb = peak / 1024 / 1024
+        max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(
+            f"{filename}: {total_bytes / 1024 / 1024:.1f} MB，用时 {elapsed:.1f}s，"
+            f"Python 分配峰值 {peak_mb:.1f} MB，进程 RSS 峰值 {max_rss_mb:.0f} MB"
+        )
+        if peak_mb > options['max_peak_mb']:
+            raise CommandError(f"导出内存峰值 {peak_mb:.1f} MB 超过上限 {options['max_peak_mb']} MB")
@@ -0,0 +1,52 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.forecast import capacity_by_day, spread_demand
+from core.models import FixedSchedule
+
+
+class Command(BaseCommand):
+    help = "测量容量/需求预测的纯计算耗时（不含查库）：随机生成任务和固定日程，重复多次取最好成绩。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        days = options['days']
+        start = timezone.localdate()
+        tasks = []
+        for _ in range(options['tasks']):
+            begin = start + timedelta(days=rng.randint(-30, days))
+            end = begin + timedelta(days=rng.randint(0, 60)) if rng.random() > 0.1 else None
+            tasks.append((rng.randint(15, 600), begin if rng.random() > 0.2 else None, end))
+        Recurrence = FixedSchedule.RecurrenceType
+        schedules = [
+            (Recurrence.DAILY, 60, None, None),
+            (Recurrence.WORKDAY, 30, None, None),
+            (Recurrence.WEEKLY, 90, '0,2,4', None),
+            (Recurrence.MONTHLY, 120, None, 15),
+        ]
+
+        best_capacity = best_demand = float('inf')
+        for _ in range(options['repeat']):
+            t0 = time.perf_counter()
+            capacity = capacity_by_day(start, days, 480, schedules)
+            t1 = time.perf_counter()
+            demand, overdue, unscheduled = spread_demand(start, days, tasks)
+            t2 = time.perf_counter()
+            best_capacity = min(best_capacity, t1 - t0)
+            best_demand = min(best_demand, t2 - t1)
+
+        overcommitted = sum(1 for i in range(days) if demand[i] > capacity[i])
+        self.stdout.write(f"{options['tasks']} 个任务 × {days} 天")
+        self.stdout.write(f"  可用时间展开: {best_capacity * 1000:.2f}ms")
+        self.stdout.write(f"  需求平摊:     {best_demand * 1000:.2f}ms")
+        self.stdout.write(f"  超负荷 {overcommitted} 天，逾期 {overdue} 分钟，无截止日期 {unscheduled} 分钟")
@@ -0,0 +1,53 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.imports import import_rows
+from core.models import ShortTermGoal
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "导入速率基准：在事务里为临时用户导入 N 行任务（引用已有短期目标名称），统计行/秒，结束后回滚。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--goals', type=int, default=50)
+        parser.add_argument('--min-rate', type=float, default=10000, help="低于该速率（行/秒）时非零退出")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        rows = options['rows']
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username=f"bench-import-{time.time_ns()}")
+                goal_names = [f"目标 {i}" for i in range(options['goals'])]
+                ShortTermGoal.objects.bulk_create([ShortTermGoal(user=user, name=name) for name in goal_names])
+                data = [{
+                    'name': f"任务 {i}",
+                    'priority': str(rng.randint(1, 5)),
+                    'energy_level_estimate': rng.choice(['高', '中', '低', '']),
+                    'tags': rng.choice(['写作', '编码,复盘', '阅读', '']),
+                    'estimated_time_minutes': str(rng.choice([15, 30, 60, 120])),
+                    'end_date': f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                    'short_term_goal': rng.choice(goal_names),
+                } for i in range(rows)]
+
+                started = time.perf_counter()
+                result = import_rows(user, 'tasks', iter(data))
+                elapsed = time.perf_counter() - started
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        rate = rows / elapsed
+        self.stdout.write(f"导入 {result['created']} 行（{len(result['errors'])} 行出错），"
+                          f"用时 {elapsed:.2f}s，{rate:.0f} 行/秒")
+        if rate < options['min_rate']:
+            raise CommandError(f"导入速率 {rate:.0f} 行/秒 低于要求的 {options['min_rate']:.0f}")
@@ -0,0 +1,102 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from core.models import EnergyLog
+from core.sharding import hashed_alias
+
+
+def _schema_sql():
+    with connection.schema_editor(collect_sql=True, atomic=False) as editor:
+        editor.create_model(EnergyLog)
+    return [sql.rstrip(';') for sql in editor.collected_sql]
+
+
+def _insert_sql():
+    fields = [field for field in EnergyLog._meta.concrete_fields if not field.primary_key]
+    return "INSERT INTO {} ({}) VALUES ({})".format(
+        EnergyLog._meta.db_table, ', '.join(field.column for field in fields), ', '.join('?' * len(fields)))
+
+
+def _write(paths, insert_sql, rows, users, seed, synchronous):
+    # 和请求里一样，每条一个事务；写哪个库按用户 id 取模
+    rng = random.Random(seed)
+    conns = {}
+    for path in paths:
+        conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+        conns[path] = conn
+    now = timezone.now().isoformat()
+    started = time.perf_counter()
+    for _ in range(rows):
+        user_id = rng.randint(1, users)
+        conn = conns[hashed_alias(user_id, paths)]
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(insert_sql, (user_id, now, '高', None))
+        conn.execute("COMMIT")
+    elapsed = time.perf_counter() - started
+    for conn in conns.values():
+        conn.close()
+    return elapsed
+
+
+class Command(BaseCommand):
+    help = ("测量按用户分库后的写入吞吐：多个写进程并发插入 EnergyLog（每条一个事务），"
+            "分别写 1 个、2 个、4 个…… SQLite 文件，比较总吞吐。只测数据库写锁的争用，不经过 ORM 和 HTTP。")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', default='1,2,4', help="逗号分隔的分片数")
+        parser.add_argument('--writers', type=int, default=4, help="并发写进程数")
+        parser.add_argument('--rows', type=int, default=1000, help="每个写进程插入的行数")
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--journal-mode', default='WAL', help="WAL 或 DELETE")
+        parser.add_argument('--synchronous', default='FULL', help="FULL / NORMAL / OFF")
+
+    def handle(self, *args, **options):
+        schema = _schema_sql()
+        insert_sql = _insert_sql()
+        counts = [int(part) for part in options['shards'].split(',') if part.strip()]
+        writers = options['writers']
+        total_rows = writers * options['rows']
+        self.stdout.write(f"{writers} 个写进程 × {options['rows']} 行，journal_mode={options['journal_mode']}，"
+                          f"synchronous={options['synchronous']}，CPU {os.cpu_count()} 个")
+
+        baseline = None
+        for count in counts:
+            with tempfile.TemporaryDirectory(prefix='bench-shards-') as directory:
+                paths = [os.path.join(directory, f'shard_{i}.sqlite3') for i in range(count)]
+                # 父进程的连接要在 fork 前关掉，SQLite 连接不能跨 fork 使用
+                for path in paths:
+                    with closing(sqlite3.connect(path)) as conn:
+                        conn.execute(f"PRAGMA journal_mode={options['journal_mode']}")
+                        for sql in schema:
+                            conn.execute(sql)
+
+                started = time.perf_counter()
+                with ProcessPoolExecutor(max_workers=writers) as pool:
+                    futures = [
+                        pool.submit(_write, paths, insert_sql, options['rows'], options['users'], seed,
+                                    options['synchronous'])
+                        for seed in range(writers)
+                    ]
+                    worker_seconds = [future.result() for future in futures]
+                elapsed = time.perf_counter() - started
+
+                written = 0
+                for path in paths:
+                    with closing(sqlite3.connect(path)) as conn:
+                        written += conn.execute(f"SELECT COUNT(*) FROM {EnergyLog._meta.db_table}").fetchone()[0]
+            rate = total_rows / elapsed
+            baseline = baseline or rate
+            self.stdout.write(
+                f"  {count} 个分片: {rate:8.0f} 行/秒  (×{rate / baseline:.2f}，用时 {elapsed:.2f}s，"
+                f"最慢写进程 {max(worker_seconds):.2f}s，入库 {written} 行)"
+            )
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import energy_buffer
+
+
+class Command(BaseCommand):
+    help = ("把 EnergyLog 写后缓冲里的样本批量写入数据库。"
+            "不带参数刷一次就退出，适合放进 cron；--interval 则常驻，按间隔检查刷写条件。")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help="常驻模式的检查间隔（秒），0 表示只刷一次")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        if not interval:
+            written = energy_buffer.flush()
+            self.stdout.write(self.style.SUCCESS(f"写入 {written} 条精力日志"))
+            return
+        while True:
+            if energy_buffer.should_flush():
+                written = energy_buffer.flush()
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"写入 {written} 条精力日志")
+            time.sleep(interval)
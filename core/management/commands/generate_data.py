@@ -0,0 +1,160 @@
+import random
+import time
+from datetime import datetime, time as time_cls, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.journal import record_work_logs
+from core.models import (
+    BandwidthTagCost, EnergyLevel, EnergyLog, FixedSchedule, LongTermGoal, ShortTermGoal, Task, TodayTask,
+    UserSetting, WorkLog,
+)
+from core.sharding import use_user
+
+TAGS = ['编码', '写作', '阅读', '会议', '复盘', '学习', '运动', '沟通', '设计', '杂务']
+TASK_TYPES = ['', '深度工作', '浅层工作', '学习', '生活']
+ACTIVITIES = ['编码', '开会', '阅读', '休息', '通勤', None]
+END_STATES = ['完成', '部分完成', '被打断', '卡住', None]
+ENERGY_LEVELS = [EnergyLevel.HIGH, EnergyLevel.MEDIUM, EnergyLevel.LOW]
+
+
+class Command(BaseCommand):
+    help = ("生成压测用的模拟数据：N 个用户，每人带目标、任务、固定日程、每日待办和多年的工作/精力日志。"
+            "同样的 --seed 和 --end-date 生成的数据完全一致。")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--years', type=float, default=2.0, help="工作日志和精力日志覆盖的年数")
+        parser.add_argument('--tasks', type=int, default=60, help="每个用户的任务数")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='demo', help="用户名前缀，生成的用户名形如 demo-0001")
+        parser.add_argument('--password', default='demo', help="所有生成用户的密码")
+        parser.add_argument('--end-date', help="数据截止日期 YYYY-MM-DD，默认今天")
+
+    def handle(self, *args, **options):
+        try:
+            end_date = (datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+                        if options['end_date'] else timezone.localdate())
+        except ValueError:
+            raise CommandError("--end-date 格式应为 YYYY-MM-DD")
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f"{prefix}-").exists():
+            raise CommandError(f"已存在前缀为 {prefix}- 的用户，请换一个 --prefix")
+
+        password = make_password(options['password'])
+        days = max(1, int(options['years'] * 365))
+        started = time.perf_counter()
+        totals = {}
+        for index in range(options['users']):
+            rng = random.Random(f"{options['seed']}-{index}")
+            with transaction.atomic():
+                user = User.objects.create(username=f"{prefix}-{index:04d}", password=password)
+                with use_user(user.pk) as using, transaction.atomic(using=using):
+                    counts = self._generate_user(user, rng, end_date, days, options['tasks'])
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {user.username}: {counts}")
+
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"生成 {options['users']} 个用户，共 {rows} 行 ({totals})，用时 {elapsed:.1f}s，{rows / elapsed:.0f} 行/秒"
+        ))
+
+    def _generate_user(self, user, rng, end_date, days, task_count):
+        # User 的 post_save 信号已经建好了 UserSetting
+        setting = UserSetting.objects.get(user=user)
+        setting.daily_work_hours = rng.choice([6.0, 7.0, 8.0, 9.0])
+        setting.save()
+        BandwidthTagCost.objects.bulk_create([
+            BandwidthTagCost(user_setting=setting, tag_name=tag, cost=rng.randint(1, 3))
+            for tag in rng.sample(TAGS, 5)
+        ])
+        FixedSchedule.objects.bulk_create([
+            FixedSchedule(user_setting=setting, name="午饭", start_time=time_cls(12, 0), duration_minutes=60,
+                          recurrence_type=FixedSchedule.RecurrenceType.DAILY),
+            FixedSchedule(user_setting=setting, name="周会", start_time=time_cls(10, 0), duration_minutes=90,
+                          recurrence_type=FixedSchedule.RecurrenceType.WEEKLY, days_of_week=str(rng.randint(0, 4))),
+            FixedSchedule(user_setting=setting, name="月度复盘", start_time=time_cls(16, 0), duration_minutes=120,
+                          recurrence_type=FixedSchedule.RecurrenceType.MONTHLY, day_of_month=rng.randint(1, 28)),
+        ])
+
+        long_goals = LongTermGoal.objects.bulk_create([
+            LongTermGoal(user=user, name=f"长期目标 {i}") for i in range(3)
+        ])
+        short_goals = ShortTermGoal.objects.bulk_create([
+            ShortTermGoal(user=user, name=f"短期目标 {i}", target_date=end_date + timedelta(days=rng.randint(-60, 90)),
+                          priority=rng.choice(ShortTermGoal.PriorityChoices.values),
+                          status=rng.choice(ShortTermGoal.ShortTermGoalStatus.values))
+            for i in range(8)
+        ])
+
+        tasks = []
+        for i in range(task_count):
+            start = end_date + timedelta(days=rng.randint(-120, 30))
+            estimated = rng.choice([15, 30, 45, 60, 90, 120, 180, None])
+            status = rng.choices(
+                [Task.TaskStatus.COMPLETED, Task.TaskStatus.NOT_STARTED, Task.TaskStatus.IN_PROGRESS,
+                 Task.TaskStatus.BLOCKED, Task.TaskStatus.POSTPONED],
+                weights=[5, 3, 2, 1, 1],
+            )[0]
+            tasks.append(Task(
+                user=user, name=f"任务 {i}",
+                short_term_goal_ref=rng.choice(short_goals) if rng.random() < 0.7 else None,
+                long_term_goal_ref=rng.choice(long_goals) if rng.random() < 0.3 else None,
+                priority=rng.randint(1, 5),
+                energy_level_estimate=rng.choice(ENERGY_LEVELS + [EnergyLevel.NONE]),
+                tags=','.join(rng.sample(TAGS, rng.randint(0, 3))),
+                estimated_time_minutes=estimated,
+                actual_time_minutes=int((estimated or 60) * rng.uniform(0.5, 2.0)) if status != Task.TaskStatus.NOT_STARTED else 0,
+                start_date=start,
+                end_date=start + timedelta(days=rng.randint(0, 30)),
+                completion_date=start + timedelta(days=rng.randint(0, 30)) if status == Task.TaskStatus.COMPLETED else None,
+                status=status,
+                type=rng.choice(TASK_TYPES),
+            ))
+        tasks = Task.objects.bulk_create(tasks)
+
+        today_tasks = []
+        for offset in range(14):
+            day = end_date - timedelta(days=offset)
+            for task in rng.sample(tasks, min(len(tasks), rng.randint(2, 6))):
+                today_tasks.append(TodayTask(user=user, date=day, task=task))
+        TodayTask.objects.bulk_create(today_tasks)
+
+        work_logs = []
+        energy_logs = []
+        first_day = end_date - timedelta(days=days - 1)
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            day_start = timezone.make_aware(datetime.combine(day, time_cls(8, 0)))
+            for _ in range(rng.randint(0, 5) if day.weekday() < 5 else rng.randint(0, 2)):
+                task = rng.choice(tasks)
+                start = day_start + timedelta(minutes=rng.randint(0, 12 * 60))
+                duration = rng.randint(10, 120)
+                work_logs.append(WorkLog(
+                    user=user, task_ref=task, task_name_snapshot=task.name,
+                    task_source=rng.choice(['今日待办', '任务清单', None]),
+                    timestamp_start=start, timestamp_end=start + timedelta(minutes=duration),
+                    duration_minutes=duration, user_reported_status_at_end=rng.choice(END_STATES),
+                    energy_cost=rng.choice(ENERGY_LEVELS + [None]), tags_snapshot=task.tags,
+                ))
+            for _ in range(rng.randint(1, 6)):
+                energy_logs.append(EnergyLog(
+                    user=user, timestamp=day_start + timedelta(minutes=rng.randint(0, 14 * 60)),
+                    energy_level=rng.choice(ENERGY_LEVELS), current_activity_type=rng.choice(ACTIVITIES),
+                ))
+        WorkLog.objects.bulk_create(work_logs, batch_size=2000)
+        # bulk_create 不发 post_save，日志汇总手动补上
+        record_work_logs(work_logs)
+        EnergyLog.objects.bulk_create(energy_logs, batch_size=2000)
+
+        return {
+            'goals': len(long_goals) + len(short_goals), 'tasks': len(tasks), 'today_tasks': len(today_tasks),
+            'fixed_schedules': 3, 'work_logs': len(work_logs), 'energy_logs': len(energy_logs),
+        }
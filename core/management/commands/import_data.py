@@ -0,0 +1,39 @@
+import csv
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.imports import IMPORT_FORMATS, IMPORT_KINDS, import_rows, parse_rows
+from core.sharding import use_user
+
+
+class Command(BaseCommand):
+    help = "从 CSV / JSON / NDJSON 文件为某个用户批量导入任务或目标。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('kind', choices=list(IMPORT_KINDS))
+        parser.add_argument('path')
+        parser.add_argument('--fmt', choices=IMPORT_FORMATS, help="默认按文件扩展名判断")
+        parser.add_argument('--dry-run', action='store_true', help="只校验不写入")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"用户 {options['username']} 不存在")
+        fmt = options['fmt'] or options['path'].rsplit('.', 1)[-1].lower()
+        if fmt not in IMPORT_FORMATS:
+            raise CommandError(f"无法识别的格式 {fmt}，请用 --fmt 指定")
+
+        try:
+            with open(options['path'], 'rb') as fileobj, use_user(user.pk):
+                result = import_rows(user, options['kind'], parse_rows(fileobj, fmt), dry_run=options['dry_run'])
+        except (OSError, ValueError, csv.Error) as exc:
+            raise CommandError(f"导入失败: {exc}")
+
+        for error in result['errors']:
+            details = '; '.join(f"{field}: {' '.join(map(str, messages))}" for field, messages in error['errors'].items())
+            self.stderr.write(f"第 {error['row']} 行: {details}")
+        verb = "校验通过" if options['dry_run'] else "导入"
+        self.stdout.write(f"{verb} {result['created']} 行，{len(result['errors'])} 行出错")
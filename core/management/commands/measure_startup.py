@@ -0,0 +1,165 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# 在全新的解释器里测冷启动各阶段耗时
+_COLD_START_SCRIPT = """
+import json, os, time
+t0 = time.perf_counter()
+import django
+django.setup()
+t1 = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+t2 = time.perf_counter()
+from core.warmup import warm_up
+report = warm_up()
+t3 = time.perf_counter()
+print(json.dumps({'setup_ms': (t1 - t0) * 1000, 'wsgi_ms': (t2 - t1) * 1000,
+                  'warm_up_ms': (t3 - t2) * 1000, 'warm_up': report}))
+"""
+
+_PATHS = ['/', '/api/']
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _memory_kb(pid):
+    """/proc/<pid>/smaps_rollup 里的 Rss / Pss / Private，单位 KB。Pss 把共享页按进程数平摊，最接近实际占用。"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'private': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+def _children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+class Command(BaseCommand):
+    help = (
+        "测量生产配置下的冷启动时间和每个 worker 的内存：先在新进程里测各启动阶段耗时，"
+        "再用 gunicorn.conf.py 启动服务，测到第一个成功响应的时间，发一批请求后读取主进程和各 worker 的 RSS/PSS。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=200, help="预热后发出的请求数，用来观察内存增长")
+        parser.add_argument('--no-preload', action='store_true', help="不预加载应用，用于对比")
+
+    def handle(self, *args, **options):
+        if not sys.platform.startswith('linux'):
+            raise CommandError("需要 /proc（Linux）来读取进程内存")
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'scarcity_project.settings_prod')
+        # 只在本机测量时临时给一个密钥
+        env.setdefault('DJANGO_SECRET_KEY', 'measure-startup-only')
+        # 只测启动时间和内存，不要求本机有 Redis
+        if 'DJANGO_CACHE_BACKEND' not in env:
+            env.update({'DJANGO_CACHE_BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                        'DJANGO_ALLOW_LOCAL_CACHE': '1'})
+
+        cold = subprocess.run([sys.executable, '-c', _COLD_START_SCRIPT], env=env, cwd=settings.BASE_DIR,
+                              capture_output=True, text=True)
+        if cold.returncode != 0:
+            raise CommandError(cold.stderr.strip())
+        cold = json.loads(cold.stdout.strip().splitlines()[-1])
+        self.stdout.write("冷启动（单进程）")
+        self.stdout.write(f"  django.setup():          {cold['setup_ms']:.0f}ms")
+        self.stdout.write(f"  get_wsgi_application():  {cold['wsgi_ms']:.0f}ms")
+        self.stdout.write(f"  warm_up():               {cold['warm_up_ms']:.0f}ms  {cold['warm_up']}")
+
+        port = _free_port()
+        env.update({
+            'GUNICORN_BIND': f'127.0.0.1:{port}',
+            'GUNICORN_WORKERS': str(options['workers']),
+            'GUNICORN_THREADS': str(options['threads']),
+            'GUNICORN_PRELOAD': '0' if options['no_preload'] else '1',
+            'GUNICORN_LOG_LEVEL': 'warning',
+        })
+        base = f'http://127.0.0.1:{port}'
+        started = time.perf_counter()
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                                  env=env, cwd=settings.BASE_DIR)
+        try:
+            ready = self._wait_ready(server, base + '/api/')
+            self.stdout.write(f"gunicorn（{'不' if options['no_preload'] else ''}预加载，"
+                              f"{options['workers']} worker × {options['threads']} 线程）")
+            self.stdout.write(f"  启动到第一个响应: {(ready - started) * 1000:.0f}ms")
+
+            # 所有 worker 都就绪后再读内存
+            deadline = time.monotonic() + 30
+            while len(_children(server.pid)) < options['workers'] and time.monotonic() < deadline:
+                time.sleep(0.1)
+            self._report_memory(server.pid, "请求前")
+            statuses = {}
+            for i in range(options['requests']):
+                status = _get(base + _PATHS[i % len(_PATHS)])
+                statuses[status] = statuses.get(status, 0) + 1
+            self.stdout.write(f"  发出 {options['requests']} 个请求，状态码 {statuses}")
+            self._report_memory(server.pid, "请求后")
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    def _wait_ready(self, server, url):
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"gunicorn 启动失败，退出码 {server.returncode}")
+            try:
+                _get(url)
+                return time.perf_counter()
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.05)
+        raise CommandError("gunicorn 60 秒内没有响应")
+
+    def _report_memory(self, master_pid, label):
+        master = _memory_kb(master_pid)
+        self.stdout.write(f"  {label}  主进程 RSS {master['rss'] / 1024:.1f}MB")
+        workers = [_memory_kb(pid) for pid in _children(master_pid)]
+        for i, worker in enumerate(workers):
+            self.stdout.write(
+                f"    worker {i}: RSS {worker['rss'] / 1024:.1f}MB  PSS {worker['pss'] / 1024:.1f}MB  "
+                f"独占 {worker['private'] / 1024:.1f}MB"
+            )
+        if workers:
+            total = master['pss'] + sum(worker['pss'] for worker in workers)
+            self.stdout.write(f"    合计 PSS {total / 1024:.1f}MB")
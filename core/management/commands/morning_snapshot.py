@@ -0,0 +1,94 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date as date_cls
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from core.models import DailySnapshot
+from core.sharding import group_by_shard, shard_aliases, use_shard
+from core.snapshots import compute_snapshots, save_snapshots
+
+
+def _init_worker():
+    # 子进程不能复用父进程的数据库连接
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _compute_shard(alias, user_ids, day):
+    started = time.perf_counter()
+    with use_shard(alias):
+        rows = compute_snapshots(user_ids, day)
+    return alias, rows, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = "每天早上为所有用户生成状态统计 (DailySnapshot)，按用户分片并行计算，可重复执行。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="统计日期 YYYY-MM-DD，默认今天")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="计算进程数，1 表示不开进程池")
+        parser.add_argument('--shard-size', type=int, default=2000, help="每个分片的用户数")
+        parser.add_argument('--force', action='store_true', help="重新计算已有统计的用户")
+
+    def handle(self, *args, **options):
+        try:
+            day = date_cls.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--date 格式应为 YYYY-MM-DD")
+        shard_size = max(1, options['shard_size'])
+
+        user_ids = list(User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+        if not options['force']:
+            # 已经写过的用户跳过，中途中断后重跑只补剩下的；统计表可能分在多个库里，逐库取
+            done_ids = set()
+            for alias in shard_aliases():
+                done_ids.update(DailySnapshot.objects.using(alias).filter(date=day).values_list('user_id', flat=True))
+            user_ids = [uid for uid in user_ids if uid not in done_ids]
+        # 分片不跨库：先按用户所在的库分组，再在组内按 shard_size 切
+        shards = [
+            (alias, ids[i:i + shard_size])
+            for alias, ids in group_by_shard(user_ids).items()
+            for i in range(0, len(ids), shard_size)
+        ]
+        self.stdout.write(f"{day}: {len(user_ids)} 个用户待统计，{len(shards)} 个分片")
+        if not shards:
+            return
+
+        started = time.perf_counter()
+        compute_seconds = write_seconds = 0.0
+        saved = 0
+
+        def write(alias, rows, shard_seconds):
+            # 只在父进程里写库，SQLite 同一时间只有一个写者
+            nonlocal compute_seconds, write_seconds, saved
+            write_started = time.perf_counter()
+            with use_shard(alias):
+                saved += save_snapshots(rows, day)
+            compute_seconds += shard_seconds
+            write_seconds += time.perf_counter() - write_started
+            if options['verbosity'] > 1:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {saved}/{len(user_ids)} 用户，{saved / elapsed:.0f} 用户/秒")
+
+        workers = max(1, min(options['workers'], len(shards)))
+        if workers == 1:
+            for alias, shard in shards:
+                write(*_compute_shard(alias, shard, day))
+        else:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [pool.submit(_compute_shard, alias, shard, day) for alias, shard in shards]
+                for future in as_completed(futures):
+                    write(*future.result())
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"完成 {saved} 个用户，用时 {elapsed:.2f}s，{saved / elapsed:.0f} 用户/秒 "
+            f"(进程数 {workers}，计算累计 {compute_seconds:.2f}s，写入 {write_seconds:.2f}s)"
+        ))
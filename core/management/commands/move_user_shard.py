@@ -0,0 +1,103 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import energy_buffer, sharding, work_sessions
+from core.dependencies import invalidate_graph
+from core.estimation import invalidate_estimation_stats
+from core.ical import invalidate_calendar
+from core.models import UserShard
+
+
+class Command(BaseCommand):
+    help = (
+        "把一个用户的全部数据搬到另一个分片。过程：标记迁移中（拒绝该用户的写请求）→ 等各进程的目录缓存过期 → "
+        "在目标库一个事务里复制 → 切换目录 → 再等缓存过期 → 删除源库数据。搬迁后该用户的任务等对象 id 会变。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', nargs='?')
+        parser.add_argument('target', nargs='?', help="目标库别名，见 settings.USER_SHARDS")
+        parser.add_argument('--drain', type=float, default=sharding.DIRECTORY_TTL + 1,
+                            help="每次改目录后等待的秒数，要大于目录缓存时间；使用共享缓存时可以设为 0")
+        parser.add_argument('--pin-unassigned', metavar='ALIAS',
+                            help="把还没有分片记录的用户都固定到 ALIAS。已有数据的库开启分库前先对 default 执行一次")
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError("没有开启分库（环境变量 DJANGO_SHARDS）")
+        aliases = sharding.shard_aliases()
+
+        if options['pin_unassigned']:
+            alias = options['pin_unassigned']
+            if alias not in aliases:
+                raise CommandError(f"未知的库 {alias}，可选: {', '.join(aliases)}")
+            missing = User.objects.exclude(id__in=UserShard.objects.values('user_id')).values_list('id', flat=True)
+            created = UserShard.objects.bulk_create(
+                [UserShard(user_id=user_id, alias=alias) for user_id in missing.iterator()],
+                batch_size=1000, ignore_conflicts=True,
+            )
+            self.stdout.write(self.style.SUCCESS(f"{len(created)} 个用户固定到 {alias}"))
+            return
+
+        if not options['username'] or not options['target']:
+            raise CommandError("需要 username 和 target")
+        target = options['target']
+        if target not in aliases:
+            raise CommandError(f"未知的库 {target}，可选: {', '.join(aliases)}")
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"用户 {options['username']} 不存在")
+        source, moving = sharding.directory_entry(user.pk)
+        if source == target:
+            if moving:
+                # 上次搬迁在删除源库数据后中断
+                self._set(user, moving=False)
+            self.stdout.write(f"{user.username} 已经在 {target}")
+            return
+        if work_sessions.get_session(user) is not None:
+            # 会话状态里记着任务 id，搬迁后 id 会变
+            raise CommandError(f"{user.username} 有进行中的工作会话，结束后再搬")
+        leftover = sum(sharding.user_rows(model, target, user.pk).count() for model in sharding.sharded_models())
+        if leftover:
+            raise CommandError(f"{target} 里已有 {user.username} 的 {leftover} 行数据（上次搬迁中断？），请先清理")
+
+        started = time.perf_counter()
+        self._set(user, moving=True)
+        self._drain(options['drain'], "等待各进程看到迁移标记")
+        try:
+            if energy_buffer.enabled():
+                energy_buffer.flush()
+            with transaction.atomic(using=target):
+                counts = sharding.copy_user_rows(user.pk, source, target)
+        except Exception:
+            self._set(user, moving=False)
+            raise
+        self.stdout.write(f"已复制到 {target}: {counts}")
+
+        self._set(user, alias=target)
+        self._drain(options['drain'], "等待各进程切换到新库")
+        with transaction.atomic(using=source):
+            deleted = sharding.delete_user_rows(user.pk, source)
+        self._set(user, moving=False)
+        # 对象 id 变了，按 id 缓存的结果全部作废
+        invalidate_graph(user.pk)
+        invalidate_estimation_stats(user.pk)
+        invalidate_calendar(user.pk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{user.username}: {source} -> {target}，复制 {sum(counts.values())} 行，"
+            f"删除 {deleted} 行，用时 {time.perf_counter() - started:.1f}s"
+        ))
+
+    def _set(self, user, **values):
+        UserShard.objects.filter(user=user).update(**values)
+        sharding.forget_directory_entry(user.pk)
+
+    def _drain(self, seconds, message):
+        if seconds > 0:
+            self.stdout.write(f"{message}（{seconds:.0f}s）")
+            time.sleep(seconds)
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from core.archive import iter_log_rows
+from core.journal import ROLLUP_COLUMNS, rebuild_rollups
+from core.models import ArchivedLogBatch
+from core.sharding import use_user
+
+
+class Command(BaseCommand):
+    help = ("从完整工作日志（含归档）重建按天的工作日志汇总。日常由日志入库时增量更新，"
+            "只有初始化、修改或删除日志之后才需要运行。")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', help="只重建指定用户名，可重复；默认全部用户")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(username__in=options['user'])
+        total = 0
+        for user in users.iterator():
+            with use_user(user.pk):
+                rows = iter_log_rows(ArchivedLogBatch.Kind.WORK_LOG, user, ROLLUP_COLUMNS)
+                count = rebuild_rollups(user.pk, rows)
+            total += count
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {user.username}: {count} 个会话")
+        self.stdout.write(self.style.SUCCESS(f"重建完成，共 {total} 个会话"))
@@ -0,0 +1,37 @@
+from datetime import date as date_cls, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.rollover import rollover_today_tasks, mark_overdue_tasks
+from core.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = "把所有用户前一天未完成的每日待办顺延到今天（一条 INSERT ... SELECT）。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to-date', help="顺延到的日期 YYYY-MM-DD，默认今天")
+        parser.add_argument('--from-date', help="来源日期 YYYY-MM-DD，默认 to-date 的前一天")
+        parser.add_argument('--mark-overdue', action='store_true', help="同时把已过截止日期、还没开始的任务标为已推迟（进行中、阻塞的不动）")
+
+    def handle(self, *args, **options):
+        try:
+            to_date = date_cls.fromisoformat(options['to_date']) if options['to_date'] else timezone.localdate()
+            from_date = (date_cls.fromisoformat(options['from_date']) if options['from_date']
+                         else to_date - timedelta(days=1))
+        except ValueError:
+            raise CommandError("日期格式应为 YYYY-MM-DD")
+        if from_date >= to_date:
+            raise CommandError("--to-date 必须晚于 --from-date")
+
+        created = marked = 0
+        # 分库时每个分片各执行一次
+        for alias in shard_aliases():
+            with use_shard(alias):
+                created += rollover_today_tasks(from_date, to_date)
+                if options['mark_overdue']:
+                    marked += mark_overdue_tasks(to_date)
+        self.stdout.write(f"{from_date} -> {to_date}: 顺延 {created} 条每日待办")
+        if options['mark_overdue']:
+            self.stdout.write(f"{marked} 个逾期任务标为已推迟")
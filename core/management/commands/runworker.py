@@ -0,0 +1,148 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from core import jobs
+
+logger = logging.getLogger('core.jobs')
+
+# 每隔这么多秒清理一次过期的任务和结果文件
+PURGE_INTERVAL = 3600
+
+
+def _init_worker():
+    # 子进程不能复用父进程的数据库连接
+    import django
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "执行后台任务 (core.jobs)：轮询 Job 表，领取任务交给线程池或进程池执行，执行期间定期续租。"
+        "可以同时运行多个 runworker；收到 SIGTERM / Ctrl-C 后不再领取新任务，等手上的任务执行完再退出。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread',
+                            help="thread 适合以读写数据库为主的任务；CPU 密集的任务用 process")
+        parser.add_argument('--concurrency', type=int, default=2, help="同时执行的任务数")
+        parser.add_argument('--poll', type=float, default=1.0, help="队列为空时的轮询间隔（秒）")
+        parser.add_argument('--burst', action='store_true', help="队列清空后退出（用于 cron 或测试）")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        manager = None
+        if options['mode'] == 'process':
+            manager = multiprocessing.Manager()
+            board = manager.dict()
+            pool = ProcessPoolExecutor(max_workers=concurrency, initializer=_init_worker)
+        else:
+            board = {}
+            pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job')
+
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+            self.stdout.write("收到退出信号，等待执行中的任务结束")
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f"worker {worker_id} 启动（{options['mode']} × {concurrency}）")
+        # Job 表只在这个主循环里写：领取、进度、续租、结果
+        running = {}
+        reported = {}
+        renew_interval = jobs.lease_seconds() / 3
+        last_renew = last_purge = 0.0
+        done = 0
+        try:
+            while True:
+                for future in [future for future in running if future.done()]:
+                    job_id = running[future]
+                    try:
+                        self._record(job_id, worker_id, future, options['verbosity'])
+                    except OperationalError as exc:
+                        # 写 Job 表时数据库被锁住，下一轮再记
+                        logger.warning("记录后台任务 #%s 的结果失败: %s", job_id, exc)
+                        continue
+                    del running[future]
+                    for key in (job_id, ('lost', job_id)):
+                        board.pop(key, None)
+                    reported.pop(job_id, None)
+                    done += 1
+
+                if stopping:
+                    if not running:
+                        break
+                else:
+                    free = concurrency - len(running)
+                    try:
+                        claimed = jobs.claim(worker_id, free) if free else []
+                    except OperationalError as exc:
+                        logger.warning("领取后台任务失败: %s", exc)
+                        claimed = []
+                    for job_id in claimed:
+                        running[pool.submit(jobs.execute, job_id, board)] = job_id
+                    if options['burst'] and not running:
+                        break
+
+                now = time.monotonic()
+                if running:
+                    changed = {}
+                    for job_id in running.values():
+                        progress = board.get(job_id)
+                        if progress is not None and progress != reported.get(job_id):
+                            changed[job_id] = progress
+                    if changed or now - last_renew >= renew_interval:
+                        try:
+                            owned = jobs.renew(worker_id, list(running.values()), changed)
+                        except OperationalError as exc:
+                            logger.warning("续租失败: %s", exc)
+                        else:
+                            reported.update(changed)
+                            last_renew = now
+                            for job_id in set(running.values()) - owned:
+                                board[('lost', job_id)] = True
+                elif now - last_purge >= PURGE_INTERVAL:
+                    purged = jobs.purge_finished()
+                    if purged:
+                        self.stdout.write(f"清理了 {purged} 个过期任务")
+                    last_purge = now
+
+                if running:
+                    wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(options['poll'])
+        finally:
+            pool.shutdown(wait=True)
+            if manager is not None:
+                manager.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"worker {worker_id} 退出，共执行 {done} 个任务"))
+
+    def _record(self, job_id, worker_id, future, verbosity):
+        try:
+            result, result_file = future.result()
+        except jobs.LeaseLost:
+            self.stdout.write(self.style.WARNING(f"  #{job_id} 租约被别的 worker 接手，结果丢弃"))
+        except jobs.JobError as exc:
+            jobs.fail(job_id, worker_id, str(exc), retry=False)
+            self.stdout.write(self.style.ERROR(f"  #{job_id} 失败: {exc}"))
+        except Exception as exc:
+            logger.exception("后台任务 #%s 执行出错", job_id)
+            state = jobs.fail(job_id, worker_id, f"{exc.__class__.__name__}: {exc}")
+            self.stdout.write(self.style.ERROR(f"  #{job_id} 出错（{state}）: {exc}"))
+        else:
+            jobs.finish(job_id, worker_id, result, result_file)
+            if verbosity > 1:
+                self.stdout.write(f"  #{job_id} 完成 {result}")
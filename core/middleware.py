@@ -0,0 +1,176 @@
+"""
+请求级性能统计：总耗时、SQL 条数与耗时、序列化耗时。
+
+结果写进 Server-Timing 响应头；慢请求、慢 SQL 记日志（只记 SQL 文本，不记参数，参数里是用户数据）；
+每个路由的耗时累计到进程内直方图，由 /api/metrics/ 查看（每个进程各自统计）。
+
+流式响应（导出）的查询大多在视图返回之后、迭代响应体时才执行：响应头发出时只能带上视图阶段的数字，
+迭代响应体期间的 SQL 继续计入，迭代结束后再记直方图和慢请求日志。
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core.perf')
+
+# 直方图各桶的上界（毫秒），最后一个桶收所有更慢的请求
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+_current_metrics = ContextVar('core_request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('sql_count', 'sql_seconds', 'serializer_seconds', 'serializer_depth')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+
+class serializer_timer:
+    """统计序列化耗时；嵌套的序列化器只算最外层一次。"""
+    __slots__ = ('metrics', 'started')
+
+    def __enter__(self):
+        self.metrics = _current_metrics.get()
+        if self.metrics is not None:
+            self.metrics.serializer_depth += 1
+            if self.metrics.serializer_depth == 1:
+                self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.metrics is not None:
+            if self.metrics.serializer_depth == 1:
+                self.metrics.serializer_seconds += time.perf_counter() - self.started
+            self.metrics.serializer_depth -= 1
+
+
+class RouteHistograms:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, elapsed_ms):
+        index = bisect_left(HISTOGRAM_BUCKETS_MS, elapsed_ms)
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * (len(HISTOGRAM_BUCKETS_MS) + 1),
+                }
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['buckets'][index] += 1
+
+    @staticmethod
+    def _percentile(stats, fraction):
+        # 直方图只能给出所在桶的上界
+        target = stats['count'] * fraction
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS_MS + (None,), stats['buckets']):
+            seen += count
+            if seen >= target:
+                return bound if bound is not None else round(stats['max_ms'], 1)
+        return None
+
+    def snapshot(self):
+        with self._lock:
+            routes = {route: {**stats, 'buckets': list(stats['buckets'])} for route, stats in self._routes.items()}
+        result = {}
+        for route, stats in sorted(routes.items()):
+            result[route] = {
+                'count': stats['count'],
+                'mean_ms': round(stats['total_ms'] / stats['count'], 2),
+                'max_ms': round(stats['max_ms'], 2),
+                'p50_ms': self._percentile(stats, 0.50),
+                'p95_ms': self._percentile(stats, 0.95),
+                'p99_ms': self._percentile(stats, 0.99),
+                'buckets': dict(zip([f"le_{bound}" for bound in HISTOGRAM_BUCKETS_MS] + ['inf'], stats['buckets'])),
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_histograms = RouteHistograms()
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_request_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', 500)
+        self.slow_query_ms = getattr(settings, 'PERF_SLOW_QUERY_MS', 100)
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        started = time.perf_counter()
+        record_query = self._query_recorder(request, metrics)
+
+        token = _current_metrics.set(metrics)
+        try:
+            with self._recording(record_query):
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+
+        # Server-Timing 必须在响应体之前发出，流式响应这里只有视图阶段的数字
+        response['Server-Timing'] = (
+            f'db;dur={metrics.sql_seconds * 1000:.1f};desc="{metrics.sql_count} queries", '
+            f'ser;dur={metrics.serializer_seconds * 1000:.1f}, '
+            f'total;dur={(time.perf_counter() - started) * 1000:.1f}'
+        )
+        # FileResponse 会被 WSGI 服务器直接按文件发送，不经过迭代器，也不查库
+        if response.streaming and getattr(response, 'file_to_stream', None) is None:
+            response.streaming_content = self._stream(response.streaming_content, request, metrics, started,
+                                                      record_query)
+        else:
+            self._finish(request, metrics, started)
+        return response
+
+    def _query_recorder(self, request, metrics):
+        def record_query(execute, sql, params, many, context):
+            query_started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = time.perf_counter() - query_started
+                metrics.sql_count += 1
+                metrics.sql_seconds += elapsed
+                if elapsed * 1000 >= self.slow_query_ms:
+                    logger.warning("慢查询 %.1fms %s %s: %s", elapsed * 1000, request.method, request.path, sql)
+        return record_query
+
+    @staticmethod
+    def _recording(record_query):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(record_query))
+        return stack
+
+    def _stream(self, content, request, metrics, started, record_query):
+        try:
+            with self._recording(record_query):
+                yield from content
+        finally:
+            self._finish(request, metrics, started)
+
+    def _finish(self, request, metrics, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        route = f"{request.method} /{match.route}" if match is not None else f"{request.method} <unmatched>"
+        route_histograms.observe(route, total_ms)
+        if total_ms >= self.slow_request_ms:
+            logger.warning("慢请求 %.1fms %s %s (SQL %d 条 %.1fms，序列化 %.1fms)",
+                           total_ms, request.method, request.get_full_path(),
+                           metrics.sql_count, metrics.sql_seconds * 1000, metrics.serializer_seconds * 1000)
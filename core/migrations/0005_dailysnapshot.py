@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_todaytask'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='统计日期')),
+                ('completed_yesterday', models.PositiveIntegerField(default=0, verbose_name='昨日完成任务数')),
+                ('overdue_tasks', models.PositiveIntegerField(default=0, verbose_name='逾期任务数')),
+                ('today_task_count', models.PositiveIntegerField(default=0, verbose_name='今日待办数')),
+                ('today_estimated_minutes', models.PositiveIntegerField(default=0, verbose_name='今日预估分钟数')),
+                ('work_minutes_budget', models.PositiveIntegerField(default=0, verbose_name='每日工作时长预算 (分钟)')),
+                ('today_energy_points', models.PositiveIntegerField(default=0, verbose_name='今日精力负载 (点数)')),
+                ('energy_budget', models.PositiveIntegerField(default=0, verbose_name='每日能量预算 (点数)')),
+                ('today_bandwidth_points', models.PositiveIntegerField(default=0, verbose_name='今日带宽负载 (点数)')),
+                ('bandwidth_budget', models.PositiveIntegerField(default=0, verbose_name='每日带宽预算 (点数)')),
+                ('energy_avg_recent', models.FloatField(blank=True, null=True, verbose_name='近7天平均精力')),
+                ('energy_avg_previous', models.FloatField(blank=True, null=True, verbose_name='前7天平均精力')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='统计时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_snapshots', to=settings.AUTH_USER_MODEL, verbose_name='所属用户')),
+            ],
+            options={
+                'verbose_name': '每日状态统计',
+                'verbose_name_plural': '每日状态统计',
+                'ordering': ['user', '-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
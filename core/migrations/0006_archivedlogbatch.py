@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_dailysnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedLogBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('worklog', '工作日志'), ('energylog', '精力日志')], max_length=20, verbose_name='日志类型')),
+                ('range_start', models.DateTimeField(verbose_name='最早记录时间')),
+                ('range_end', models.DateTimeField(verbose_name='最晚记录时间')),
+                ('first_id', models.BigIntegerField(verbose_name='起始原始 ID')),
+                ('last_id', models.BigIntegerField(verbose_name='结束原始 ID')),
+                ('row_count', models.PositiveIntegerField(verbose_name='行数')),
+                ('payload', models.BinaryField(verbose_name='压缩数据 (zlib JSON)')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='归档时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_log_batches', to=settings.AUTH_USER_MODEL, verbose_name='所属用户')),
+            ],
+            options={
+                'verbose_name': '日志归档批次',
+                'verbose_name_plural': '日志归档批次',
+                'ordering': ['user', 'kind', 'range_start'],
+                'indexes': [models.Index(fields=['user', 'kind', 'range_start'], name='core_archiv_user_id_0af818_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_archivedlogbatch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100, verbose_name='名称')),
+                ('key_hash', models.CharField(max_length=64, unique=True, verbose_name='令牌摘要')),
+                ('prefix', models.CharField(max_length=8, verbose_name='令牌前缀')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='过期时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_tokens', to=settings.AUTH_USER_MODEL, verbose_name='所属用户')),
+            ],
+            options={
+                'verbose_name': 'API 令牌',
+                'verbose_name_plural': 'API 令牌',
+                'ordering': ['user', '-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_apitoken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnergyProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level_sums', models.BinaryField(verbose_name='衰减后的精力点数之和')),
+                ('weights', models.BinaryField(verbose_name='衰减后的样本权重')),
+                ('decayed_to', models.DateTimeField(verbose_name='衰减基准时间')),
+                ('sample_count', models.PositiveIntegerField(default=0, verbose_name='累计样本数')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='版本')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='energy_profile', to=settings.AUTH_USER_MODEL, verbose_name='所属用户')),
+            ],
+            options={
+                'verbose_name': '精力画像',
+                'verbose_name_plural': '精力画像',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_energyprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailysnapshot',
+            index=models.Index(fields=['date'], name='core_dailys_date_bb45c3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='energylog',
+            index=models.Index(fields=['timestamp'], name='core_energy_timesta_8a552d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'end_date'], name='core_task_status_530db0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_at'], name='core_task_created_9e4493_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todaytask',
+            index=models.Index(fields=['date'], name='core_todayt_date_8bd595_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='worklog',
+            index=models.Index(fields=['timestamp_start'], name='core_worklo_timesta_c49d5b_idx'),
+        ),
+    ]
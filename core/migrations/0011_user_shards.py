@@ -0,0 +1,85 @@
+# Generated by Django 5.0.1 on 2026-10-18 22:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0010_taskdependency'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shard', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+                ('alias', models.CharField(max_length=50, verbose_name='数据库别名')),
+                ('moving', models.BooleanField(default=False, verbose_name='迁移中')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '用户分片',
+                'verbose_name_plural': '用户分片',
+            },
+        ),
+        migrations.AlterField(
+            model_name='archivedlogbatch',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_log_batches', to=settings.AUTH_USER_MODEL, verbose_name='所属用户'),
+        ),
+        migrations.AlterField(
+            model_name='dailysnapshot',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_snapshots', to=settings.AUTH_USER_MODEL, verbose_name='所属用户'),
+        ),
+        migrations.AlterField(
+            model_name='energylog',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='energy_logs', to=settings.AUTH_USER_MODEL, verbose_name='所属用户'),
+        ),
+        migrations.AlterField(
+            model_name='energyprofile',
+            name='user',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='energy_profile', to=settings.AUTH_USER_MODEL, verbose_name='所属用户'),
+        ),
+        migrations.AlterField(
+            model_name='longtermgoal',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='long_term_goals', to=settings.AUTH_USER_MODEL, verbose_name='所属用户'),
+        ),
+        migrations.AlterField(
+            model_name='shorttermgoal',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='short_term_goals', to=settings.AUTH_USER_MODEL, verbose_name='所属用户'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to=settings.AUTH_USER_MODEL, verbose_name='所属用户'),
+        ),
+        migrations.AlterField(
+            model_name='taskdependency',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='task_dependencies', to=settings.AUTH_USER_MODEL, verbose_name='所属用户'),
+        ),
+        migrations.AlterField(
+            model_name='todaytask',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='today_tasks_entries', to=settings.AUTH_USER_MODEL, verbose_name='所属用户'),
+        ),
+        migrations.AlterField(
+            model_name='usersetting',
+            name='user',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='用户'),
+        ),
+        migrations.AlterField(
+            model_name='worklog',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='work_logs', to=settings.AUTH_USER_MODEL, verbose_name='所属用户'),
+        ),
+    ]
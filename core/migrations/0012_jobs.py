@@ -0,0 +1,46 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_user_shards'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('export', '导出'), ('import', '导入'), ('energy_profile', '重建精力画像')], max_length=30, verbose_name='类型')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='参数')),
+                ('status', models.CharField(choices=[('queued', '排队中'), ('running', '执行中'), ('succeeded', '已完成'), ('failed', '失败')], default='queued', max_length=20, verbose_name='状态')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='进度 (%)')),
+                ('progress_message', models.CharField(blank=True, max_length=200, verbose_name='进度说明')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='已尝试次数')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='最多尝试次数')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='最早执行时间')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='执行者')),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='租约到期时间')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='结果')),
+                ('result_file', models.CharField(blank=True, max_length=255, verbose_name='结果文件')),
+                ('error', models.TextField(blank=True, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='所属用户')),
+            ],
+            options={
+                'verbose_name': '后台任务',
+                'verbose_name_plural': '后台任务',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='core_job_status_df1a33_idx'), models.Index(fields=['user', '-created_at'], name='core_job_user_id_3056b6_idx')],
+            },
+        ),
+    ]
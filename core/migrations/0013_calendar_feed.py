@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0012_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeed',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='calendar_feed', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+                ('key_hash', models.CharField(max_length=64, unique=True, verbose_name='令牌摘要')),
+                ('prefix', models.CharField(max_length=8, verbose_name='令牌前缀')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '日历订阅',
+                'verbose_name_plural': '日历订阅',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_calendar_feed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('export', '导出'), ('import', '导入'), ('energy_profile', '重建精力画像'), ('work_journal', '重建工作日志汇总')], max_length=30, verbose_name='类型'),
+        ),
+        migrations.CreateModel(
+            name='WorkLogDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('focus_minutes', models.PositiveIntegerField(default=0, verbose_name='专注时长 (分钟)')),
+                ('sessions', models.PositiveIntegerField(default=0, verbose_name='会话数')),
+                ('first_start', models.DateTimeField(verbose_name='最早开始时间')),
+                ('last_end', models.DateTimeField(verbose_name='最晚结束时间')),
+                ('by_task', models.JSONField(default=dict, verbose_name='按任务')),
+                ('by_source', models.JSONField(default=dict, verbose_name='按任务来源')),
+                ('end_states', models.JSONField(default=dict, verbose_name='结束状态')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='版本')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='work_log_rollups', to=settings.AUTH_USER_MODEL, verbose_name='所属用户')),
+            ],
+            options={
+                'verbose_name': '工作日志汇总',
+                'verbose_name_plural': '工作日志汇总',
+                'ordering': ['user', '-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -6,7 +6,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 
 # --- 用户偏好设置相关模型 (与之前设计类似) ---
 class UserSetting(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, verbose_name="用户")
+    user = models.OneToOneField(User, on_delete=models.CASCADE, db_constraint=False, primary_key=True,
+                                verbose_name="用户")
     daily_work_hours = models.FloatField(
         default=8.0, validators=[MinValueValidator(0.1), MaxValueValidator(24.0)], verbose_name="每日计划工作时长 (小时)"
     )
@@ -40,7 +41,8 @@ from django.dispatch import receiver
 @receiver(post_save, sender=User)
 def create_or_update_user_setting(sender, instance, created, **kwargs):
     if created:
-        UserSetting.objects.create(user=instance)
+        # 通过实例 save()，分库时路由器能按 user_id 选到用户所在的库
+        UserSetting(user=instance).save(force_insert=True)
     # 如果需要在User对象保存时也触发UserSetting的保存（例如更新last_modified），
     # 可以添加 instance.usersetting.save()，但通常OneToOneField会自动处理。
     # 确保 instance.usersetting 存在 (例如，通过上面的create)
@@ -48,7 +50,7 @@ def create_or_update_user_setting(sender, instance, created, **kwargs):
         instance.usersetting.save()  # 确保UserSetting的last_modified更新等
     except UserSetting.DoesNotExist:
         # 这种情况理论上不应发生，因为上面created时会创建
-        UserSetting.objects.create(user=instance)
+        UserSetting(user=instance).save(force_insert=True)
 
 
 class BandwidthTagCost(models.Model):
@@ -106,7 +108,8 @@ class LongTermGoal(models.Model):
         PURSUING = '持续追求', '持续追求'
         ARCHIVED = '已归档', '已归档'
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="long_term_goals", verbose_name="所属用户")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name="long_term_goals",
+                             verbose_name="所属用户")
     name = models.TextField(verbose_name="长期目标描述")
     status = models.CharField(
         max_length=50, choices=GoalStatus.choices, default=GoalStatus.PURSUING, verbose_name="目标状态"
@@ -138,7 +141,8 @@ class ShortTermGoal(models.Model):
         LOW_URGENT = '紧急不重要', '紧急不重要'
         LOW_NOT_URGENT = '不重要不紧急', '不重要不紧急'
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="short_term_goals", verbose_name="所属用户")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name="short_term_goals",
+                             verbose_name="所属用户")
     name = models.TextField(verbose_name="短期目标描述")
     target_date = models.DateField(null=True, blank=True, verbose_name="目标完成日期")
     priority = models.CharField(
@@ -173,6 +177,29 @@ class EnergyLevel(models.TextChoices):
     NONE = '', '未设置'
 
 
+# 精力水平折算成点数，用于和每日能量预算比较、求平均等
+ENERGY_LEVEL_POINTS = {
+    EnergyLevel.HIGH: 3,
+    EnergyLevel.MEDIUM: 2,
+    EnergyLevel.LOW: 1,
+}
+
+
+def energy_points_expression(field_name):
+    """把精力字段换算成点数的 SQL 表达式，未设置的记 0。"""
+    return models.Case(
+        *[models.When(**{field_name: level}, then=models.Value(points))
+          for level, points in ENERGY_LEVEL_POINTS.items()],
+        default=models.Value(0),
+        output_field=models.IntegerField(),
+    )
+
+
+def split_tags(tags):
+    """把逗号分隔的标签文本拆成列表。"""
+    return [tag.strip() for tag in (tags or '').split(',') if tag.strip()]
+
+
 class Task(models.Model):
     class TaskStatus(models.TextChoices):
         NOT_STARTED = '未开始', '未开始'
@@ -183,7 +210,8 @@ class Task(models.Model):
         CANCELLED = '已取消', '已取消'
         BLOCKED = '阻塞', '阻塞'
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tasks", verbose_name="所属用户")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name="tasks",
+                             verbose_name="所属用户")
     name = models.CharField(max_length=255, verbose_name="任务名称")
     short_term_goal_ref = models.ForeignKey(
         ShortTermGoal, on_delete=models.SET_NULL, null=True, blank=True,
@@ -211,6 +239,14 @@ class Task(models.Model):
     type = models.CharField(max_length=100, blank=True, default="", verbose_name="任务类型 (临时)")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记下读出时的状态，保存时据此判断是否离开了"已完成"（见 core.estimation）
+        if 'status' in field_names:
+            instance._loaded_status = values[field_names.index('status')]
+        return instance
+
     def __str__(self):
         return f"{self.name} (P{self.priority}, 用户: {self.user.username})"
 
@@ -218,11 +254,14 @@ class Task(models.Model):
         verbose_name = "任务"
         verbose_name_plural = "任务清单"
         ordering = ['user', 'priority', 'end_date', 'name']  # 按用户，再按优先级等排序
+        # 后台按状态筛选、按创建时间分层浏览
+        indexes = [models.Index(fields=['status', 'end_date']), models.Index(fields=['created_at'])]
 
 
 class WorkLog(models.Model):
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="work_logs", verbose_name="所属用户")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name="work_logs",
+                             verbose_name="所属用户")
     # 关联到已执行的任务
     task_ref = models.ForeignKey(
         Task,
@@ -252,10 +291,12 @@ class WorkLog(models.Model):
         verbose_name = "工作日志"
         verbose_name_plural = "工作日志"
         ordering = ['user', '-timestamp_start']
+        indexes = [models.Index(fields=['timestamp_start'])]
 
 
 class EnergyLog(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="energy_logs", verbose_name="所属用户")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name="energy_logs",
+                             verbose_name="所属用户")
     timestamp = models.DateTimeField(default=timezone.now, verbose_name="记录时间")
     energy_level = models.CharField(max_length=10, choices=EnergyLevel.choices, blank=True, null=True,
                                     verbose_name="精力水平")
@@ -268,10 +309,11 @@ class EnergyLog(models.Model):
         verbose_name = "精力日志"
         verbose_name_plural = "精力日志"
         ordering = ['user', '-timestamp']
+        indexes = [models.Index(fields=['timestamp'])]
 
 
 class TodayTask(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="today_tasks_entries",
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name="today_tasks_entries",
                              verbose_name="所属用户")
     date = models.DateField(verbose_name="日期")
     task = models.ForeignKey(
@@ -288,4 +330,237 @@ class TodayTask(models.Model):
     class Meta:
         verbose_name = "每日待办任务"
         verbose_name_plural = "每日待办任务"
-        unique_together = ('user', 'date', 'task')
\ No newline at end of file
+        unique_together = ('user', 'date', 'task')
+        indexes = [models.Index(fields=['date'])]
+
+
+class DailySnapshot(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name="daily_snapshots",
+                             verbose_name="所属用户")
+    date = models.DateField(verbose_name="统计日期")
+    completed_yesterday = models.PositiveIntegerField(default=0, verbose_name="昨日完成任务数")
+    overdue_tasks = models.PositiveIntegerField(default=0, verbose_name="逾期任务数")
+    today_task_count = models.PositiveIntegerField(default=0, verbose_name="今日待办数")
+    today_estimated_minutes = models.PositiveIntegerField(default=0, verbose_name="今日预估分钟数")
+    work_minutes_budget = models.PositiveIntegerField(default=0, verbose_name="每日工作时长预算 (分钟)")
+    today_energy_points = models.PositiveIntegerField(default=0, verbose_name="今日精力负载 (点数)")
+    energy_budget = models.PositiveIntegerField(default=0, verbose_name="每日能量预算 (点数)")
+    today_bandwidth_points = models.PositiveIntegerField(default=0, verbose_name="今日带宽负载 (点数)")
+    bandwidth_budget = models.PositiveIntegerField(default=0, verbose_name="每日带宽预算 (点数)")
+    energy_avg_recent = models.FloatField(null=True, blank=True, verbose_name="近7天平均精力")
+    energy_avg_previous = models.FloatField(null=True, blank=True, verbose_name="前7天平均精力")
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="统计时间")
+
+    @property
+    def energy_trend(self):
+        if self.energy_avg_recent is None or self.energy_avg_previous is None:
+            return None
+        return self.energy_avg_recent - self.energy_avg_previous
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date.strftime('%Y-%m-%d')} 晨间统计"
+
+    class Meta:
+        verbose_name = "每日状态统计"
+        verbose_name_plural = "每日状态统计"
+        unique_together = ('user', 'date')
+        ordering = ['user', '-date']
+        indexes = [models.Index(fields=['date'])]
+
+
+class ArchivedLogBatch(models.Model):
+    class Kind(models.TextChoices):
+        WORK_LOG = 'worklog', '工作日志'
+        ENERGY_LOG = 'energylog', '精力日志'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name="archived_log_batches",
+                             verbose_name="所属用户")
+    kind = models.CharField(max_length=20, choices=Kind.choices, verbose_name="日志类型")
+    range_start = models.DateTimeField(verbose_name="最早记录时间")
+    range_end = models.DateTimeField(verbose_name="最晚记录时间")
+    first_id = models.BigIntegerField(verbose_name="起始原始 ID")
+    last_id = models.BigIntegerField(verbose_name="结束原始 ID")
+    row_count = models.PositiveIntegerField(verbose_name="行数")
+    payload = models.BinaryField(verbose_name="压缩数据 (zlib JSON)")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="归档时间")
+
+    def __str__(self):
+        return f"{self.user.username} - {self.get_kind_display()} 归档 {self.row_count} 行"
+
+    class Meta:
+        verbose_name = "日志归档批次"
+        verbose_name_plural = "日志归档批次"
+        ordering = ['user', 'kind', 'range_start']
+        indexes = [models.Index(fields=['user', 'kind', 'range_start'])]
+
+
+class ApiToken(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="api_tokens", verbose_name="所属用户")
+    name = models.CharField(max_length=100, blank=True, verbose_name="名称")
+    # 只保存 SHA-256 摘要，明文只在创建时返回一次
+    key_hash = models.CharField(max_length=64, unique=True, verbose_name="令牌摘要")
+    prefix = models.CharField(max_length=8, verbose_name="令牌前缀")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name="过期时间")
+
+    def __str__(self):
+        return f"{self.prefix}… ({self.name or '未命名'}, 用户: {self.user.username})"
+
+    class Meta:
+        verbose_name = "API 令牌"
+        verbose_name_plural = "API 令牌"
+        ordering = ['user', '-created_at']
+
+
+class CalendarFeed(models.Model):
+    """日历订阅（core.ical）。订阅地址里的令牌只能读取日历，与 API 令牌分开；同样只保存摘要。"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="calendar_feed",
+                                verbose_name="用户")
+    key_hash = models.CharField(max_length=64, unique=True, verbose_name="令牌摘要")
+    prefix = models.CharField(max_length=8, verbose_name="令牌前缀")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+
+    def __str__(self):
+        return f"{self.prefix}… (用户: {self.user_id})"
+
+    class Meta:
+        verbose_name = "日历订阅"
+        verbose_name_plural = "日历订阅"
+
+
+class EnergyProfile(models.Model):
+    """
+    每个用户按 星期×小时 (7×24) 统计的精力画像，由 core.energy_profile 在精力日志入库时增量更新。
+    两个数组都按 '<168f' 打包存放，下标为 weekday * 24 + hour（周一为 0）。
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, db_constraint=False, related_name="energy_profile",
+                                verbose_name="所属用户")
+    level_sums = models.BinaryField(verbose_name="衰减后的精力点数之和")
+    weights = models.BinaryField(verbose_name="衰减后的样本权重")
+    decayed_to = models.DateTimeField(verbose_name="衰减基准时间")
+    sample_count = models.PositiveIntegerField(default=0, verbose_name="累计样本数")
+    # 乐观锁：并发更新时以版本号判断是否被别人改过
+    version = models.PositiveIntegerField(default=0, verbose_name="版本")
+
+    def __str__(self):
+        return f"{self.user.username} 的精力画像 ({self.sample_count} 个样本)"
+
+    class Meta:
+        verbose_name = "精力画像"
+        verbose_name_plural = "精力画像"
+
+
+class WorkLogDailyRollup(models.Model):
+    """
+    工作日志按天的汇总（core.journal），每条 WorkLog 入库时并入它开始那天的一行，
+    日志日报和年度热力图只读这张表。归档、删除 WorkLog 不会回减；需要时用 rebuild_journal 重建。
+    by_task / by_source / end_states 的空值键为 ''。
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name="work_log_rollups",
+                             verbose_name="所属用户")
+    date = models.DateField(verbose_name="日期")
+    focus_minutes = models.PositiveIntegerField(default=0, verbose_name="专注时长 (分钟)")
+    sessions = models.PositiveIntegerField(default=0, verbose_name="会话数")
+    first_start = models.DateTimeField(verbose_name="最早开始时间")
+    last_end = models.DateTimeField(verbose_name="最晚结束时间")
+    # {"<任务 id 或 name:任务名>": {"task": id, "name": 名称, "minutes": 分钟, "sessions": 次数}}
+    by_task = models.JSONField(default=dict, verbose_name="按任务")
+    # {"<任务来源>": {"minutes": 分钟, "sessions": 次数}}
+    by_source = models.JSONField(default=dict, verbose_name="按任务来源")
+    # {"<结束状态>": 次数}
+    end_states = models.JSONField(default=dict, verbose_name="结束状态")
+    # 乐观锁，同 EnergyProfile
+    version = models.PositiveIntegerField(default=0, verbose_name="版本")
+
+    def __str__(self):
+        return f"{self.date} {self.focus_minutes} 分钟 (用户: {self.user_id})"
+
+    class Meta:
+        verbose_name = "工作日志汇总"
+        verbose_name_plural = "工作日志汇总"
+        ordering = ['user', '-date']
+        # 热力图按 (user, date) 范围读，唯一约束的索引正好覆盖
+        unique_together = ('user', 'date')
+
+
+class TaskDependency(models.Model):
+    """任务依赖：task 要等 depends_on 结束（完成或取消）后才能开始。"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name="task_dependencies",
+                             verbose_name="所属用户")
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="dependencies", verbose_name="任务")
+    depends_on = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="dependents",
+                                   verbose_name="依赖的任务")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+
+    def __str__(self):
+        return f"{self.task_id} 依赖 {self.depends_on_id}"
+
+    class Meta:
+        verbose_name = "任务依赖"
+        verbose_name_plural = "任务依赖"
+        unique_together = ('task', 'depends_on')
+
+
+class UserShard(models.Model):
+    """用户数据所在的数据库（core.sharding）。只存在全局库里；第一次访问某个用户时按哈希分配并记下。"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="shard",
+                                verbose_name="用户")
+    alias = models.CharField(max_length=50, verbose_name="数据库别名")
+    # 迁移过程中为真，这段时间拒绝该用户的写请求
+    moving = models.BooleanField(default=False, verbose_name="迁移中")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.alias}"
+
+    class Meta:
+        verbose_name = "用户分片"
+        verbose_name_plural = "用户分片"
+
+
+class Job(models.Model):
+    """后台任务（core.jobs），由 runworker 命令领取执行。只存在全局库里。"""
+
+    class Kind(models.TextChoices):
+        EXPORT = 'export', '导出'
+        IMPORT = 'import', '导入'
+        ENERGY_PROFILE = 'energy_profile', '重建精力画像'
+        WORK_JOURNAL = 'work_journal', '重建工作日志汇总'
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', '排队中'
+        RUNNING = 'running', '执行中'
+        SUCCEEDED = 'succeeded', '已完成'
+        FAILED = 'failed', '失败'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="jobs", verbose_name="所属用户")
+    kind = models.CharField(max_length=30, choices=Kind.choices, verbose_name="类型")
+    params = models.JSONField(default=dict, blank=True, verbose_name="参数")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED, verbose_name="状态")
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="进度 (%)")
+    progress_message = models.CharField(max_length=200, blank=True, verbose_name="进度说明")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="已尝试次数")
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name="最多尝试次数")
+    # 排队中的任务要到这个时间才能被领取（失败重试时往后推）
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="最早执行时间")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="执行者")
+    lease_expires_at = models.DateTimeField(null=True, blank=True, verbose_name="租约到期时间")
+    result = models.JSONField(null=True, blank=True, verbose_name="结果")
+    # 相对 settings.JOB_RESULT_DIR 的路径
+    result_file = models.CharField(max_length=255, blank=True, verbose_name="结果文件")
+    error = models.TextField(blank=True, verbose_name="错误信息")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="开始时间")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="结束时间")
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_kind_display()} ({self.get_status_display()}, 用户: {self.user_id})"
+
+    class Meta:
+        verbose_name = "后台任务"
+        verbose_name_plural = "后台任务"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['user', '-created_at']),
+        ]
@@ -0,0 +1,50 @@
+"""
+把前一天没做完的每日待办顺延到下一天。
+
+用一条 INSERT ... SELECT 完成，不逐条走 TodayTaskViewSet；
+(user, date, task) 上已有唯一约束，重复执行时冲突行直接跳过。
+"""
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .ical import invalidate_calendar
+from .models import Task, TodayTask
+
+UNFINISHED_EXCLUDED_STATUSES = [Task.TaskStatus.COMPLETED, Task.TaskStatus.CANCELLED]
+# 过期后会被标为"已推迟"的状态：只有还没动手的任务。进行中的保持原样；
+# 阻塞由 core.dependencies 按前置任务维护，改掉会让前置完成后无法自动解除
+OVERDUE_MARKABLE_STATUSES = [Task.TaskStatus.NOT_STARTED, Task.TaskStatus.WAITING]
+
+
+def rollover_today_tasks(from_date, to_date, user=None):
+    """把 from_date 上任务未完成的 TodayTask 复制到 to_date，返回新增条数。"""
+    today_table = TodayTask._meta.db_table
+    task_table = Task._meta.db_table
+    sql = (
+        f"INSERT INTO {today_table} (user_id, date, task_id, added_at) "
+        f"SELECT tt.user_id, %s, tt.task_id, %s "
+        f"FROM {today_table} tt INNER JOIN {task_table} t ON t.id = tt.task_id "
+        f"WHERE tt.date = %s AND t.status NOT IN (%s, %s)"
+    )
+    params = [to_date, timezone.now(), from_date, *UNFINISHED_EXCLUDED_STATUSES]
+    if user is not None:
+        sql += " AND tt.user_id = %s"
+        params.append(user.pk)
+    sql += " ON CONFLICT (user_id, date, task_id) DO NOTHING"
+    # 分库时只处理当前分片（或 user 所在分片）里的行
+    using = router.db_for_write(TodayTask, instance=user)
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        created = cursor.rowcount
+    if created:
+        # 不逐个用户作废：没指定用户时是夜间任务，所有订阅日历都重新生成一次
+        invalidate_calendar(user.pk if user is not None else None)
+    return created
+
+
+def mark_overdue_tasks(today, user=None):
+    """把截止日期已过且还没开始（未开始 / 等待中）的任务标为"已推迟"，一条 UPDATE，返回更新条数。"""
+    tasks = Task.objects.filter(end_date__lt=today, status__in=OVERDUE_MARKABLE_STATUSES)
+    if user is not None:
+        tasks = tasks.filter(user=user)
+    return tasks.update(status=Task.TaskStatus.POSTPONED)
@@ -1,11 +1,28 @@
+from django.urls import reverse
 from rest_framework import serializers
+from rest_framework.fields import empty
+
+from .estimation import correction_factors, corrected_estimate, get_estimation_stats
+from .middleware import serializer_timer
 from .models import (
     BandwidthTagCost, FixedSchedule, TodayTask,
-    LongTermGoal, ShortTermGoal, Task, EnergyLog
+    LongTermGoal, ShortTermGoal, Task, EnergyLog, ApiToken, WorkLog, EnergyLevel, TaskDependency, Job
 )
 
 
-class LongTermGoalSerializer(serializers.ModelSerializer):
+class TimedSerializerMixin:
+    """把序列化和校验耗时计入 PerformanceMiddleware 的统计（Server-Timing 里的 ser）。"""
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+    def run_validation(self, data=empty):
+        with serializer_timer():
+            return super().run_validation(data)
+
+
+class LongTermGoalSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     username = serializers.StringRelatedField(source='user', read_only=True)
     user = serializers.PrimaryKeyRelatedField(read_only=True)
 
@@ -15,7 +32,7 @@ class LongTermGoalSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'username']
 
 
-class ShortTermGoalSerializer(serializers.ModelSerializer):
+class ShortTermGoalSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     username = serializers.StringRelatedField(source='user', read_only=True)
     user = serializers.PrimaryKeyRelatedField(read_only=True)
 
@@ -25,28 +42,38 @@ class ShortTermGoalSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'username']
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     short_term_goal_name = serializers.StringRelatedField(source='short_term_goal_ref', read_only=True)
     long_term_goal_name = serializers.StringRelatedField(source='long_term_goal_ref', read_only=True)
+    # 按历史 实际/预估 比值修正后的预估分钟数，见 core.estimation
+    corrected_estimate_minutes = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
         fields = '__all__'
         read_only_fields = ['id', 'created_at', 'user', 'short_term_goal_name', 'long_term_goal_name']
 
+    def get_corrected_estimate_minutes(self, obj):
+        # 同一次响应里的所有任务共用一份统计（context 在列表的各个子序列化器间共享）
+        factors = self.context.setdefault('_estimation_factors', {})
+        if obj.user_id not in factors:
+            factors[obj.user_id] = correction_factors(get_estimation_stats(obj.user_id))
+        return corrected_estimate(obj, factors[obj.user_id])
+
 
-class EnergyLogSerializer(serializers.ModelSerializer):
+class EnergyLogSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     username = serializers.StringRelatedField(source='user', read_only=True)
     user = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = EnergyLog
         fields = '__all__'
-        read_only_fields = ['id', 'timestamp', 'username']
+        # timestamp 可选，离线补传时带上采样时间，不带则为当前时间
+        read_only_fields = ['id', 'username']
 
 
-class BandwidthTagCostSerializer(serializers.ModelSerializer):
+class BandwidthTagCostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(source='user_setting.user', read_only=True)
 
     class Meta:
@@ -55,7 +82,7 @@ class BandwidthTagCostSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user']
 
 
-class FixedScheduleSerializer(serializers.ModelSerializer):
+class FixedScheduleSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(source='user_setting.user', read_only=True)
 
     class Meta:
@@ -64,7 +91,7 @@ class FixedScheduleSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user']
 
 
-class TodayTaskSerializer(serializers.ModelSerializer):
+class TodayTaskSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     # 可以选择嵌套TaskSerializer以显示任务详情，或者只显示task_id并在前端单独获取任务详情
     task_details = TaskSerializer(source='task', read_only=True)  # 读取时显示任务详情
     task = serializers.PrimaryKeyRelatedField(queryset=Task.objects.all())  # 写入时接收Task ID
@@ -86,3 +113,115 @@ class TodayTaskSerializer(serializers.ModelSerializer):
         # 确保user字段被正确设置
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
+
+
+class TodayTaskRangeSerializer(serializers.Serializer):
+    """多日计划查询参数，查询串里写作 ?from=&to=（含两端）。"""
+    MAX_DAYS = 366
+
+    from_date = serializers.DateField()
+    to_date = serializers.DateField()
+
+    def validate(self, attrs):
+        days = (attrs['to_date'] - attrs['from_date']).days + 1
+        if days < 1:
+            raise serializers.ValidationError("to 不能早于 from。")
+        if days > self.MAX_DAYS:
+            raise serializers.ValidationError(f"一次最多查询 {self.MAX_DAYS} 天。")
+        return attrs
+
+
+class TodayTaskRolloverSerializer(serializers.Serializer):
+    from_date = serializers.DateField(required=False, help_text="默认昨天")
+    to_date = serializers.DateField(required=False, help_text="默认今天")
+    mark_overdue = serializers.BooleanField(default=False, help_text="同时把已过截止日期、还没开始的任务标为已推迟（进行中、阻塞的不动）")
+
+    def validate(self, attrs):
+        from_date = attrs.get('from_date')
+        to_date = attrs.get('to_date')
+        if from_date and to_date and from_date >= to_date:
+            raise serializers.ValidationError("to_date 必须晚于 from_date。")
+        return attrs
+
+
+class TaskDependencySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    task = serializers.PrimaryKeyRelatedField(queryset=Task.objects.none())
+    depends_on = serializers.PrimaryKeyRelatedField(queryset=Task.objects.none())
+
+    class Meta:
+        model = TaskDependency
+        fields = ['id', 'task', 'depends_on', 'created_at']
+        read_only_fields = ['id', 'created_at']
+        # 重复依赖在视图里检查，不生成 UniqueTogetherValidator（它会绕过上面按用户限定的 queryset）
+        validators = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None:
+            self.fields['task'].queryset = Task.objects.filter(user=request.user)
+            self.fields['depends_on'].queryset = Task.objects.filter(user=request.user)
+
+
+class WorkLogSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        model = WorkLog
+        fields = '__all__'
+
+
+class WorkSessionStartSerializer(serializers.Serializer):
+    task = serializers.PrimaryKeyRelatedField(queryset=Task.objects.none())
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None:
+            self.fields['task'].queryset = Task.objects.filter(user=request.user)
+
+
+class WorkSessionStopSerializer(serializers.Serializer):
+    user_reported_status_at_end = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    energy_cost = serializers.ChoiceField(choices=EnergyLevel.choices, required=False, allow_null=True)
+    task_source = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['POST', 'PUT', 'PATCH', 'DELETE'])
+    resource = serializers.CharField()
+    # 可以写成 "$<序号>.<字段>" 引用前面某个操作的返回值，比如先建任务再加进今日待办
+    id = serializers.CharField(required=False)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs['method'] != 'POST' and not attrs.get('id'):
+            raise serializers.ValidationError({"id": f"{attrs['method']} 操作必须指定 id。"})
+        return attrs
+
+
+class ApiTokenSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    # 明文令牌只在创建时由视图填入返回，之后无法再取得
+    key = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = ApiToken
+        fields = ['id', 'name', 'prefix', 'key', 'created_at', 'expires_at']
+        read_only_fields = ['id', 'prefix', 'key', 'created_at']
+
+
+class JobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'params', 'status', 'progress', 'progress_message', 'attempts', 'max_attempts',
+                  'result', 'error', 'download_url', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if not obj.result_file:
+            return None
+        url = reverse('job-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
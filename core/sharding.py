@@ -0,0 +1,321 @@
+"""
+按用户分库。
+
+core 里除 ApiToken / CalendarFeed / UserShard / Job 以外的表都按用户划分：
+每个用户的设置、目标、任务、日志、每日待办都放在 settings.USER_SHARDS 中的同一个库里；
+auth_user、会话、令牌、日历订阅、分片目录、后台任务等全局表只在 default 库。
+USER_SHARDS 为空（默认）时不分库，路由器什么都不做。
+
+用户落在哪个库由全局库里的 UserShard 目录表决定；目录里没有记录时按 user_id 取模分配并写入目录，
+之后增加分片也不会影响已有用户。目录项缓存在共享缓存里（DIRECTORY_TTL 秒）。
+
+查询时先看路由提示（保存实例、沿外键访问时 Django 会带上实例），没有提示时用当前上下文里的库：
+请求里由 UserShardMiddleware / 令牌认证设置，命令里用 use_user() / use_shard() 指定。
+分库开启后既没有提示也没有上下文的查询直接报错，避免悄悄查错库。
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from django.http import JsonResponse
+from rest_framework import exceptions
+
+# 这些 core 模型留在全局库
+GLOBAL_MODELS = {'apitoken', 'calendarfeed', 'usershard', 'job'}
+
+DIRECTORY_TTL = 30
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_current_alias = ContextVar('core_user_shard', default=None)
+
+
+class ShardNotSelected(RuntimeError):
+    pass
+
+
+class UserMoving(exceptions.APIException):
+    status_code = 503
+    default_detail = "账户数据正在迁移，请稍后重试。"
+    default_code = 'user_moving'
+
+
+def shard_aliases():
+    """所有分片的数据库别名；不分库时只有 default。"""
+    return list(getattr(settings, 'USER_SHARDS', None) or ['default'])
+
+
+def enabled():
+    return len(shard_aliases()) > 1
+
+
+def is_sharded(model):
+    return model._meta.app_label == 'core' and model._meta.model_name not in GLOBAL_MODELS
+
+
+def sharded_models():
+    """按外键依赖排好序的分片模型（被引用的在前），迁移用户数据时按这个顺序复制。"""
+    from django.apps import apps
+
+    pending = [model for model in apps.get_app_config('core').get_models() if is_sharded(model)]
+    ordered = []
+    while pending:
+        for model in pending:
+            targets = {field.related_model for field in model._meta.concrete_fields
+                       if field.is_relation and field.related_model is not model}
+            if all(target in ordered or not is_sharded(target) for target in targets):
+                ordered.append(model)
+                pending.remove(model)
+                break
+        else:
+            raise RuntimeError("分片模型之间存在循环外键")
+    return ordered
+
+
+def hashed_alias(user_id, aliases=None):
+    aliases = aliases or shard_aliases()
+    return aliases[user_id % len(aliases)]
+
+
+def _directory_key(user_id):
+    return f"usershard:{user_id}"
+
+
+def directory_entry(user_id):
+    """返回 (库别名, 是否迁移中)。"""
+    from .models import UserShard
+
+    key = _directory_key(user_id)
+    entry = cache.get(key)
+    if entry is None:
+        shard, _ = UserShard.objects.using('default').get_or_create(
+            user_id=user_id, defaults={'alias': hashed_alias(user_id)})
+        entry = (shard.alias, shard.moving)
+        cache.set(key, entry, timeout=DIRECTORY_TTL)
+    return entry
+
+
+def forget_directory_entry(user_id):
+    # 只清本进程能看到的缓存；进程内缓存的其它进程最多 DIRECTORY_TTL 秒后更新
+    cache.delete(_directory_key(user_id))
+
+
+def db_for_user(user_id):
+    if not enabled():
+        return 'default'
+    return directory_entry(user_id)[0]
+
+
+def current_alias():
+    alias = _current_alias.get()
+    if alias is None:
+        if enabled():
+            raise ShardNotSelected("分库已开启，但当前没有指定用户或分片（见 core.sharding.use_user）")
+        return 'default'
+    return alias
+
+
+def activate_user(user_id, method='GET'):
+    """请求里认证出用户后调用：把当前上下文切到该用户所在的库。迁移中的用户拒绝写请求。"""
+    if not enabled():
+        return 'default'
+    alias, moving = directory_entry(user_id)
+    if moving and method not in SAFE_METHODS:
+        raise UserMoving()
+    _current_alias.set(alias)
+    return alias
+
+
+@contextmanager
+def use_shard(alias):
+    token = _current_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_alias.reset(token)
+
+
+@contextmanager
+def use_user(user_id):
+    with use_shard(db_for_user(user_id)) as alias:
+        yield alias
+
+
+def iterate_in(alias, iterable):
+    """流式响应在视图返回之后才迭代，这时请求上下文已经结束，迭代时重新切到 alias。"""
+    iterator = iter(iterable)
+    while True:
+        token = _current_alias.set(alias)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _current_alias.reset(token)
+        yield item
+
+
+def group_by_shard(user_ids):
+    """{库别名: [user_id, ...]}，保持 user_ids 原有顺序。"""
+    groups = {}
+    for user_id in user_ids:
+        groups.setdefault(db_for_user(user_id), []).append(user_id)
+    return groups
+
+
+def user_column(model):
+    """model 里指向用户的列；带宽成本和固定日程挂在 UserSetting 下面，其主键就是用户 id。"""
+    columns = {field.attname for field in model._meta.concrete_fields}
+    return 'user_id' if 'user_id' in columns else 'user_setting_id'
+
+
+def user_rows(model, alias, user_id):
+    """某个用户在 alias 库里的 model 行。"""
+    return model._base_manager.using(alias).filter(**{user_column(model): user_id})
+
+
+def copy_user_rows(user_id, source, target, batch_size=1000):
+    """
+    把某个用户的全部分片数据从 source 库复制到 target 库，返回 {模型名: 行数}。调用方负责 target 上的事务。
+    自增主键在各库独立分配，复制时重新编号，指向分片模型的外键按新旧 id 对照表改写；
+    时间戳原样复制（不经过 auto_now / auto_now_add）。
+    """
+    conn = connections[target]
+    models = sharded_models()
+    referenced = {field.related_model for model in models for field in model._meta.concrete_fields
+                  if field.is_relation}
+    id_maps = {}
+    counts = {}
+    for model in models:
+        pk = model._meta.pk
+        auto_pk = pk.get_internal_type() in ('AutoField', 'BigAutoField', 'SmallAutoField')
+        fields = [field for field in model._meta.concrete_fields if not (auto_pk and field is pk)]
+        remap = {field.attname: id_maps[field.related_model] for field in fields
+                 if field.is_relation and field.related_model in id_maps}
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            conn.ops.quote_name(model._meta.db_table),
+            ', '.join(conn.ops.quote_name(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+        keep_ids = auto_pk and model in referenced
+        if keep_ids:
+            id_maps[model] = {}
+        rows = user_rows(model, source, user_id).order_by(pk.attname).values_list(
+            pk.attname, *[field.attname for field in fields])
+        count = 0
+        with conn.cursor() as cursor:
+            batch = []
+            for old_id, *values in rows.iterator(chunk_size=batch_size):
+                params = []
+                for field, value in zip(fields, values):
+                    if value is not None and field.attname in remap:
+                        value = remap[field.attname].get(value)
+                    params.append(None if value is None else field.get_db_prep_save(value, conn))
+                if keep_ids:
+                    # 被其它表引用的行逐条插入，拿到新 id
+                    cursor.execute(sql, params)
+                    id_maps[model][old_id] = cursor.lastrowid
+                else:
+                    batch.append(params)
+                    if len(batch) >= batch_size:
+                        cursor.executemany(sql, batch)
+                        batch = []
+                count += 1
+            if batch:
+                cursor.executemany(sql, batch)
+        counts[model._meta.model_name] = count
+    return counts
+
+
+def delete_user_rows(user_id, alias):
+    """删除某个用户在 alias 库里的全部分片数据（按依赖逆序），返回删除行数。"""
+    deleted = 0
+    for model in reversed(sharded_models()):
+        deleted += user_rows(model, alias, user_id).delete()[0]
+    return deleted
+
+
+class UserShardRouter:
+    def _db(self, model, **hints):
+        if not enabled():
+            return None
+        if not is_sharded(model):
+            # 不能返回 None：Django 会退回到提示实例所在的库，从分片里的任务访问 task.user 就查错库了
+            return 'default'
+        instance = hints.get('instance')
+        if instance is not None:
+            if isinstance(instance, User):
+                return db_for_user(instance.pk)
+            if is_sharded(instance.__class__) and instance._state.db:
+                return instance._state.db
+            user_id = getattr(instance, 'user_id', None) or getattr(instance, 'user_setting_id', None)
+            if user_id is not None:
+                return db_for_user(user_id)
+        return current_alias()
+
+    db_for_read = _db
+    db_for_write = _db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not enabled():
+            return None
+        sharded1, sharded2 = is_sharded(obj1.__class__), is_sharded(obj2.__class__)
+        if sharded1 and sharded2:
+            return obj1._state.db == obj2._state.db
+        # 分片里的行指向全局库的用户
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not enabled():
+            return None
+        if db == 'default':
+            return True
+        if db not in shard_aliases():
+            return None
+        model = hints.get('model')
+        if model is None:
+            if app_label != 'core' or model_name is None:
+                return False
+            return model_name not in GLOBAL_MODELS
+        return is_sharded(model)
+
+
+class UserShardMiddleware:
+    """放在 AuthenticationMiddleware 之后：会话登录的用户按其分片路由；令牌认证在 DRF 认证类里处理。"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not enabled():
+            return self.get_response(request)
+        token = _current_alias.set(None)
+        try:
+            user = request.user
+            if user.is_authenticated:
+                try:
+                    activate_user(user.pk, request.method)
+                except UserMoving as exc:
+                    return JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+                # 管理后台里可以用 admin_shard cookie 查看别的分片
+                admin_shard = request.COOKIES.get('admin_shard')
+                if user.is_staff and admin_shard in shard_aliases() and request.path.startswith('/admin/'):
+                    _current_alias.set(admin_shard)
+            return self.get_response(request)
+        finally:
+            _current_alias.reset(token)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_rows(sender, instance, using, **kwargs):
+    # 分片库里没有到 auth_user 的外键，级联删除只会在 default 里进行，其它分片要手动删
+    if not enabled():
+        return
+    alias = db_for_user(instance.pk)
+    if alias != using:
+        delete_user_rows(instance.pk, alias)
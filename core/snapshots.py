@@ -0,0 +1,121 @@
+"""
+每天早上的状态统计 (DailySnapshot)。
+
+按用户 id 分片计算：每个分片只跑固定数量的聚合查询（GROUP BY user_id），
+不对单个用户循环查库，所以耗时只随分片数增长。
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .models import (
+    BandwidthTagCost, DailySnapshot, EnergyLevel, EnergyLog, Task, TodayTask, UserSetting,
+    energy_points_expression, split_tags,
+)
+
+# bulk_create 冲突时需要覆盖的字段（同一天重复统计时以最新结果为准）
+SNAPSHOT_FIELDS = [
+    'completed_yesterday', 'overdue_tasks', 'today_task_count', 'today_estimated_minutes',
+    'work_minutes_budget', 'today_energy_points', 'energy_budget', 'today_bandwidth_points',
+    'bandwidth_budget', 'energy_avg_recent', 'energy_avg_previous',
+]
+
+ENERGY_TREND_DAYS = 7
+
+FINISHED_TASK_STATUSES = [Task.TaskStatus.COMPLETED, Task.TaskStatus.CANCELLED]
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def compute_snapshots(user_ids, day):
+    """
+    计算一个分片内所有用户在 day 这天早上的统计，返回 {user_id: 字段字典}。
+    user_ids 需按升序排列；查询用 id 区间过滤，能直接走 user_id 索引。
+    """
+    if not user_ids:
+        return {}
+    lo, hi = user_ids[0], user_ids[-1]
+    in_shard = Q(user_id__gte=lo, user_id__lte=hi)
+    rows = {uid: {field: 0 for field in SNAPSHOT_FIELDS} for uid in user_ids}
+    for row in rows.values():
+        row['energy_avg_recent'] = None
+        row['energy_avg_previous'] = None
+
+    def merge(queryset, **mapping):
+        for item in queryset:
+            row = rows.get(item['user_id'])
+            if row is not None:
+                for field, key in mapping.items():
+                    row[field] = item[key] if item[key] is not None else row[field]
+
+    settings_qs = UserSetting.objects.filter(in_shard).values_list(
+        'user_id', 'daily_work_hours', 'daily_energy_budget', 'daily_bandwidth_budget'
+    )
+    for uid, work_hours, energy_budget, bandwidth_budget in settings_qs:
+        row = rows.get(uid)
+        if row is not None:
+            row['work_minutes_budget'] = round(work_hours * 60)
+            row['energy_budget'] = energy_budget
+            row['bandwidth_budget'] = bandwidth_budget
+
+    merge(
+        Task.objects.filter(in_shard, status=Task.TaskStatus.COMPLETED, completion_date=day - timedelta(days=1))
+        .order_by().values('user_id').annotate(n=Count('id')),
+        completed_yesterday='n',
+    )
+    merge(
+        Task.objects.filter(in_shard, end_date__lt=day).exclude(status__in=FINISHED_TASK_STATUSES)
+        .order_by().values('user_id').annotate(n=Count('id')),
+        overdue_tasks='n',
+    )
+
+    today_entries = TodayTask.objects.filter(in_shard, date=day)
+    merge(
+        today_entries.order_by().values('user_id').annotate(
+            n=Count('id'),
+            minutes=Sum('task__estimated_time_minutes'),
+            energy=Sum(energy_points_expression('task__energy_level_estimate')),
+        ),
+        today_task_count='n', today_estimated_minutes='minutes', today_energy_points='energy',
+    )
+
+    # 带宽：标签是逗号分隔的文本，没法在 SQL 里拆，整片取出后在内存里按成本表累加
+    tag_costs = {}
+    for setting_uid, tag_name, cost in BandwidthTagCost.objects.filter(
+            user_setting_id__gte=lo, user_setting_id__lte=hi).values_list('user_setting_id', 'tag_name', 'cost'):
+        tag_costs[(setting_uid, tag_name)] = cost
+    if tag_costs:
+        for uid, tags in today_entries.values_list('user_id', 'task__tags'):
+            row = rows.get(uid)
+            if row is not None:
+                row['today_bandwidth_points'] += sum(tag_costs.get((uid, tag), 0) for tag in split_tags(tags))
+
+    today_start = _day_start(day)
+    middle = today_start - timedelta(days=ENERGY_TREND_DAYS)
+    points = energy_points_expression('energy_level')
+    merge(
+        EnergyLog.objects.filter(
+            in_shard,
+            timestamp__gte=middle - timedelta(days=ENERGY_TREND_DAYS),
+            timestamp__lt=today_start,
+            energy_level__in=[EnergyLevel.HIGH, EnergyLevel.MEDIUM, EnergyLevel.LOW],
+        ).order_by().values('user_id').annotate(
+            recent=Avg(points, filter=Q(timestamp__gte=middle)),
+            previous=Avg(points, filter=Q(timestamp__lt=middle)),
+        ),
+        energy_avg_recent='recent', energy_avg_previous='previous',
+    )
+    return rows
+
+
+def save_snapshots(rows, day):
+    """把 compute_snapshots 的结果写入 DailySnapshot，同一天重复写入时覆盖（幂等）。"""
+    objs = [DailySnapshot(user_id=uid, date=day, **fields) for uid, fields in rows.items()]
+    DailySnapshot.objects.bulk_create(
+        objs, batch_size=500,
+        update_conflicts=True, unique_fields=['user', 'date'], update_fields=SNAPSHOT_FIELDS + ['computed_at'],
+    )
+    return len(objs)
@@ -0,0 +1,908 @@
+// ... (near other global vars like timerSec, intervalId) ...
+const focusTimerElement = document.getElementById('focus-timer');
+const fullscreenBtn = document.getElementById('fullscreen-btn');
+let isDragging = false;
+let offsetX, offsetY;
+
+function makeDraggable() {
+    focusTimerElement.addEventListener('mousedown', (e) => {
+        // Only drag if mousedown is on the timer itself or its direct children like title/timer display,
+        // NOT on buttons within it.
+        if (e.target.closest('button')) {
+            return;
+        }
+        // Only allow dragging if not fullscreen and not on small screens where it's static
+        if (focusTimerElement.classList.contains('fullscreen') || getComputedStyle(focusTimerElement).position === 'static') {
+            return;
+        }
+
+        isDragging = true;
+        focusTimerElement.classList.add('dragging');
+        // Calculate offset from the element's current left/top
+        offsetX = e.clientX - focusTimerElement.offsetLeft;
+        offsetY = e.clientY - focusTimerElement.offsetTop;
+
+        // Ensure position is absolute for dragging to work after being static
+        if (getComputedStyle(focusTimerElement).position !== 'absolute' && getComputedStyle(focusTimerElement).position !== 'fixed') {
+            focusTimerElement.style.position = 'absolute';
+            // Recalculate offsets if position changed
+            offsetX = e.clientX - focusTimerElement.offsetLeft;
+            offsetY = e.clientY - focusTimerElement.offsetTop;
+        }
+        // Remove right/bottom if they are set, to rely on left/top
+        focusTimerElement.style.right = 'auto';
+        focusTimerElement.style.bottom = 'auto';
+
+    });
+
+    document.addEventListener('mousemove', (e) => {
+        if (!isDragging) return;
+        // Prevent default to avoid text selection, etc.
+        // e.preventDefault(); // Can be a bit aggressive, test if needed
+
+        let newX = e.clientX - offsetX;
+        let newY = e.clientY - offsetY;
+
+        // Basic boundary collision (optional, can be improved)
+        const mainRect = document.querySelector('.main').getBoundingClientRect();
+        const timerRect = focusTimerElement.getBoundingClientRect();
+
+        // Ensure it doesn't go too far left/top
+        // newX = Math.max(0, newX);
+        // newY = Math.max(0, newY);
+        // Ensure it doesn't go too far right/bottom (relative to main area)
+        // newX = Math.min(newX, mainRect.width - timerRect.width);
+        // newY = Math.min(newY, mainRect.height - timerRect.height);
+
+
+        focusTimerElement.style.left = `${newX}px`;
+        focusTimerElement.style.top = `${newY}px`;
+    });
+
+    document.addEventListener('mouseup', () => {
+        if (isDragging) {
+            isDragging = false;
+            focusTimerElement.classList.remove('dragging');
+        }
+    });
+}
+
+function toggleFullScreen() {
+    console.log("toggleFullScreen called. Current classes:", focusTimerElement.className);
+
+    focusTimerElement.classList.toggle('fullscreen');
+
+    if (focusTimerElement.classList.contains('fullscreen')) {
+        console.log("Entered fullscreen mode. Setting button text to '退出全屏'.");
+        fullscreenBtn.textContent = '退出全屏';
+        fullscreenBtn.style.display = ''; // Ensure it's visible
+        console.log("Button text should now be:", fullscreenBtn.textContent);
+
+    } else {
+        console.log("Exited fullscreen mode. Setting button text to '全屏'.");
+        fullscreenBtn.textContent = '全屏';
+        console.log("Button text should now be:", fullscreenBtn.textContent);
+
+        if (focusTimerElement.style.getPropertyValue('--was-static-before-fullscreen') === 'true') {
+            console.log("Restoring static positioning.");
+            focusTimerElement.style.left = '';
+            focusTimerElement.style.top = '';
+            focusTimerElement.style.position = '';
+            focusTimerElement.style.removeProperty('--was-static-before-fullscreen');
+        }
+    }
+    console.log("toggleFullScreen finished. New classes:", focusTimerElement.className);
+}
+
+async function checkAuthenticated() {
+    try {
+        const response = await apiFetch('/api/long_term_goals/'); // apiFetch 现在返回 Response 对象
+        // 如果能到这里，说明 response.ok 是 true (2xx status)
+        // 对于受保护的 API，这通常意味着已认证
+        // 你也可以更严格地检查 response.status === 200
+        if (response.redirected) { // 正常API不应该在成功时重定向
+            console.log("checkAuthenticated: API redirected, assuming not authenticated or misconfiguration.");
+            return false;
+        }
+        return true;
+    } catch (error) {
+        // apiFetch 会在 !response.ok 时抛错，error.response 会是那个响应
+        if (error.response && (error.response.status === 401 || error.response.status === 403)) {
+            console.log("checkAuthenticated: Received 401/403, not authenticated.");
+            return false;
+        }
+        console.error("checkAuthenticated: Error during fetch, assuming not authenticated:", error.message, error.data);
+        return false; // 其他错误 (网络问题等) 也视为未认证
+    }
+}
+
+function showLoginModal(onSuccess) {
+    const modal = document.createElement('div');
+    modal.className = 'modal-mask';
+    modal.innerHTML = `
+    <div class="modal-card" style="min-width:340px;">
+        <div style="font-size:1.18em;margin-bottom:12px;">登录</div>
+        <form id="login-form">
+            <label>用户名 <input name="username" required autofocus></label>
+            <label>密码 <input name="password" type="password" required></label>
+            <div style="color:#b94a48;font-size:0.97em;min-height:20px;" id="login-error"></div>
+            <div class="actions" style="margin-top:12px;">
+                <button type="button" id="login-cancel">取消</button>
+                <button class="primary" id="login-submit" type="submit">登录</button>
+            </div>
+        </form>
+    </div>
+`;
+    document.getElementById('login-modal-root').appendChild(modal);
+
+    modal.querySelector('#login-cancel').onclick = () => {
+        document.getElementById('login-modal-root').removeChild(modal);
+    };
+
+    modal.querySelector('#login-form').onsubmit = async function (e) {
+        e.preventDefault();
+        const errorDiv = modal.querySelector('#login-error');
+        errorDiv.innerText = '';
+        let fd = new FormData(this);
+        let formDataString = new URLSearchParams(fd).toString(); // 正确生成 x-www-form-urlencoded 字符串
+
+        try {
+            // 为 /accounts/login/ 显式指定 bodyType 或 Content-Type
+            const response = await apiFetch('/accounts/login/', {
+                method: 'POST',
+                body: formDataString,
+                // headers: {'Content-Type': 'application/x-www-form-urlencoded'} // 或者这样直接指定
+                bodyType: 'form-urlencoded' // 让 apiFetch 内部处理 Content-Type
+            });
+
+            // Django LoginView 成功后会重定向
+            if (response.ok && response.redirected) {
+                document.getElementById('login-modal-root').removeChild(modal);
+                if (onSuccess) onSuccess();
+            } else if (response.ok && !response.redirected) {
+                // 登录失败，Django LoginView 通常返回 200 OK 并重新渲染表单
+                const text = await response.text();
+                if (text.includes('Please enter a correct username and password') ||
+                    text.includes('请输入正确的用户名和密码') || // 考虑中文环境
+                    /Please enter a correct username/.test(text)) {
+                    errorDiv.innerText = '用户名或密码错误';
+                } else if (text.includes('csrftoken')) { // 另一种失败的迹象是它又返回了登录页
+                    errorDiv.innerText = '登录失败，请重试。';
+                } else {
+                    errorDiv.innerText = '登录失败，未知原因。';
+                    console.log("Login failed, response text:", text.substring(0, 500)); // Log a snippet
+                }
+            } else {
+                // 不应该到这里如果 response.ok 为 true
+                // 如果 response.ok 为 false, 它会被 catch 块捕获
+                errorDiv.innerText = `登录请求未成功 (状态: ${response.status})`;
+            }
+        } catch (error) {
+            console.error("Login submission error:", error.message, error.data);
+            if (error.response) {
+                if (error.response.status === 403 && (await error.response.clone().text()).includes("CSRF")) {
+                    errorDiv.innerText = '安全验证失败 (CSRF)。请刷新页面重试。';
+                } else {
+                    errorDiv.innerText = `登录错误 (${error.response.status})。`;
+                }
+            } else {
+                errorDiv.innerText = '网络连接错误或服务器无响应。';
+            }
+        }
+    };
+
+}
+
+function getCookie(name) {
+    let val = null;
+    if (document.cookie) {
+        document.cookie.split(';').forEach(cookie => {
+            const [k, v] = cookie.trim().split('=');
+            if (k === name) val = decodeURIComponent(v);
+        });
+    }
+    return val;
+}
+
+async function apiFetch(url, {method = 'GET', headers = {}, body = null, bodyType = null} = {}) {
+    let opts = {method, credentials: 'include', headers: {...headers}};
+
+    if (method !== 'GET' && method !== 'HEAD') { // GET, HEAD, OPTIONS, TRACE 不需要 CSRF
+        const csrfToken = getCookie('csrftoken');
+        if (csrfToken) {
+            opts.headers['X-CSRFToken'] = csrfToken;
+        } else {
+            console.warn("CSRF token not found in cookies. POST/PUT/PATCH/DELETE requests might fail.");
+        }
+    }
+
+    if (body) {
+        if (bodyType === 'json' || (typeof body === 'object' && !(body instanceof FormData) && !(typeof body === 'string' && headers['Content-Type']))) {
+            opts.body = JSON.stringify(body);
+            opts.headers['Content-Type'] = 'application/json';
+        } else if (bodyType === 'form-urlencoded' || (typeof body === 'string' && !headers['Content-Type'])) {
+            // 假设字符串 body 且未指定 Content-Type 时，可能是 x-www-form-urlencoded
+            // 或者调用者传入 formData.toString()
+            opts.body = body; // body 已经是 string
+            if (!opts.headers['Content-Type']) { // 只有当调用者没有预设 Content-Type 时才设置
+                opts.headers['Content-Type'] = 'application/x-www-form-urlencoded';
+            }
+        } else {
+            // FormData 或其他类型，直接使用
+            opts.body = body;
+        }
+    }
+
+    try {
+        const response = await fetch(url, opts);
+        if (!response.ok) {
+            // 不要在这里解析 JSON，因为错误响应可能不是 JSON
+            // 抛出错误，带上响应对象，方便调用者获取状态码和内容
+            const error = new Error(`HTTP error! status: ${response.status}`);
+            error.response = response; // 附加整个响应对象
+            try {
+                error.data = await response.clone().json(); // 尝试解析错误体为JSON
+            } catch {
+                error.data = await response.clone().text(); // 如果不是JSON，解析为文本
+            }
+            throw error;
+        }
+        return response; // 直接返回 Response 对象
+    } catch (err) {
+        // 如果是 fetch 网络错误 (err.response 不存在) 或上面抛出的 HTTP 错误
+        console.error(`apiFetch to ${url} failed:`, err.message, err.data || '');
+        throw err; // 重新抛出，让调用者处理
+    }
+}
+
+
+document.querySelectorAll('#menu-list li').forEach(li => {
+    li.addEventListener('click', function () {
+        document.querySelectorAll('#menu-list li').forEach(x => x.classList.remove('active'));
+        this.classList.add('active');
+        const page = this.dataset.page;
+        document.querySelectorAll('.main-page').forEach(div => div.style.display = 'none');
+        document.getElementById('page-' + page).style.display = '';
+        // 页面切换时自动刷新内容
+        if (page === 'long_term_goal') fetchAndRenderLongTermGoals();
+        else if (page === 'short_term_goal') fetchAndRenderShortTermGoals();
+        else if (page === 'task') fetchAndRenderTasks();
+        // ...其它页面同理
+    });
+});
+
+function showForm({type, data = null, onSave}) {
+    // 字段配置
+    let fields = [];
+    if (type === 'long') {
+        fields = [
+            {name: 'name', label: '长期目标描述', type: 'textarea'},
+            {name: 'status', label: '状态', type: 'select', options: ['持续追求', '已归档']}
+        ];
+    } else if (type === 'short') {
+        fields = [
+            {name: 'name', label: '短期目标描述', type: 'textarea'},
+            {
+                name: 'priority',
+                label: '优先级',
+                type: 'select',
+                options: ['重要且紧急', '重要不紧急', '紧急不重要', '不重要不紧急']
+            },
+            {
+                name: 'status',
+                label: '状态',
+                type: 'select',
+                options: ['未开始', '进行中', '已完成', '已推迟', '已放弃', '阻塞']
+            },
+            {name: 'target_date', label: '目标日期', type: 'date'},
+            {name: 'estimated_time_days', label: '预估天数', type: 'number'},
+        ];
+    } else if (type === 'task') {
+        fields = [
+            {name: 'name', label: '任务名称', type: 'text'},
+            {name: 'priority', label: '优先级(1-5, 1为最高)', type: 'number', min: 1, max: 5},
+            {name: 'energy_level_estimate', label: '精力预估', type: 'select', options: ['高', '中', '低']},
+            {name: 'tags', label: '标签（逗号分隔）', type: 'text'},
+            {name: 'estimated_time_minutes', label: '预估耗时(分钟)', type: 'number'},
+            {name: 'start_date', label: '开始日期', type: 'date'},
+            {name: 'end_date', label: '截止日期', type: 'date'},
+            {
+                name: 'short_term_goal_ref',
+                label: '关联短期目标',
+                type: 'select',
+                options: window.shortTermGoalOptions || []
+            },
+            {
+                name: 'long_term_goal_ref',
+                label: '关联长期目标',
+                type: 'select',
+                options: window.longTermGoalOptions || []
+            },
+        ];
+    }
+    // HTML生成
+    let html = `<div class="modal-mask"><div class="modal-card"><div style="font-size:1.08em;margin-bottom:10px;">${data ? '编辑' : '新建'}${type === 'long' ? '长期目标' : type === 'short' ? '短期目标' : '任务'}</div>
+    <form id="goal-form">${fields.map(f => {
+        if (f.type === 'textarea') return `<label>${f.label}<textarea name="${f.name}" required></textarea></label>`;
+        if (f.type === 'select') {
+            let opts = (Array.isArray(f.options) ? f.options : []).map(opt => {
+                let v = typeof opt === 'object' ? opt.value : opt;
+                let txt = typeof opt === 'object' ? opt.label : opt;
+                return `<option value="${v}">${txt}</option>`;
+            }).join('');
+            return `<label>${f.label}<select name="${f.name}" ${f.options.length ? '' : 'disabled'}>${opts}</select></label>`;
+        }
+        return `<label>${f.label}<input name="${f.name}" type="${f.type}" ${f.min ? `min="${f.min}"` : ''} ${f.max ? `max="${f.max}"` : ''}></label>`;
+    }).join('')}</form>
+    <div class="actions">
+        <button id="goal-cancel" class="text">取消</button>
+        <button id="goal-ok" class="primary">保存</button>
+    </div>
+</div></div>`;
+    let modal = document.createElement('div');
+    modal.innerHTML = html;
+    document.body.appendChild(modal);
+
+    // 填充默认值
+    if (data) {
+        let form = modal.querySelector('form');
+        Object.keys(data).forEach(k => {
+            if (form[k] !== undefined && data[k] != null) form[k].value = data[k];
+        });
+    }
+
+    // 取消
+    modal.querySelector('#goal-cancel').onclick = () => document.body.removeChild(modal);
+    // 保存
+    modal.querySelector('#goal-ok').onclick = () => {
+        let form = modal.querySelector('form');
+        let fd = new FormData(form);
+        let obj = {};
+        for (let [k, v] of fd.entries()) obj[k] = v;
+        // 数字字段自动转型
+        ['estimated_time_days', 'estimated_time_minutes'].forEach(f => {
+            if (obj[f] !== undefined && obj[f] !== '') obj[f] = Number(obj[f]);
+        });
+        // 空字符串转null
+        Object.keys(obj).forEach(k => {
+            if (obj[k] === '') obj[k] = null;
+        });
+        onSave(obj);
+        document.body.removeChild(modal);
+    };
+}
+
+async function refreshGoalOptions() {
+    // 用于任务表单的下拉选择
+    let short = await fetch('/api/short_term_goals/', {credentials: 'include'}).then(r => r.json());
+    let long = await fetch('/api/long_term_goals/', {credentials: 'include'}).then(r => r.json());
+    window.shortTermGoalOptions = [{label: '--无--', value: ''}, ...short.map(x => ({label: x.name, value: x.id}))];
+    window.longTermGoalOptions = [{label: '--无--', value: ''}, ...long.map(x => ({label: x.name, value: x.id}))];
+}
+
+async function fetchAndRenderLongTermGoals() {
+    let dom = document.getElementById('page-long_term_goal');
+    const response = await apiFetch('/api/long_term_goals/');
+    const data = await response.json();
+    dom.innerHTML = `
+    <div class="section-title" style="margin-top:0;">长期目标清单 <button id="add-long-goal-btn" class="primary" style="margin-left:12px;">+ 新建</button></div>
+    <table><thead><tr><th>描述</th><th>状态</th><th>创建时间</th><th>操作</th></tr></thead>
+    <tbody>
+    ${data.map(goal => `
+      <tr>
+        <td>${goal.name}</td>
+        <td>${goal.status}</td>
+        <td>${goal.created_at ? goal.created_at.substr(0, 10) : ''}</td>
+        <td>
+          <button class="edit-long-goal text" data-id="${goal.id}">编辑</button>
+          <button class="del-long-goal danger text" data-id="${goal.id}">删除</button>
+        </td>
+      </tr>
+    `).join('')}
+    </tbody></table>
+`;
+    dom.querySelector('#add-long-goal-btn').onclick = () => {
+        showForm({
+            type: 'long',
+            onSave: async ({name, status}) => {
+                await apiFetch('/api/long_term_goals/', {method: 'POST', body: {name, status}});
+                fetchAndRenderLongTermGoals();
+            }
+        });
+    };
+    dom.querySelectorAll('.edit-long-goal').forEach(btn => {
+        btn.onclick = () => {
+            let goal = data.find(x => x.id == btn.dataset.id);
+            showForm({
+                type: 'long',
+                data: goal,
+                onSave: async ({name, status}) => {
+                    await apiFetch(`/api/long_term_goals/${goal.id}/`, {method: 'PATCH', body: {name, status}});
+                    fetchAndRenderLongTermGoals();
+                }
+            });
+        };
+    });
+    dom.querySelectorAll('.del-long-goal').forEach(btn => {
+        btn.onclick = async () => {
+            if (confirm('确定删除？')) {
+                await apiFetch(`/api/long_term_goals/${btn.dataset.id}/`, {method: 'DELETE'});
+                fetchAndRenderLongTermGoals();
+            }
+        }
+    });
+}
+
+async function fetchAndRenderShortTermGoals() {
+    let dom = document.getElementById('page-short_term_goal');
+    const response = await apiFetch('/api/short_term_goals/');
+    const data = await response.json();
+    dom.innerHTML = `
+    <div class="section-title" style="margin-top:0;">短期目标清单 <button id="add-short-goal-btn" class="primary" style="margin-left:12px;">+ 新建</button></div>
+    <table><thead><tr><th>描述</th><th>优先级</th><th>状态</th><th>目标日期</th><th>预估天数</th><th>操作</th></tr></thead>
+    <tbody>
+    ${data.map(goal => `
+      <tr>
+        <td>${goal.name}</td>
+        <td>${goal.priority || ''}</td>
+        <td>${goal.status || ''}</td>
+        <td>${goal.target_date || ''}</td>
+        <td>${goal.estimated_time_days || ''}</td>
+        <td>
+          <button class="edit-short-goal text" data-id="${goal.id}">编辑</button>
+          <button class="del-short-goal danger text" data-id="${goal.id}">删除</button>
+        </td>
+      </tr>
+    `).join('')}
+    </tbody></table>
+`;
+    dom.querySelector('#add-short-goal-btn').onclick = () => {
+        showForm({
+            type: 'short',
+            onSave: async (obj) => {
+                await apiFetch('/api/short_term_goals/', {method: 'POST', body: obj, bodyType: 'json'});
+                fetchAndRenderShortTermGoals();
+                await refreshGoalOptions(); // 刷新任务下拉
+            }
+        });
+    };
+    dom.querySelectorAll('.edit-short-goal').forEach(btn => {
+        btn.onclick = () => {
+            let goal = data.find(x => x.id == btn.dataset.id);
+            showForm({
+                type: 'short',
+                data: goal,
+                onSave: async (obj) => {
+                    await apiFetch(`/api/short_term_goals/${goal.id}/`, {
+                        method: 'PATCH',
+                        body: obj,
+                        bodyType: 'json'
+                    });
+                    fetchAndRenderShortTermGoals();
+                    await refreshGoalOptions();
+                }
+            });
+        };
+    });
+    dom.querySelectorAll('.del-short-goal').forEach(btn => {
+        btn.onclick = async () => {
+            if (confirm('确定删除？')) {
+                await apiFetch(`/api/short_term_goals/${btn.dataset.id}/`, {method: 'DELETE'});
+                fetchAndRenderShortTermGoals();
+                await refreshGoalOptions();
+            }
+        }
+    });
+}
+
+async function fetchAndRenderTasks() {
+    await refreshGoalOptions();
+    let dom = document.getElementById('page-task');
+    const response = await apiFetch('/api/tasks/');
+    const data = await response.json();
+    dom.innerHTML = `
+    <div class="section-title" style="margin-top:0;">任务清单 <button id="add-task-btn" class="primary" style="margin-left:12px;">+ 新建</button></div>
+    <table><thead><tr>
+      <th>名称</th><th>优先级</th><th>精力</th><th>标签</th>
+      <th>预估</th><th>开始</th><th>截止</th>
+      <th>短期目标</th><th>长期目标</th>
+      <th>操作</th>
+    </tr></thead>
+    <tbody>
+    ${data.map(task => `
+      <tr>
+        <td>${task.name}</td>
+        <td>${task.priority}</td>
+        <td>${task.energy_level_estimate || ''}</td>
+        <td>${task.tags || ''}</td>
+        <td>${task.estimated_time_minutes || ''}</td>
+        <td>${task.start_date || ''}</td>
+        <td>${task.end_date || ''}</td>
+        <td>${task.short_term_goal_ref ? (task.short_term_goal_name || task.short_term_goal_ref) : ''}</td>
+        <td>${task.long_term_goal_ref ? (task.long_term_goal_name || task.long_term_goal_ref) : ''}</td>
+        <td>
+          <button class="edit-task text" data-id="${task.id}">编辑</button>
+          <button class="del-task danger text" data-id="${task.id}">删除</button>
+        </td>
+      </tr>
+    `).join('')}
+    </tbody></table>
+`;
+    dom.querySelector('#add-task-btn').onclick = () => {
+        showForm({
+            type: 'task',
+            onSave: async (obj) => {
+                // 转为int id
+                if (obj.short_term_goal_ref) obj.short_term_goal_ref = Number(obj.short_term_goal_ref) || null;
+                if (obj.long_term_goal_ref) obj.long_term_goal_ref = Number(obj.long_term_goal_ref) || null;
+                await apiFetch('/api/tasks/', {method: 'POST', body: obj, bodyType: 'json'});
+                fetchAndRenderTasks();
+            }
+        });
+    };
+    dom.querySelectorAll('.edit-task').forEach(btn => {
+        btn.onclick = () => {
+            let task = data.find(x => x.id == btn.dataset.id);
+            showForm({
+                type: 'task',
+                data: task,
+                onSave: async (obj) => {
+                    if (obj.short_term_goal_ref) obj.short_term_goal_ref = Number(obj.short_term_goal_ref) || null;
+                    if (obj.long_term_goal_ref) obj.long_term_goal_ref = Number(obj.long_term_goal_ref) || null;
+                    await apiFetch(`/api/tasks/${task.id}/`, {method: 'PATCH', body: obj, bodyType: 'json'});
+                    fetchAndRenderTasks();
+                }
+            });
+        };
+    });
+    dom.querySelectorAll('.del-task').forEach(btn => {
+        btn.onclick = async () => {
+            if (confirm('确定删除？')) {
+                await apiFetch(`/api/tasks/${btn.dataset.id}/`, {method: 'DELETE'});
+                fetchAndRenderTasks();
+            }
+        }
+    });
+}
+
+
+// 示例数据
+let todayTasksList = {};
+
+// 渲染日期
+function renderDate() {
+    const now = new Date();
+    const s = now.getFullYear() + '-' +
+        String(now.getMonth() + 1).padStart(2, '0') + '-' +
+        String(now.getDate()).padStart(2, '0');
+    document.getElementById('main-date').innerText = s;
+}
+
+
+// Focus Timer（示例倒计时功能）
+let timerSec = 0; // 25分钟
+let intervalId = null;
+let startTime = null;
+let currentTask = null;
+
+function pad(n) {
+    return String(n).padStart(2, '0');
+}
+
+function formatTime(s) {
+    const m = Math.floor(s / 60);
+    const ss = s % 60;
+    return pad(m) + ':' + pad(ss);
+}
+
+function updateTimer() {
+    const min = Math.floor(timerSec / 60);
+    const sec = timerSec % 60;
+    document.getElementById('focus-countdown').innerText =
+        pad(min) + ':' + pad(sec);
+}
+
+function initTimer() {
+    updateTimer();
+    if (intervalId === null) {
+        intervalId = setInterval(() => {
+            timerSec = Math.floor(((new Date()).getTime() - startTime) / 1000);
+            updateTimer();
+        }, 1000);
+    }
+}
+
+function restartTimer() {
+    timerSec = 0;
+    updateTimer();
+}
+
+function setFocusTimer(task) {
+    startTime = (new Date()).getTime();
+    currentTask = task;
+    restartTimer();
+
+    document.getElementById('stop-btn').onclick = () => {
+        if (currentTask && timerSec > 0) { // Only log if active and time passed
+            const minutesElapsed = Math.floor(timerSec / 60);
+            if (minutesElapsed > 0) { // Only update if at least a minute passed
+                updateResource(
+                    '/api/tasks', currentTask.id,
+                    {actual_time_minutes: (currentTask.actual_time_minutes || 0) + minutesElapsed}
+                ).then(updatedTask => {
+                    if (updatedTask) {
+                        // Optionally refresh task list or update local data if needed
+                        console.log("Task time updated on server:", updatedTask);
+                        // Update local currentTask data to prevent double-counting if stop is hit again quickly
+                        currentTask.actual_time_minutes = updatedTask.actual_time_minutes;
+                    }
+                });
+            }
+        }
+        setFocusTimer(null);  // 切到休息
+    };
+
+    if (task === null) { // Resting state
+        document.getElementById('focus-title').innerText = "休息中";
+        document.getElementById('focus-energy').innerText = "";
+        document.getElementById('focus-bandwidth').innerText = "";
+
+        console.log("Resting: Hiding fullscreenBtn and stop-btn");
+        fullscreenBtn.style.display = 'none'; // Hide fullscreen button
+        if (focusTimerElement.classList.contains('fullscreen')) {
+            toggleFullScreen(); // Exit fullscreen if resting
+        }
+        document.getElementById('stop-btn').style.display = 'none';
+
+    } else { // Active task
+        document.getElementById('focus-title').innerText = task.name;
+        document.getElementById('focus-energy').innerText = 'Energy: ' + task.energy_level_estimate;
+        document.getElementById('focus-bandwidth').innerText = 'Bandwidth: ' + task.tags;
+
+        console.log("Task active: Showing fullscreenBtn and stop-btn");
+        fullscreenBtn.style.display = ''; // Show fullscreen button
+        document.getElementById('stop-btn').style.display = '';
+    }
+}
+
+function renderTasksList(tasks) {
+    const tbody = document.getElementById('task-list');
+    tbody.innerHTML = '';
+
+    tasks.forEach(task => {
+        // 计算 “起止时间” 显示
+        let timeRange = '--';
+        if (task.start_date && task.end_date) {
+            const start = new Date(task.start_date);
+            const end = new Date(task.end_date);
+            const fmt = d => `${(d.getMonth() + 1).toString().padStart(2, '0')}/${d.getDate().toString().padStart(2, '0')}`;
+            timeRange = `${fmt(start)} - ${fmt(end)}`;
+        }
+        const estimated = task.estimated_time_minutes + ` (${task.actual_time_minutes})`;
+        let goalName = task.short_term_goal_name || task.long_term_goal_name || '--';
+        goalName = goalName.split(' (')[0];
+
+        const tagsHtml = task.tags
+            ? task.tags.split(',').map(t => `<tag>${t.trim()}</tag>`).join(' ')
+            : '--';
+
+
+        // 优先级着色
+        let prioClass = '';
+        if (task.priority === 5) prioClass = 'priority-urgent';
+        else if (task.priority > 2) prioClass = 'priority-important';
+
+        // 精力着色
+        let energyClass = '';
+        if (task.energy_level_estimate === '高') energyClass = 'energy-high';
+        else if (task.energy_level_estimate === '中') energyClass = 'energy-medium';
+        else energyClass = 'energy-low';
+
+        // 每行 HTML
+        const tr = document.createElement('tr');
+        tr.innerHTML = `
+            <td>${task.name}</td>
+            <td class="${prioClass}">${task.priority}</td>
+            <td>${timeRange}</td>
+            <td>${estimated} min</td>
+            <td>${tagsHtml}</td>
+            <td class="${energyClass}">${task.energy_level_estimate || '--'}</td>
+            <td>${goalName}</td>
+            <td><button class="add-btn" data-task-id="${task.id}">添加</button></td>
+          `;
+        tbody.appendChild(tr);
+    });
+
+    // —— 给所有“添加”按钮挂点击事件
+    tbody.querySelectorAll('.add-btn').forEach(btn => {
+        btn.addEventListener('click', async () => {
+            const id = Number(btn.dataset.taskId);
+            const entry = await addTodayTask(id);
+        });
+    });
+
+}
+
+function renderTodayTasksList(todayTasks) {
+    const tbody = document.getElementById('job-list');
+    tbody.innerHTML = '';
+    todayTasksList = {};
+
+    todayTasks.forEach(t => {
+        let task = t.task_details;
+        todayTasksList[task.id] = task;
+        // 优先级着色
+        let prioClass = '';
+        if (task.priority === 5) prioClass = 'priority-urgent';
+        else if (task.priority > 2) prioClass = 'priority-important';
+
+        // 精力着色
+        let energyClass = '';
+        if (task.energy_level_estimate === '高') energyClass = 'energy-high';
+        else if (task.energy_level_estimate === '中') energyClass = 'energy-medium';
+        else energyClass = 'energy-low';
+
+        // 标签渲染
+        const tagsHtml = task.tags
+            ? task.tags.split(',').map(t => `<tag>${t.trim()}</tag>`).join(' ')
+            : '--';
+
+        // 来源：优先短期目标，否则长期目标
+        let source = task.short_term_goal_name || task.long_term_goal_name || '--';
+        // 去掉括号及内部
+        source = source.split(' (')[0];
+
+        // 预估耗时
+        const est = task.estimated_time_minutes != null
+            ? `${task.estimated_time_minutes}min`
+            : '--';
+
+        // 组装行
+        const tr = document.createElement('tr');
+        tr.innerHTML = `
+          <td>${task.name}</td>
+          <td class="${prioClass}">${task.priority}</td>
+          <td>${est}</td>
+          <td class="${energyClass}">${task.energy_level_estimate || '--'}</td>
+          <td>${tagsHtml}</td>
+          <td>${source}</td>
+          <td><button class="start-btn" data-id="${task.id}">开始</button> <button class="remove-btn" data-id="${t.id}">移除</button></td>
+        `;
+        tbody.appendChild(tr);
+    });
+
+    tbody.querySelectorAll('.remove-btn').forEach(btn => {
+        btn.addEventListener('click', async () => {
+            const id = btn.dataset.id;
+            try {
+                // 调用后端删除接口（假设 DELETE /api/today_tasks/{id}/）
+                const res = await apiFetch(`/api/today_tasks/${id}/`, {method: 'DELETE'});
+                if (!res.ok) throw new Error(`HTTP ${res.status}`);
+                // 删除成功后，从页面上移除这行
+                btn.closest('tr').remove();
+            } catch (err) {
+                console.error('移除今日任务失败：', err);
+            }
+        });
+    });
+
+    tbody.querySelectorAll('.start-btn').forEach(btn => {
+        btn.addEventListener('click', () => {
+            document.getElementById('stop-btn').click();
+            const id = btn.dataset.id;
+            setFocusTimer(todayTasksList[id]);
+        });
+    });
+
+}
+
+async function addTodayTask(taskId, date) {
+    try {
+        const today = new Date().toISOString().slice(0, 10);
+        const payload = {task: taskId, date: today};
+        if (date) payload.date = date;  // 如果你的 TodayTaskSerializer 接受 date 字段
+
+        const res = await apiFetch('/api/today_tasks/', {method: 'POST', body: payload, bodyType: 'json'});
+
+        if (!res.ok) {
+            const errData = await res.json().catch(() => null);
+            throw new Error(`HTTP ${res.status} ${errData ? JSON.stringify(errData) : ''}`);
+        }
+
+        const newEntry = await res.json();
+        console.log('添加今日任务成功：', newEntry);
+
+        await fetchTodayTasks();
+
+        return newEntry;
+    } catch (err) {
+        console.error('添加今日任务失败：', err);
+        // 你可以在页面上弹个提示
+        // alert('添加失败：' + err.message);
+    }
+}
+
+async function fetchTasks() {
+    try {
+        const res = await apiFetch('/api/tasks/');
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const data = await res.json();
+        renderTasksList(data);
+    } catch (err) {
+        console.error('拉取 tasks 失败：', err);
+    }
+}
+
+async function fetchTodayTasks() {
+    try {
+        const res = await apiFetch('/api/today_tasks/');
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const data = await res.json();
+        renderTodayTasksList(data);
+    } catch (err) {
+        console.error('拉取 today_tasks 失败：', err);
+    }
+}
+
+window.addEventListener('DOMContentLoaded', async () => {
+    {#console.log("DOM fully loaded and parsed"); // 确认事件触发#}
+    // 1. 检查登录
+    const isAuthenticated = await checkAuthenticated();
+    if (!isAuthenticated) {
+        showLoginModal(() => location.reload()); // 登录成功刷新页面
+        return; // 未登录，不执行后续
+    }
+
+    {#console.log("User authenticated, proceeding to load data.");#}
+    // 2. 登录后才初始化数据、渲染页面
+    await refreshGoalOptions();
+    fetchTasks();
+    fetchTodayTasks();
+    renderDate();
+    initTimer();
+    setFocusTimer(null);
+
+    makeDraggable();
+    fullscreenBtn.addEventListener('click', () => {
+        // If it's currently static (due to media query) and we are about to enter fullscreen
+        if (getComputedStyle(focusTimerElement).position === 'static' && !focusTimerElement.classList.contains('fullscreen')) {
+            // Mark it so we can revert properly upon exiting fullscreen
+            focusTimerElement.style.setProperty('--was-static-before-fullscreen', 'true');
+        }
+        toggleFullScreen(); // This function handles both entering and exiting
+    });
+
+    // Ensure stop button is initially hidden if timer starts in rest mode
+    if (currentTask === null) {
+        document.getElementById('stop-btn').style.display = 'none';
+    }
+});
+
+
+async function updateResource(baseUrl, id, updates, method = 'PATCH') {
+    function getCookie(name) {
+        const cookies = document.cookie.split(';').map(c => c.trim());
+        for (let c of cookies) {
+            const [key, val] = c.split('=');
+            if (key === name) return decodeURIComponent(val);
+        }
+        return null;
+    }
+
+    const url = `${baseUrl}/${id}/`;
+
+    try {
+        const res = await apiFetch(url, {method: method, body: updates, bodyType: 'json'});
+        const data = await res.json();
+        if (!res.ok) {
+            console.error(`更新资源 ${url} 失败：`, data);
+            return null;
+        }
+        console.log(`更新资源 ${url} 成功：`, data);
+        return data;
+
+    } catch (err) {
+        console.error(`网络或解析错误 (${method} ${url})：`, err);
+        return null;
+    }
+}
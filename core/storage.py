@@ -0,0 +1,41 @@
+"""
+collectstatic 时生成带哈希的文件名 (ManifestStaticFilesStorage)，并顺便预压缩成 .gz / .br，
+由 views.serve_static 按 Accept-Encoding 直接返回，运行时不再压缩。
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # requirements.txt 里有 Brotli；没装时（如精简的开发环境）只生成 .gz
+    brotli = None
+
+COMPRESS_EXTENSIONS = ('.css', '.js', '.html', '.svg', '.json', '.txt', '.map', '.xml')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run=dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        # 等所有轮次的哈希替换结束后再压缩最终文件
+        for hashed_name in sorted(hashed_names):
+            if hashed_name.endswith(COMPRESS_EXTENSIONS):
+                self._write_compressed(hashed_name)
+
+    def _write_compressed(self, name):
+        with self.open(name) as source:
+            data = source.read()
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                path = self.path(name + suffix)
+                with open(path, 'wb') as out:
+                    out.write(compressed)
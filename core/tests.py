@@ -0,0 +1,221 @@
+import csv
+import gzip
+import io
+import json
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .archive import archive_batch
+from .dependencies import add_dependency, get_graph
+from .exports import EXPORTS, stream_export
+from .imports import import_rows
+from .models import ArchivedLogBatch, ShortTermGoal, Task, TodayTask, WorkLog
+
+_encoder = DjangoJSONEncoder()
+
+
+def _consume(chunks):
+    return b''.join(chunks)
+
+
+def _make_logs(user, count, start=None):
+    start = start or timezone.now() - timedelta(days=1)
+    WorkLog.objects.bulk_create([
+        WorkLog(
+            user=user, task_name_snapshot=f"任务 {i}, \"引号\"\n换行" if i % 7 == 0 else f"任务 {i}",
+            task_source=None if i % 3 == 0 else "今日待办",
+            timestamp_start=start + timedelta(minutes=i), timestamp_end=start + timedelta(minutes=i + 25),
+            duration_minutes=25, user_reported_status_at_end="完成", energy_cost=None, tags_snapshot="a,b",
+        )
+        for i in range(count)
+    ], batch_size=2000)
+
+
+class StreamingExportTests(TestCase):
+    """流式导出 (core.exports)：内容与源数据一致、gzip 解压后与未压缩输出逐字节相同。"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='export-test')
+        _make_logs(cls.user, 250)
+
+    def _expected_rows(self):
+        _, columns = EXPORTS['worklog']
+        rows = WorkLog.objects.filter(user=self.user).order_by('timestamp_start', 'id').values_list(*columns)
+        return columns, list(rows)
+
+    def test_csv_matches_source_rows(self):
+        columns, expected = self._expected_rows()
+        body = _consume(stream_export('worklog', self.user, fmt='csv')[0]).decode('utf-8')
+        parsed = list(csv.reader(io.StringIO(body, newline='')))
+        self.assertEqual(parsed[0], columns)
+        self.assertEqual(len(parsed) - 1, len(expected))
+        for line, row in zip(parsed[1:], expected):
+            self.assertEqual(line, [
+                '' if value is None else _encoder.default(value) if hasattr(value, 'isoformat') else str(value)
+                for value in row
+            ])
+
+    def test_ndjson_matches_source_rows(self):
+        columns, expected = self._expected_rows()
+        body = _consume(stream_export('worklog', self.user, fmt='ndjson')[0]).decode('utf-8')
+        lines = body.splitlines()
+        self.assertEqual(len(lines), len(expected))
+        for line, row in zip(lines, expected):
+            self.assertEqual(json.loads(line), json.loads(_encoder.encode(dict(zip(columns, row)))))
+
+    def test_gzip_decompresses_to_same_bytes(self):
+        for fmt in ('csv', 'ndjson'):
+            with self.subTest(fmt=fmt):
+                plain = _consume(stream_export('worklog', self.user, fmt=fmt)[0])
+                chunks, content_type, filename = stream_export('worklog', self.user, fmt=fmt, compress=True)
+                self.assertEqual(gzip.decompress(_consume(chunks)), plain)
+                self.assertEqual(content_type, 'application/gzip')
+                self.assertEqual(filename, f'worklog.{fmt}.gz')
+
+    def test_archived_rows_are_exported(self):
+        _, expected = self._expected_rows()
+        cutoff = expected[100][4]  # timestamp_start
+        self.assertEqual(archive_batch(ArchivedLogBatch.Kind.WORK_LOG, cutoff), 100)
+        body = _consume(stream_export('worklog', self.user, fmt='ndjson')[0]).decode('utf-8')
+        self.assertEqual([json.loads(line)['id'] for line in body.splitlines()], [row[0] for row in expected])
+
+    def test_endpoint_streams(self):
+        client = APIClient()
+        client.force_login(self.user)
+        response = client.get('/api/export/worklog/', {'fmt': 'csv', 'gzip': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="worklog.csv.gz"')
+        plain = _consume(stream_export('worklog', self.user, fmt='csv')[0])
+        self.assertEqual(gzip.decompress(_consume(response.streaming_content)), plain)
+
+
+class ExportMemoryTests(TestCase):
+    """导出大量行时峰值内存应基本不变（与行数无关），这里比较 1 万行和 5 万行。"""
+
+    SMALL, LARGE = 10_000, 50_000
+    # 一批 EXPORT_CHUNK_SIZE 行加上输出缓冲，远小于把 5 万行整体读进内存所需
+    MAX_PEAK_BYTES = 4 * 1024 * 1024
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.small = User.objects.create(username='export-small')
+        cls.large = User.objects.create(username='export-large')
+        _make_logs(cls.small, cls.SMALL)
+        _make_logs(cls.large, cls.LARGE)
+
+    def _peak(self, user, fmt, compress):
+        tracemalloc.start()
+        try:
+            size = 0
+            for chunk in stream_export('worklog', user, fmt=fmt, compress=compress)[0]:
+                size += len(chunk)
+            return tracemalloc.get_traced_memory()[1], size
+        finally:
+            tracemalloc.stop()
+
+    def test_memory_is_bounded(self):
+        for fmt, compress in (('csv', False), ('ndjson', False), ('csv', True)):
+            with self.subTest(fmt=fmt, gzip=compress):
+                small_peak, _ = self._peak(self.small, fmt, compress)
+                large_peak, large_size = self._peak(self.large, fmt, compress)
+                self.assertLess(large_peak, self.MAX_PEAK_BYTES)
+                # 行数是 5 倍，峰值内存不应跟着涨
+                self.assertLess(large_peak, small_peak * 1.5 + 512 * 1024)
+                if not compress:
+                    # 完整输出比峰值上限还大，说明没有把整份结果攒在内存里
+                    self.assertGreater(large_size, self.MAX_PEAK_BYTES)
+
+
+class AddDependencyTests(TestCase):
+    """新增依赖后立即按包含新边的图计算阻塞状态，不受缓存里旧图的影响。"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='deps-test')
+        self.first = Task.objects.create(user=self.user, name='A')
+        self.second = Task.objects.create(user=self.user, name='B')
+
+    def test_blocks_with_warm_cache(self):
+        self.assertEqual(get_graph(self.user.pk), ({}, {}))
+        with self.captureOnCommitCallbacks(execute=True):
+            add_dependency(self.user, self.second, self.first)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.status, Task.TaskStatus.BLOCKED)
+        # 提交后缓存换版本，读到的图包含新边
+        self.assertEqual(get_graph(self.user.pk)[1], {self.second.pk: [self.first.pk]})
+
+    def test_finished_predecessor_does_not_block(self):
+        Task.objects.filter(pk=self.first.pk).update(status=Task.TaskStatus.COMPLETED)
+        get_graph(self.user.pk)
+        add_dependency(self.user, self.second, self.first)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.status, Task.TaskStatus.NOT_STARTED)
+
+
+class ImportRowsTests(TestCase):
+    """批量导入绕过了 bulk_create，写入的行要和逐个 save() 的结果一致：默认值、auto_now_add、外键。"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='import-test')
+        self.goal = ShortTermGoal.objects.create(user=self.user, name='目标')
+
+    def test_defaults_and_foreign_keys(self):
+        before = timezone.now()
+        result = import_rows(self.user, 'tasks', iter([
+            {'name': '写周报', 'priority': '2', 'short_term_goal': '目标', 'end_date': '2026-11-01'},
+            {'priority': '9'},
+            {'name': '没有的目标', 'short_term_goal': '不存在'},
+            {'name': '已完成', 'status': Task.TaskStatus.COMPLETED, 'actual_time_minutes': '30'},
+        ]))
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([error['row'] for error in result['errors']], [2, 3])
+        self.assertEqual(set(result['errors'][0]['errors']), {'name', 'priority'})
+
+        task = Task.objects.get(user=self.user, name='写周报')
+        self.assertEqual(task.priority, 2)
+        self.assertEqual(task.short_term_goal_ref, self.goal)
+        self.assertEqual(str(task.end_date), '2026-11-01')
+        self.assertEqual(task.status, Task.TaskStatus.NOT_STARTED)
+        self.assertEqual(task.actual_time_minutes, 0)
+        self.assertEqual(task.tags, '')
+        self.assertGreaterEqual(task.created_at, before)
+        done = Task.objects.get(user=self.user, name='已完成')
+        self.assertEqual((done.status, done.actual_time_minutes), (Task.TaskStatus.COMPLETED, 30))
+
+    def test_dry_run_writes_nothing(self):
+        result = import_rows(self.user, 'tasks', iter([{'name': 'a'}, {'name': 'b'}]), dry_run=True)
+        self.assertEqual(result, {'created': 2, 'errors': []})
+        self.assertFalse(Task.objects.filter(user=self.user).exists())
+
+
+class BatchViewTests(TestCase):
+    """批量接口：某一步违反数据库约束时和校验失败一样返回 400 和 failed_index，整体回滚。"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='batch-test')
+        self.client = APIClient()
+        self.client.force_login(self.user)
+
+    def test_integrity_error_rolls_back(self):
+        today = str(timezone.localdate())
+        response = self.client.post('/api/batch/', {'operations': [
+            {'method': 'POST', 'resource': 'tasks', 'data': {'name': '写周报'}},
+            {'method': 'POST', 'resource': 'today_tasks', 'data': {'task': '$0.id', 'date': today}},
+            {'method': 'POST', 'resource': 'today_tasks', 'data': {'task': '$0.id', 'date': today}},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['committed'], False)
+        self.assertEqual(response.data['failed_index'], 2)
+        self.assertEqual([result['status'] for result in response.data['results']], [201, 201, 400])
+        self.assertFalse(Task.objects.filter(user=self.user).exists())
+        self.assertFalse(TodayTask.objects.filter(user=self.user).exists())
@@ -0,0 +1,104 @@
+"""
+写接口限流：按用户、按接口的令牌桶。
+
+桶的状态放在共享缓存里，只用原子的 add / incr / decr，放行路径不查数据库。
+缓存无法原子地"读余量-扣减-写回"，所以用相邻两个时间片的计数近似令牌桶：
+当前片已用 + 上一片已用 × 上一片仍在窗口内的比例 ≤ 容量 即放行，
+效果相当于容量为 num、每 period 秒匀速补满的桶。
+速率在 REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] 里按 scope 配置，格式同 DRF ('30/min')。
+
+多进程部署时缓存必须是 Redis / Memcached：进程内的 LocMemCache 每个 worker 各有一份桶，
+实际额度会变成配置值 × worker 数。settings_prod 会拒绝其它缓存，manage.py check --deploy 也会报错。
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache as default_cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+
+class TokenBucketWriteThrottle(BaseThrottle):
+    cache = default_cache
+    cache_prefix = 'throttle'
+    scope = None
+
+    def __init__(self):
+        self._wait = None
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"u{request.user.pk}"
+        return f"ip{super().get_ident(request)}"
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        scope = self.get_scope(view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if not rate:
+            return True
+        capacity, period = SimpleRateThrottle.parse_rate(None, rate)
+
+        now = time.time()
+        slot, offset = divmod(now, period)
+        slot = int(slot)
+        fraction = offset / period
+        base = f"{self.cache_prefix}:{scope}:{self.get_ident(request)}"
+        current_key = f"{base}:{slot}"
+        self.cache.add(current_key, 0, timeout=period * 2)
+        try:
+            used = self.cache.incr(current_key)
+        except ValueError:  # add 和 incr 之间键刚好过期
+            self.cache.set(current_key, 1, timeout=period * 2)
+            used = 1
+        previous = self.cache.get(f"{base}:{slot - 1}", 0)
+
+        if previous * (1 - fraction) + used <= capacity:
+            return True
+        # 被拒绝的请求不占令牌
+        self.cache.decr(current_key)
+        used -= 1
+        if used >= capacity or not previous:
+            self._wait = period - offset
+        else:
+            # 上一片的权重降到 (capacity - used) / previous 以下时才有空位
+            self._wait = max(0.0, (1 - (capacity - used) / previous - fraction) * period)
+        return False
+
+    def wait(self):
+        # DRF 用 '%d' 格式化 Retry-After，向上取整避免出现 0
+        return math.ceil(self._wait) if self._wait is not None else None
+
+
+class UserWriteThrottle(TokenBucketWriteThrottle):
+    """每个用户所有写接口合计的速率（scope: user_write）。"""
+    scope = 'user_write'
+
+
+class ScopedWriteThrottle(TokenBucketWriteThrottle):
+    """每个用户在单个接口上的速率，scope 取视图的 throttle_scope。"""
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scope', None)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    if not any(issubclass(throttle, TokenBucketWriteThrottle) for throttle in classes):
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in settings.SHARED_CACHE_BACKENDS:
+        return []
+    return [checks.Error(
+        f"写接口限流的令牌桶放在 CACHES['default'] ({backend})，多进程部署时各进程的桶互不相通",
+        hint="生产环境把 CACHES['default'] 配成 Redis 或 Memcached（见 scarcity_project/settings_prod.py）",
+        id='core.E001',
+    )]
@@ -7,12 +7,27 @@ router = DefaultRouter()
 router.register(r'long_term_goals', views.LongTermGoalViewSet, basename='longtermgoal')
 router.register(r'short_term_goals', views.ShortTermGoalViewSet, basename='shorttermgoal')
 router.register(r'tasks', views.TaskViewSet, basename='task')
+router.register(r'task_dependencies', views.TaskDependencyViewSet, basename='taskdependency')
 router.register(r'energy_log', views.EnergyLogViewSet, basename='energy')
 router.register(r'bandwidth_tag_costs', views.BandwidthTagCostViewSet, basename='bandwidthtagcost')
 router.register(r'fixed_schedules', views.FixedScheduleViewSet, basename='fixedschedule')
 router.register(r'today_tasks', views.TodayTaskViewSet, basename='todaytask')
+router.register(r'tokens', views.ApiTokenViewSet, basename='apitoken')
+router.register(r'jobs', views.JobViewSet, basename='job')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('api/get-csrf-token/', views.get_csrf_token, name='get-csrf-token'),
+    path('export/<str:kind>/', views.ExportView.as_view(), name='export'),
+    path('import/<str:kind>/', views.ImportView.as_view(), name='import'),
+    path('batch/', views.BatchView.as_view(), name='batch'),
+    path('forecast/', views.ForecastView.as_view(), name='forecast'),
+    path('journal/', views.JournalView.as_view(), name='journal'),
+    path('journal/heatmap/', views.JournalHeatmapView.as_view(), name='journal-heatmap'),
+    path('calendar/', views.CalendarFeedView.as_view(), name='calendar'),
+    path('calendar/<str:key>.ics', views.calendar_feed, name='calendar-feed'),
+    path('energy_profile/', views.EnergyProfileView.as_view(), name='energy-profile'),
+    path('work_session/', views.WorkSessionView.as_view(), name='work-session'),
+    path('work_session/<str:op>/', views.WorkSessionView.as_view(), name='work-session-op'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
 ]
@@ -1,23 +1,114 @@
-from django.shortcuts import render
-from rest_framework import viewsets, status, permissions
+import csv
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, Http404
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import condition, require_safe
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
+from rest_framework import viewsets, status, permissions, exceptions
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from .models import (
     LongTermGoal, ShortTermGoal, Task, EnergyLog,
-    BandwidthTagCost, FixedSchedule, UserSetting, TodayTask
+    BandwidthTagCost, FixedSchedule, UserSetting, TodayTask, ApiToken, EnergyProfile,
+    TaskDependency, Job, CalendarFeed, ENERGY_LEVEL_POINTS, energy_points_expression
 )
 from .serializers import (
     LongTermGoalSerializer, ShortTermGoalSerializer, TaskSerializer, TodayTaskSerializer,
-    EnergyLogSerializer, BandwidthTagCostSerializer, FixedScheduleSerializer
+    EnergyLogSerializer, BandwidthTagCostSerializer, FixedScheduleSerializer, TodayTaskRolloverSerializer,
+    BatchOperationSerializer, ApiTokenSerializer, TodayTaskRangeSerializer, TaskDependencySerializer, WorkLogSerializer, WorkSessionStartSerializer,
+    WorkSessionStopSerializer, JobSerializer
 )
+from . import dependencies, energy_buffer, energy_profile, ical, jobs, journal, sharding, work_sessions
+from .authentication import generate_token
+from .dependencies import FINISHED_STATUSES
+from .estimation import get_estimation_stats
+from .forecast import DEFAULT_WEEKS, MAX_WEEKS, build_forecast
+from .rollover import rollover_today_tasks, mark_overdue_tasks
+from .middleware import route_histograms
+from .exports import EXPORTS, FORMATS, stream_export
+from .imports import IMPORT_FORMATS, IMPORT_KINDS, import_rows, parse_rows
 from django.middleware.csrf import get_token
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 
 def get_csrf_token(request):
     token = get_token(request)
     return JsonResponse({'csrfToken': token})
 
+@lru_cache(maxsize=1)
+def _cached_shell():
+    html = render_to_string('index.html')
+    return html, '"%s"' % hashlib.md5(html.encode('utf-8')).hexdigest()
+
+
+def _shell():
+    # 外壳页面不含任何按请求变化的内容，渲染一次即可；DEBUG 时每次重新渲染方便改模板
+    if settings.DEBUG:
+        _cached_shell.cache_clear()
+    return _cached_shell()
+
+
+@ensure_csrf_cookie
+@cache_control(no_cache=True)
+@condition(etag_func=lambda request: _shell()[1])
 def home(request):
-    return render(request, 'index.html')
+    # JS / CSS 在带哈希的静态文件里，这里只返回很小的 HTML 外壳，重复访问基本都是 304
+    return HttpResponse(_shell()[0])
+
+
+# 带哈希的文件名，例如 app.3f1c9a2b7d4e.js
+_HASHED_STATIC_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/]+$')
+_STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def serve_static(request, path):
+    """
+    DEBUG=False 时提供 collectstatic 的产物：优先返回预压缩的 .br / .gz，
+    带哈希的文件名内容永不变化，按 immutable 缓存一年。
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except ValueError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    accepted = request.headers.get('Accept-Encoding', '')
+    encoding = None
+    for name, suffix in _STATIC_ENCODINGS:
+        if name in accepted and os.path.isfile(full_path + suffix):
+            full_path += suffix
+            encoding = name
+            break
+
+    response = FileResponse(open(full_path, 'rb'), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    if _HASHED_STATIC_NAME.search(path):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=300'
+    return response
 
 
 class LongTermGoalViewSet(viewsets.ModelViewSet):
@@ -43,20 +134,31 @@ class ShortTermGoalViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-    def create(self, request, *args, **kwargs):
-        print("====== ShortTermGoalViewSet: create ======")  # 添加一个标记，方便定位
-        print("Request Method:", request.method)
-        print("Request Headers:", request.headers)  # 可以看看 Content-Type
-        print("Request data RECEIVED:", request.data)  # <--- 关键输出1
-
-        serializer = self.get_serializer(data=request.data)
-        if serializer.is_valid():
-            self.perform_create(serializer)
-            headers = self.get_success_headers(serializer.data)
-            return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
-        else:
-            print("Serializer ERRORS:", serializer.errors)  # <--- 关键输出2
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    @action(detail=True, methods=['get'])
+    def critical_path(self, request, pk=None):
+        # 目标下任务的关键路径：按依赖关系串起来剩余预估分钟数最多的一条链
+        goal = self.get_object()
+        rows = {
+            task_id: (name, task_status, max((estimated or 0) - actual, 0) if task_status not in FINISHED_STATUSES else 0)
+            for task_id, name, task_status, estimated, actual in goal.tasks_set.values_list(
+                'id', 'name', 'status', 'estimated_time_minutes', 'actual_time_minutes')
+        }
+        successors, _ = dependencies.get_graph(request.user.pk)
+        try:
+            path, total = dependencies.critical_path({task_id: row[2] for task_id, row in rows.items()}, successors)
+        except dependencies.DependencyCycle as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            'goal': goal.pk,
+            'total_minutes': total,
+            'path': [
+                {'id': task_id, 'name': rows[task_id][0], 'status': rows[task_id][1],
+                 'remaining_minutes': rows[task_id][2]}
+                for task_id in path
+            ],
+        })
+
+
 class TaskViewSet(viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -68,17 +170,95 @@ class TaskViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_update(self, serializer):
+        was_finished = serializer.instance.status in FINISHED_STATUSES
+        task = serializer.save()
+        if (task.status in FINISHED_STATUSES) != was_finished:
+            # 结束或重新打开时，更新直接后继的阻塞状态
+            dependencies.on_tasks_status_changed(task.user_id, [task.pk])
+
+    def perform_destroy(self, instance):
+        successors, _ = dependencies.get_graph(instance.user_id)
+        downstream = successors.get(instance.pk, [])
+        instance.delete()
+        dependencies.refresh_blocked(instance.user_id, downstream)
+
+    @action(detail=False, methods=['get'])
+    def estimation(self, request):
+        # 预估准确度：已完成任务的 实际/预估 比值，按标签、类型、优先级、精力预估分组
+        return Response(get_estimation_stats(request.user.pk))
+
+
+class TaskDependencyViewSet(viewsets.ModelViewSet):
+    serializer_class = TaskDependencySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ['post', 'get', 'delete']
+
+    def get_queryset(self):
+        queryset = TaskDependency.objects.filter(user=self.request.user)
+        task_param = self.request.query_params.get('task')
+        if task_param:
+            queryset = queryset.filter(task_id=task_param)
+        return queryset.order_by('id')
+
+    def perform_create(self, serializer):
+        task = serializer.validated_data['task']
+        depends_on = serializer.validated_data['depends_on']
+        if TaskDependency.objects.filter(task=task, depends_on=depends_on).exists():
+            raise exceptions.ValidationError({"depends_on": "这条依赖已经存在。"})
+        try:
+            serializer.instance = dependencies.add_dependency(self.request.user, task, depends_on)
+        except dependencies.DependencyCycle as exc:
+            raise exceptions.ValidationError({"depends_on": str(exc)})
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        dependencies.refresh_blocked(instance.user_id, [instance.task_id])
+
 
 class EnergyLogViewSet(viewsets.ModelViewSet):
     serializer_class = EnergyLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'energy_log'
     http_method_names = ['post', 'get']  # 允许创建和查看
 
     def get_queryset(self):
         return EnergyLog.objects.filter(user=self.request.user)
 
+    def create(self, request, *args, **kwargs):
+        # 支持一次提交多条（离线补传）
+        many = isinstance(request.data, list)
+        serializer = self.get_serializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        if not energy_buffer.enabled():
+            with transaction.atomic(using=sharding.db_for_user(request.user.pk)):
+                self.perform_create(serializer)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        items = serializer.validated_data if many else [serializer.validated_data]
+        samples = [energy_buffer.sample_from_validated(request.user, item) for item in items]
+        if energy_buffer.append(samples):
+            energy_buffer.flush()
+        pending = [self._pending_data(EnergyLog(**sample)) for sample in samples]
+        # 202：已落入缓冲，稍后入库
+        return Response(pending if many else pending[0], status=status.HTTP_202_ACCEPTED)
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        saved = serializer.save(user=self.request.user)
+        energy_buffer.on_energy_logs_saved(saved if isinstance(saved, list) else [saved])
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if energy_buffer.enabled():
+            pending = [self._pending_data(obj) for obj in energy_buffer.pending_for_user(request.user.pk)]
+            response.data = pending + list(response.data)
+        return response
+
+    def _pending_data(self, obj):
+        obj.user = self.request.user
+        data = self.get_serializer(obj).data
+        data['pending'] = True
+        return data
 
 
 class BandwidthTagCostViewSet(viewsets.ModelViewSet):
@@ -110,9 +290,13 @@ class FixedScheduleViewSet(viewsets.ModelViewSet):
 class TodayTaskViewSet(viewsets.ModelViewSet):
     serializer_class = TodayTaskSerializer
     permission_classes = [permissions.IsAuthenticated] # 确保用户已登录
+    throttle_scope = 'today_tasks'
 
     def get_queryset(self):
-        queryset = TodayTask.objects.filter(user=self.request.user)
+        # task_details 嵌套了任务及其目标，一次连表取出；用户表可能在另一个库（分库时），单独查一次
+        queryset = TodayTask.objects.filter(user=self.request.user).select_related(
+            'task__short_term_goal_ref', 'task__long_term_goal_ref'
+        ).prefetch_related('task__user')
         date_param = self.request.query_params.get('date')
         if date_param:
             queryset = queryset.filter(date=date_param)
@@ -126,4 +310,474 @@ class TodayTaskViewSet(viewsets.ModelViewSet):
         except Task.DoesNotExist:
             # 可以在序列化器层面处理这个校验，或者在这里返回错误
             from rest_framework.exceptions import ValidationError
-            raise ValidationError({"task": "指定的任务不存在或不属于您。"})
\ No newline at end of file
+            raise ValidationError({"task": "指定的任务不存在或不属于您。"})
+
+    @action(detail=False, methods=['get'], url_path='range')
+    def date_range(self, request):
+        # 多日计划：?from=&to= 之间每天的待办和当天合计，日历视图一次取完
+        params = TodayTaskRangeSerializer(data={
+            'from_date': request.query_params.get('from'),
+            'to_date': request.query_params.get('to'),
+        })
+        params.is_valid(raise_exception=True)
+        from_date = params.validated_data['from_date']
+        to_date = params.validated_data['to_date']
+
+        entries = TodayTask.objects.filter(user=request.user, date__range=(from_date, to_date))
+        totals = {
+            row['date']: row for row in entries.order_by().values('date').annotate(
+                count=Count('id'),
+                estimated_minutes=Coalesce(Sum('task__estimated_time_minutes'), 0),
+                energy_points=Sum(energy_points_expression('task__energy_level_estimate')),
+                **{
+                    f"level_{points}": Count('id', filter=Q(task__energy_level_estimate=level))
+                    for level, points in ENERGY_LEVEL_POINTS.items()
+                },
+            )
+        }
+        serialized = self.get_serializer(
+            entries.select_related('task__short_term_goal_ref', 'task__long_term_goal_ref')
+            .prefetch_related('task__user').order_by('date', 'added_at'),
+            many=True,
+        ).data
+        by_date = {}
+        for item in serialized:
+            by_date.setdefault(item['date'], []).append(item)
+
+        days = []
+        day = from_date
+        while day <= to_date:
+            row = totals.get(day, {})
+            days.append({
+                'date': day,
+                'count': row.get('count', 0),
+                'estimated_minutes': row.get('estimated_minutes', 0),
+                'energy_points': row.get('energy_points', 0),
+                'energy_levels': {level: row.get(f"level_{points}", 0) for level, points in ENERGY_LEVEL_POINTS.items()},
+                'entries': by_date.get(day.isoformat(), []),
+            })
+            day += timedelta(days=1)
+        return Response({'from': from_date, 'to': to_date, 'days': days})
+
+    @action(detail=False, methods=['post'])
+    def rollover(self, request):
+        # 把某天没做完的待办一次性顺延到下一天，代替前端逐条 POST
+        serializer = TodayTaskRolloverSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        to_date = serializer.validated_data.get('to_date')
+        from_date = serializer.validated_data.get('from_date')
+        if to_date is None:
+            to_date = from_date + timedelta(days=1) if from_date else timezone.localdate()
+        if from_date is None:
+            from_date = to_date - timedelta(days=1)
+
+        result = {
+            'from_date': from_date,
+            'to_date': to_date,
+            'created': rollover_today_tasks(from_date, to_date, user=request.user),
+        }
+        if serializer.validated_data['mark_overdue']:
+            result['overdue_marked'] = mark_overdue_tasks(to_date, user=request.user)
+        return Response(result)
+
+
+class ApiTokenViewSet(viewsets.ModelViewSet):
+    serializer_class = ApiTokenSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ['post', 'get', 'delete']
+
+    def get_queryset(self):
+        return ApiToken.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        key, digest = generate_token()
+        token = serializer.save(user=self.request.user, key_hash=digest, prefix=key[:8])
+        token.key = key
+
+
+class CalendarFeedView(APIView):
+    """
+    日历订阅地址：GET 查看是否已开启；POST 生成（或更换）订阅地址，完整地址只在这次返回；DELETE 关闭订阅。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        feed = CalendarFeed.objects.filter(user=request.user).first()
+        if feed is None:
+            return Response({'enabled': False})
+        return Response({'enabled': True, 'prefix': feed.prefix, 'created_at': feed.created_at})
+
+    def post(self, request):
+        key, feed = ical.create_feed(request.user)
+        url = request.build_absolute_uri(reverse('calendar-feed', args=[key]))
+        return Response({'enabled': True, 'url': url, 'prefix': feed.prefix, 'created_at': feed.created_at},
+                        status=status.HTTP_201_CREATED)
+
+    def delete(self, request):
+        ical.revoke_feed(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@require_safe
+def calendar_feed(request, key):
+    """日历应用订阅的 ICS：/api/calendar/<令牌>.ics，凭地址里的令牌访问，不需要登录。"""
+    user_id = ical.user_for_key(key)
+    if user_id is None:
+        raise Http404
+    body, etag, changed_at = ical.get_feed(user_id)
+    last_modified = int(changed_at.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # 允许缓存，但每次都要带条件请求回来验证，内容没变就是 304
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class EnergyProfileView(APIView):
+    """
+    GET /api/energy_profile/ 返回按 星期×小时 的精力画像，以及 at（默认现在）所在时段的精力水平；
+    该时段属于高精力时段时附带建议做的高精力任务。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        at = timezone.now()
+        if request.query_params.get('at'):
+            try:
+                at = parse_datetime(request.query_params['at'])
+            except ValueError:
+                # 格式对但取值越界（如 13 月、25 点）
+                at = None
+            if at is None:
+                return Response({"at": "时间格式应为 ISO 8601。"}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+        profile = EnergyProfile.objects.filter(user=request.user).first()
+        data = energy_profile.describe(profile)
+        local = timezone.localtime(at)
+        level = energy_profile.level_at(profile, at)
+        data['current'] = {'weekday': local.weekday(), 'hour': local.hour, 'level': level}
+        high = level is not None and level >= energy_profile.HIGH_LEVEL
+        data['suggested_tasks'] = energy_profile.suggested_tasks(request.user) if high else []
+        return Response(data)
+
+
+class ForecastView(APIView):
+    """GET /api/forecast/?weeks=N 未来 N 周（默认 4，最多 52）每天的可用时间和任务需求，标出超负荷的日子。"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            weeks = int(request.query_params.get('weeks', DEFAULT_WEEKS))
+        except ValueError:
+            weeks = 0
+        if not 1 <= weeks <= MAX_WEEKS:
+            return Response({"weeks": f"应为 1 到 {MAX_WEEKS} 之间的整数。"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(build_forecast(request.user, timezone.localdate(), weeks))
+
+
+def _query_date(request, name):
+    """查询串里的日期，缺省为今天；格式不对时返回 None。"""
+    value = request.query_params.get(name)
+    if not value:
+        return timezone.localdate()
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+class JournalView(APIView):
+    """
+    GET /api/journal/?date=YYYY-MM-DD 某天（默认今天）的工作日志日报：专注分钟数、会话数、
+    按任务和任务来源的分钟数、结束状态统计。只读按天汇总表。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        day = _query_date(request, 'date')
+        if day is None:
+            return Response({"date": "日期格式应为 YYYY-MM-DD。"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(journal.describe_day(request.user, day))
+
+
+class JournalHeatmapView(APIView):
+    """GET /api/journal/heatmap/?end=YYYY-MM-DD&days=365 截至 end（默认今天）每天的专注分钟数，用于年度热力图。"""
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_DAYS = 366
+
+    def get(self, request):
+        end = _query_date(request, 'end')
+        if end is None:
+            return Response({"end": "日期格式应为 YYYY-MM-DD。"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            days = int(request.query_params.get('days', journal.HEATMAP_DAYS))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= self.MAX_DAYS:
+            return Response({"days": f"应为 1 到 {self.MAX_DAYS} 之间的整数。"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(journal.heatmap(request.user, end, days))
+
+
+class WorkSessionView(APIView):
+    """
+    GET /api/work_session/ 查看当前会话（客户端心跳轮询这个，只读缓存）；
+    POST /api/work_session/<start|pause|resume|stop>/ 控制会话，stop 时写入 WorkLog。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, op=None):
+        if op is not None:
+            raise exceptions.MethodNotAllowed(request.method)
+        return Response(work_sessions.describe(work_sessions.get_session(request.user)))
+
+    def post(self, request, op=None):
+        try:
+            if op == 'start':
+                serializer = WorkSessionStartSerializer(data=request.data, context={'request': request})
+                serializer.is_valid(raise_exception=True)
+                state = work_sessions.start_session(request.user, serializer.validated_data['task'])
+                return Response(work_sessions.describe(state), status=status.HTTP_201_CREATED)
+            if op == 'pause':
+                return Response(work_sessions.describe(work_sessions.pause_session(request.user)))
+            if op == 'resume':
+                return Response(work_sessions.describe(work_sessions.resume_session(request.user)))
+            if op == 'stop':
+                serializer = WorkSessionStopSerializer(data=request.data)
+                serializer.is_valid(raise_exception=True)
+                log = work_sessions.stop_session(request.user, **serializer.validated_data)
+                return Response(WorkLogSerializer(log).data, status=status.HTTP_201_CREATED)
+        except work_sessions.SessionConflict as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
+        raise Http404
+
+
+def _async_requested(request):
+    return request.query_params.get('async') in ('1', 'true')
+
+
+def _job_accepted(request, job):
+    """后台任务已排队：202，Location 指向任务状态。"""
+    data = JobSerializer(job, context={'request': request}).data
+    location = request.build_absolute_uri(reverse('job-detail', args=[job.pk]))
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': location})
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    后台任务：GET /api/jobs/ 列表，GET /api/jobs/<id>/ 状态和进度，GET /api/jobs/<id>/download/ 下载结果文件。
+    POST /api/jobs/ {"kind": "energy_profile" 或 "work_journal"} 排队重建精力画像或工作日志汇总；导出、导入用各自接口的 ?async=1。
+    """
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+    def create(self, request):
+        kind = request.data.get('kind')
+        if kind not in jobs.USER_JOB_KINDS:
+            return Response({"kind": f"只支持: {', '.join(jobs.USER_JOB_KINDS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        return _job_accepted(request, jobs.enqueue(request.user, kind))
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if not job.result_file:
+            raise Http404
+        try:
+            fileobj = open(jobs.result_path(job.result_file), 'rb')
+        except FileNotFoundError:
+            raise Http404
+        return FileResponse(fileobj, as_attachment=True, filename=job.result.get('filename'),
+                            content_type=job.result.get('content_type'))
+
+
+class ExportView(APIView):
+    """
+    流式导出历史数据：/api/export/<worklog|energylog|tasks>/?fmt=csv|ndjson&gzip=1
+    （DRF 把 ?format= 用作内容协商参数，所以这里用 fmt）
+    加 ?async=1 时改为后台导出，返回 202 和任务状态，完成后从任务的 download_url 下载。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, kind):
+        if kind not in EXPORTS:
+            return Response({"kind": f"只支持: {', '.join(EXPORTS)}"}, status=status.HTTP_404_NOT_FOUND)
+        fmt = request.query_params.get('fmt', 'csv')
+        if fmt not in FORMATS:
+            return Response({"fmt": f"只支持: {', '.join(FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        if _async_requested(request):
+            job = jobs.enqueue(request.user, Job.Kind.EXPORT, {'kind': kind, 'fmt': fmt, 'gzip': compress})
+            return _job_accepted(request, job)
+
+        chunks, content_type, filename = stream_export(kind, request.user, fmt=fmt, compress=compress)
+        # 响应体在视图返回后才生成，届时请求的分库上下文已经结束
+        chunks = sharding.iterate_in(sharding.db_for_user(request.user.pk), chunks)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ImportView(APIView):
+    """
+    批量导入：/api/import/<tasks|short_term_goals|long_term_goals>/
+    上传 multipart 文件字段 file（csv / json / ndjson，按扩展名或 fmt 参数判断），
+    或直接 POST JSON 数组。?dry_run=1 只校验不写入。任务行用 short_term_goal / long_term_goal 列按名称关联目标。
+    ?async=1 时先保存上传内容、返回 202，由后台任务导入，结果在任务的 result 里。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'import'
+
+    def post(self, request, kind):
+        if kind not in IMPORT_KINDS:
+            return Response({"kind": f"只支持: {', '.join(IMPORT_KINDS)}"}, status=status.HTTP_404_NOT_FOUND)
+        dry_run = request.query_params.get('dry_run') in ('1', 'true')
+
+        upload = request.FILES.get('file')
+        if upload is not None:
+            fmt = request.query_params.get('fmt') or upload.name.rsplit('.', 1)[-1].lower()
+            if fmt not in IMPORT_FORMATS:
+                return Response({"fmt": f"只支持: {', '.join(IMPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+            if _async_requested(request):
+                return self._enqueue(request, kind, fmt, jobs.save_upload(upload, fmt), dry_run)
+            rows = parse_rows(upload, fmt)
+        elif isinstance(request.data, list):
+            if _async_requested(request):
+                upload = jobs.save_upload(json.dumps(request.data).encode(), 'json')
+                return self._enqueue(request, kind, 'json', upload, dry_run)
+            rows = iter(request.data)
+        else:
+            return Response({"file": "请上传文件或提交 JSON 数组。"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = import_rows(request.user, kind, rows, dry_run=dry_run)
+        except (ValueError, csv.Error) as exc:
+            # 文件本身无法解析，整个导入回滚
+            return Response({"file": f"解析失败: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
+        result['dry_run'] = dry_run
+        created = result['created'] and not dry_run
+        return Response(result, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def _enqueue(self, request, kind, fmt, upload, dry_run):
+        job = jobs.enqueue(request.user, Job.Kind.IMPORT,
+                           {'kind': kind, 'fmt': fmt, 'upload': upload, 'dry_run': dry_run})
+        return _job_accepted(request, job)
+
+
+# /api/batch/ 可以操作的资源，键与 core/urls.py 里路由的前缀一致
+BATCH_RESOURCES = {
+    'long_term_goals': LongTermGoalViewSet,
+    'short_term_goals': ShortTermGoalViewSet,
+    'tasks': TaskViewSet,
+    'energy_log': EnergyLogViewSet,
+    'task_dependencies': TaskDependencyViewSet,
+    'bandwidth_tag_costs': BandwidthTagCostViewSet,
+    'fixed_schedules': FixedScheduleViewSet,
+    'today_tasks': TodayTaskViewSet,
+}
+BATCH_MAX_OPERATIONS = 100
+BATCH_ACTIONS = {'POST': 'create', 'PUT': 'update', 'PATCH': 'partial_update', 'DELETE': 'destroy'}
+_BATCH_REFERENCE = re.compile(r'^\$(\d+)\.(\w+)$')
+
+
+class BatchView(APIView):
+    """
+    一次请求里按顺序执行多个增删改操作，全部在同一个事务里，任何一步失败则整体回滚。
+    请求体: {"operations": [{"method": "POST", "resource": "tasks", "data": {...}},
+                           {"method": "POST", "resource": "today_tasks", "data": {"task": "$0.id", "date": "..."}},
+                           {"method": "PATCH", "resource": "tasks", "id": 12, "data": {...}}]}
+    每个操作复用对应 ViewSet 的 get_queryset / get_serializer / perform_* ，校验规则与单独调用时一致。
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'batch'
+
+    def post(self, request):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return Response({"operations": "请提供非空的操作列表。"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > BATCH_MAX_OPERATIONS:
+            return Response({"operations": f"一次最多 {BATCH_MAX_OPERATIONS} 个操作。"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        parsed = BatchOperationSerializer(data=operations, many=True)
+        parsed.is_valid(raise_exception=True)
+
+        results = []
+        using = sharding.db_for_user(request.user.pk)
+        with transaction.atomic(using=using):
+            for index, operation in enumerate(parsed.validated_data):
+                try:
+                    # 每个操作一个保存点：违反数据库约束时先回滚这一步，事务才能继续用来返回结果
+                    with transaction.atomic(using=using):
+                        op_status, data = self._run_operation(request, operation, results)
+                except exceptions.APIException as exc:
+                    detail = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+                    op_status, data = exc.status_code, detail
+                except Http404:
+                    op_status, data = status.HTTP_404_NOT_FOUND, {"detail": "未找到。"}
+                except IntegrityError:
+                    op_status, data = status.HTTP_400_BAD_REQUEST, {"detail": "与已有记录冲突（违反数据库约束）。"}
+                results.append({'index': index, 'status': op_status, 'data': data})
+                if op_status >= 400:
+                    # 每个操作自己的状态码在 results 里，整体统一返回 400
+                    transaction.set_rollback(True)
+                    return Response({'committed': False, 'failed_index': index, 'results': results},
+                                    status=status.HTTP_400_BAD_REQUEST)
+        return Response({'committed': True, 'results': results})
+
+    @staticmethod
+    def _resolve(value, results):
+        if isinstance(value, str):
+            match = _BATCH_REFERENCE.match(value)
+            if match:
+                index, field = int(match.group(1)), match.group(2)
+                if index >= len(results) or not isinstance(results[index]['data'], dict) \
+                        or field not in results[index]['data']:
+                    raise exceptions.ValidationError(f"无法解析引用 {value}。")
+                return results[index]['data'][field]
+        return value
+
+    def _run_operation(self, request, operation, results):
+        method = operation['method']
+        viewset_class = BATCH_RESOURCES.get(operation['resource'])
+        if viewset_class is None:
+            raise exceptions.NotFound(f"未知资源 {operation['resource']}。")
+        if method.lower() not in viewset_class.http_method_names:
+            raise exceptions.MethodNotAllowed(method)
+
+        view = viewset_class(request=request, args=(), kwargs={}, format_kwarg=None,
+                             action=BATCH_ACTIONS[method])
+        view.check_permissions(request)
+        data = {key: self._resolve(value, results) for key, value in operation['data'].items()}
+
+        if method == 'POST':
+            serializer = view.get_serializer(data=data)
+            serializer.is_valid(raise_exception=True)
+            view.perform_create(serializer)
+            return status.HTTP_201_CREATED, serializer.data
+
+        view.kwargs = {view.lookup_url_kwarg or view.lookup_field: self._resolve(operation['id'], results)}
+        instance = view.get_object()
+        if method == 'DELETE':
+            view.perform_destroy(instance)
+            return status.HTTP_204_NO_CONTENT, None
+        serializer = view.get_serializer(instance, data=data, partial=method == 'PATCH')
+        serializer.is_valid(raise_exception=True)
+        view.perform_update(serializer)
+        return status.HTTP_200_OK, serializer.data
+
+
+class MetricsView(APIView):
+    """本进程内各路由的耗时直方图（多进程部署时每个 worker 各自统计）。DELETE 清零。"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(route_histograms.snapshot())
+
+    def delete(self, request):
+        route_histograms.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,161 @@
+"""
+服务端计时的工作会话。
+
+进行中的会话只存在共享缓存里（每个用户一个键），开始 / 暂停 / 继续只改缓存，
+客户端轮询状态只读缓存，都不写数据库。停止时才落成一条 WorkLog，
+并在同一个事务里用 F() 给任务的实际分钟数做原子累加。
+缓存没有比较并交换，暂停 / 继续 / 停止这类"读出-改写"都在每个用户一把的锁里做（cache.add 抢锁），
+否则和停止交错的暂停会把已删除的会话写回去，下次停止就多出一条日志。
+多进程部署需要把 CACHES['default'] 配成共享缓存，否则各进程看到的会话不同。
+"""
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .estimation import invalidate_estimation_stats
+from .models import Task, WorkLog
+from .sharding import db_for_user
+
+
+# 锁的过期时间（秒）：持锁的进程崩溃时最多卡这么久
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+
+
+class SessionConflict(Exception):
+    pass
+
+
+def _key(user):
+    return f"worksession:{user.pk}"
+
+
+@contextmanager
+def _locked(user):
+    key = f"worksession:lock:{user.pk}"
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(key, token, timeout=LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            raise SessionConflict("工作会话正在被另一个请求修改，请稍后重试。")
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        # 锁已过期并被别人拿到时不能删别人的锁
+        if cache.get(key) == token:
+            cache.delete(key)
+
+
+def _ttl():
+    return getattr(settings, 'WORK_SESSION_TTL', 24 * 3600)
+
+
+def _elapsed_seconds(state, now):
+    elapsed = state['elapsed_seconds']
+    if state['running_since'] is not None:
+        elapsed += (now - state['running_since']).total_seconds()
+    return elapsed
+
+
+def describe(state, now=None):
+    if state is None:
+        return {'active': False}
+    now = now or timezone.now()
+    return {
+        'active': True,
+        'task': state['task_id'],
+        'task_name': state['task_name'],
+        'started_at': state['started_at'],
+        'paused': state['running_since'] is None,
+        'elapsed_seconds': int(_elapsed_seconds(state, now)),
+    }
+
+
+def get_session(user):
+    return cache.get(_key(user))
+
+
+def start_session(user, task):
+    now = timezone.now()
+    state = {
+        'task_id': task.pk,
+        'task_name': task.name,
+        'started_at': now,
+        'elapsed_seconds': 0.0,
+        'running_since': now,
+    }
+    # add 只在键不存在时写入，并发的两次开始只有一次成功
+    if not cache.add(_key(user), state, timeout=_ttl()):
+        raise SessionConflict("已有进行中的工作会话，请先结束。")
+    return state
+
+
+def pause_session(user):
+    with _locked(user):
+        state = get_session(user)
+        if state is None:
+            raise SessionConflict("没有进行中的工作会话。")
+        if state['running_since'] is not None:
+            now = timezone.now()
+            state['elapsed_seconds'] = _elapsed_seconds(state, now)
+            state['running_since'] = None
+            cache.set(_key(user), state, timeout=_ttl())
+    return state
+
+
+def resume_session(user):
+    with _locked(user):
+        state = get_session(user)
+        if state is None:
+            raise SessionConflict("没有进行中的工作会话。")
+        if state['running_since'] is None:
+            state['running_since'] = timezone.now()
+            cache.set(_key(user), state, timeout=_ttl())
+    return state
+
+
+def stop_session(user, user_reported_status_at_end=None, energy_cost=None, task_source=None):
+    """结束会话并写入 WorkLog，返回新建的日志。"""
+    key = _key(user)
+    with _locked(user):
+        state = cache.get(key)
+        # 持锁期间别人改不了会话，删掉的就是刚读到的这一份
+        if state is None or not cache.delete(key):
+            raise SessionConflict("没有进行中的工作会话。")
+    now = timezone.now()
+    minutes = round(_elapsed_seconds(state, now) / 60)
+    try:
+        with transaction.atomic(using=db_for_user(user.pk)):
+            # 停止时才给任务拍快照；任务已被删除时保留开始时记下的名称
+            task = Task.objects.filter(pk=state['task_id'], user=user).values('name', 'tags', 'status').first()
+            log = WorkLog.objects.create(
+                user=user,
+                task_ref_id=state['task_id'] if task else None,
+                task_name_snapshot=task['name'] if task else state['task_name'],
+                task_source=task_source,
+                timestamp_start=state['started_at'],
+                timestamp_end=now,
+                duration_minutes=minutes,
+                user_reported_status_at_end=user_reported_status_at_end,
+                energy_cost=energy_cost,
+                tags_snapshot=task['tags'] if task else None,
+            )
+            if task and minutes:
+                Task.objects.filter(pk=state['task_id']).update(
+                    actual_time_minutes=F('actual_time_minutes') + minutes
+                )
+    except Exception:
+        # 落库失败时把会话放回去，客户端可以重试
+        cache.add(key, state, timeout=_ttl())
+        raise
+    if task and minutes and task['status'] == Task.TaskStatus.COMPLETED:
+        # F() 累加不触发信号，已完成任务的实际分钟数变了，预估准确度统计要重算
+        invalidate_estimation_stats(user.pk)
+    return log
@@ -0,0 +1,79 @@
+"""
+gunicorn 配置：gunicorn -c gunicorn.conf.py
+
+- preload_app：应用在主进程里加载并预热一次 (core.warmup)，fork 出的 worker 通过写时复制共享这部分内存，
+  启动时也不会每个 worker 各导入一遍
+- gthread：SQLite 同一时间只有一个写者，多进程并不能提高写吞吐；少量进程 × 多线程足以吃满 I/O 等待，
+  内存也比同样并发数的多进程小得多
+- max_requests + jitter：worker 处理一定数量请求后重启，慢慢涨上去的内存会被回收，
+  加随机抖动避免所有 worker 同时重启
+
+所有参数都可以用环境变量覆盖，见下方 GUNICORN_*。
+"""
+import gc
+import multiprocessing
+import os
+import sqlite3
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scarcity_project.settings_prod")
+
+wsgi_app = "scarcity_project.wsgi:application"
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:8000")
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", min(multiprocessing.cpu_count(), 4)))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # WAL 模式下读不阻塞写、写不阻塞读，多个 worker 并发读才不会互相等锁；模式写在数据库文件里，设一次即可
+    if os.environ.get("GUNICORN_SQLITE_WAL", "1") != "1":
+        return
+    from django.conf import settings
+
+    for database in settings.DATABASES.values():
+        path = database["NAME"]
+        with sqlite3.connect(path) as conn:
+            mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        server.log.info("SQLite journal_mode=%s (%s)", mode, path)
+
+
+def when_ready(server):
+    # preload_app 时应用已经加载，此时还没有 fork 任何 worker
+    if not server.cfg.preload_app:
+        return
+    from core.warmup import warm_up
+
+    report = warm_up()
+    server.log.info("预热完成: %s", report)
+    # 把预热产生的对象移出 GC 跟踪，避免 worker 里的垃圾回收改写这些页、破坏写时复制
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # 不沿用主进程的数据库连接，每个 worker 线程自己建连接
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # 不预加载时每个 worker 各自预热，至少不让第一个请求承担这部分开销
+    if worker.cfg.preload_app:
+        return
+    from core.warmup import warm_up
+
+    worker.log.info("预热完成: %s", warm_up())
@@ -42,22 +42,100 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.sharding.UserShardMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        # 带 Authorization: Bearer 头时走令牌认证（进程内 LRU 缓存，命中不查库），否则走会话
+        'core.authentication.BearerTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         # 'rest_framework.authentication.BasicAuthentication',  # 可选
-    ]
+    ],
+    # 只限制写请求；状态放在 CACHES['default']，多进程部署需配置成共享缓存
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.UserWriteThrottle',
+        'core.throttling.ScopedWriteThrottle',
+    ],
+    # user_write 是每个用户所有写接口的合计；其余按视图的 throttle_scope 配置
+    'DEFAULT_THROTTLE_RATES': {
+        'user_write': '300/min',
+        'energy_log': '30/min',
+        'today_tasks': '60/min',
+        'batch': '30/min',
+        'import': '10/hour',
+    },
+}
+
+# 请求性能统计 (core.middleware.PerformanceMiddleware)
+PERF_SLOW_REQUEST_MS = 500
+PERF_SLOW_QUERY_MS = 100
+
+# 早于这么多天的 WorkLog / EnergyLog 由 archive_logs 命令移入归档表
+ARCHIVE_HORIZON_DAYS = 365
+
+# 精力画像 (core.energy_profile) 里样本权重的半衰期
+ENERGY_PROFILE_HALF_LIFE_DAYS = 30
+
+# 进行中的工作会话在缓存里保留的最长时间（秒），超时未结束的会话直接丢弃
+WORK_SESSION_TTL = 24 * 3600
+
+# backup_db 命令的快照目录
+BACKUP_DIR = BASE_DIR / "backups"
+
+# EnergyLog 写后缓冲 (core.energy_buffer)：开启后 POST 先写本地日志文件、返回 202，再批量入库
+ENERGY_LOG_WRITE_BEHIND = os.environ.get("ENERGY_LOG_WRITE_BEHIND", "") == "1"
+ENERGY_LOG_BUFFER_PATH = BASE_DIR / "var" / "energy_log.journal"
+ENERGY_LOG_BUFFER_MAX_BYTES = 64 * 1024  # 约 500 条
+ENERGY_LOG_BUFFER_MAX_AGE = 5  # 秒
+ENERGY_LOG_BUFFER_FSYNC = True  # 关掉后确认更快，但掉电可能丢最近几条
+
+# 后台任务 (core.jobs，由 runworker 命令执行)
+JOB_LEASE_SECONDS = 300  # 领取后的租约，worker 每过三分之一续一次；worker 崩溃后过期的任务会被重新领取
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 30  # 第 n 次失败后等 JOB_RETRY_DELAY * 2^(n-1) 秒再重试
+JOB_RESULT_DIR = BASE_DIR / "var" / "jobs"  # 导出结果和待导入的上传文件
+JOB_RETENTION_DAYS = 7
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.perf": {"handlers": ["console"], "level": "INFO"},
+    },
 }
 
+API_TOKEN_CACHE_SIZE = 1024
+API_TOKEN_CACHE_TTL = 300  # 秒，令牌被删除后其它进程最多这么久后失效
+
+# add / incr 在所有进程间原子的缓存后端；settings_prod 和 manage.py check --deploy (core.E001) 都按它检查
+SHARED_CACHE_BACKENDS = {
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+}
+# 默认是进程内缓存；多进程部署时通过环境变量换成 Redis / Memcached（FileBasedCache 的 add 不是原子的，限流和锁会失效）
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", "scarcity"),
+    }
+}
+
+# 会话先查缓存再查 django_session；也可以设为 django.contrib.sessions.backends.signed_cookies 完全不查库
+SESSION_ENGINE = os.environ.get("DJANGO_SESSION_ENGINE", "django.contrib.sessions.backends.cached_db")
+
 
 ROOT_URLCONF = "scarcity_project.urls"
 
@@ -90,6 +168,20 @@ DATABASES = {
     }
 }
 
+# 按用户分库 (core.sharding)：DJANGO_SHARDS=N (N > 1) 时用户数据分到 default 和 shard_1 … shard_{N-1}，
+# 全局表（用户、会话、令牌、分片目录）只在 default。新分片建好后运行 migrate --database shard_<i>
+SHARD_COUNT = int(os.environ.get("DJANGO_SHARDS", "1"))
+USER_SHARDS = []
+if SHARD_COUNT > 1:
+    USER_SHARDS = ["default"] + [f"shard_{i}" for i in range(1, SHARD_COUNT)]
+    (BASE_DIR / "shards").mkdir(exist_ok=True)
+    for _alias in USER_SHARDS[1:]:
+        DATABASES[_alias] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "shards" / f"{_alias}.sqlite3",
+        }
+DATABASE_ROUTERS = ["core.sharding.UserShardRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -126,6 +218,13 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
 STATIC_URL = "static/"
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# collectstatic 生成带哈希的文件名并预压缩成 .gz 和 .br（.br 需要 requirements.txt 里的 Brotli，没装时只有 .gz）
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "core.storage.CompressedManifestStaticFilesStorage"},
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -0,0 +1,67 @@
+"""
+生产环境配置：在 settings.py 基础上按环境变量覆盖。
+
+    DJANGO_SETTINGS_MODULE=scarcity_project.settings_prod
+    DJANGO_SECRET_KEY=...            必填
+    DJANGO_ALLOWED_HOSTS=a.com,b.com 逗号分隔
+    DJANGO_DB_PATH=/srv/scarcity/db.sqlite3
+    DJANGO_CACHE_LOCATION=redis://127.0.0.1:6379/1   共享缓存，见下方 CACHES
+
+DEBUG 必须关闭：DEBUG 下 Django 会把每条 SQL 记进 connection.queries，长期运行的 worker 内存只增不减。
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, LOGGING, SHARED_CACHE_BACKENDS
+
+
+def _env_list(name, default=''):
+    return [item.strip() for item in os.environ.get(name, default).split(',') if item.strip()]
+
+
+DEBUG = os.environ.get("DJANGO_DEBUG", "") == "1"
+
+SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "")
+if not SECRET_KEY:
+    raise ImproperlyConfigured("生产配置需要设置环境变量 DJANGO_SECRET_KEY")
+
+ALLOWED_HOSTS = _env_list("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1")
+CSRF_TRUSTED_ORIGINS = _env_list("DJANGO_CSRF_TRUSTED_ORIGINS")
+
+# 前面有 HTTPS 反向代理时设为 1
+if os.environ.get("DJANGO_HTTPS", "") == "1":
+    SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+    SESSION_COOKIE_SECURE = True
+    CSRF_COOKIE_SECURE = True
+
+DATABASES["default"]["NAME"] = os.environ.get("DJANGO_DB_PATH", str(BASE_DIR / "db.sqlite3"))
+for _database in DATABASES.values():
+    _database.update({
+        # gthread worker 里每个线程一条长连接，不必每个请求重新打开数据库文件
+        "CONN_MAX_AGE": int(os.environ.get("DJANGO_CONN_MAX_AGE", "600")),
+        "CONN_HEALTH_CHECKS": True,
+        # 写锁被占用时最多等这么多秒再报 database is locked
+        "OPTIONS": {"timeout": int(os.environ.get("DJANGO_DB_TIMEOUT", "20"))},
+    })
+
+# 工作会话、写请求限流桶、依赖图 / 估时统计 / 日历的版本戳、分片目录都放在缓存里，
+# 必须是所有 gunicorn worker 和 runworker 共享、add / incr 为原子操作的缓存；
+# 进程内的 LocMemCache 会让会话在别的 worker 里看不到、限流额度乘以 worker 数、缓存作废只在本进程生效。
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("DJANGO_CACHE_BACKEND", "django.core.cache.backends.redis.RedisCache"),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", "redis://127.0.0.1:6379/1"),
+        "KEY_PREFIX": "scarcity",
+    }
+}
+# 只用于本机测量（measure_startup）之类不对外服务的场景
+if (CACHES["default"]["BACKEND"] not in SHARED_CACHE_BACKENDS
+        and os.environ.get("DJANGO_ALLOW_LOCAL_CACHE", "") != "1"):
+    raise ImproperlyConfigured(
+        "生产配置需要多进程共享的缓存（Redis 或 Memcached），"
+        f"DJANGO_CACHE_BACKEND 应为 {', '.join(sorted(SHARED_CACHE_BACKENDS))} 之一"
+    )
+
+LOGGING["root"] = {"handlers": ["console"], "level": os.environ.get("DJANGO_LOG_LEVEL", "WARNING")}
@@ -14,8 +14,9 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from core import views
 
 urlpatterns = [
@@ -24,3 +25,7 @@ urlpatterns = [
     path('api/', include('core.urls')),
     path('accounts/', include('django.contrib.auth.urls')),
 ]
+
+if not settings.DEBUG:
+    # 没有前置静态文件服务器时由 Django 直接提供预压缩的静态文件
+    urlpatterns.append(re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), views.serve_static))